@@ -4,8 +4,15 @@ from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QPlainTextEdit, QWidget
 from PySide6.QtGui import QFont, QColor, QTextCursor, QTextFormat
 
-from Aya_Hanabi.Hanabi_HighLight import get_highlighter, detect_file_type
+from Aya_Hanabi.Hanabi_HighLight import (get_highlighter, get_highlighter_class, detect_file_type, FILE_TYPE_CACHE, HighlightScheduler,
+                                        BackgroundHighlighter, HighlightPalette, LARGE_DOCUMENT_BLOCKS)
+from Aya_Hanabi.Hanabi_HighLight.detection import SETTINGS_FILE, settings_revision
 from Aya_Hanabi.Hanabi_Styles.scrollbar_style import ScrollBarStyle
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSniffer import KIND_BINARY
+from Aya_Hanabi.Hanabi_Core.Editor.hexViewer import HexViewer
+from Aya_Hanabi.Hanabi_Core.Editor.pagedTextViewer import PagedTextViewer
+from Aya_Hanabi.Hanabi_Core.Editor.logViewer import LogViewer
+from Aya_Hanabi.Hanabi_Core.Editor.progressiveLoader import ProgressiveLoader, PROGRESSIVE_MIN_CHARS
 
 class EditorManager:
     """
@@ -14,6 +21,8 @@ class EditorManager:
     def __init__(self, app=None):
         self.app = app
         self.current_file_type = "text"  # 默认文件类型
+        # 后台高亮设置的缓存：(设置文件版本, 是否启用)，设置文件变化后重新读取
+        self._background_highlight = None
         
     def updateEditorStyle(self, editor, fontSize=15):
         """更新编辑器样式"""
@@ -293,15 +302,89 @@ class EditorManager:
                 if hasattr(self, 'updateEditorStyle'):
                     self.updateEditorStyle(child, font_size)
     
-    def applyHighlighter(self, editor, file_type=None):
-        """应用语法高亮器到编辑器"""
-        if hasattr(self.app, 'highlightMode') and not self.app.highlightMode:
-            return
-            
-        # 清除现有的高亮器
+    def isBackgroundHighlightEnabled(self):
+        """是否启用后台线程语法高亮（默认关闭），设置文件没有变化时直接返回缓存的结果"""
+        revision = settings_revision()
+        cached = self._background_highlight
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        enabled = False
+        try:
+            if revision is not None:
+                with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
+                    settings = json.load(f)
+                    enabled = bool(settings.get("editor", {}).get("editing", {}).get("background_highlight", False))
+        except Exception as e:
+            print(f"读取后台高亮设置失败: {e}")
+        self._background_highlight = (revision, enabled)
+        return enabled
+    
+    def currentHighlightPalette(self):
+        """获取当前主题对应的高亮调色板"""
+        if hasattr(self.app, 'themeManager') and hasattr(self.app.themeManager, 'get_highlight_colors'):
+            try:
+                palette = self.app.themeManager.get_highlight_colors()
+                if isinstance(palette, HighlightPalette):
+                    return palette
+            except Exception as e:
+                print(f"获取高亮调色板失败: {e}")
+        
+        theme_name = getattr(self.app, 'currentTheme', "dark")
+        return HighlightPalette(theme_name, theme_name == "light")
+    
+    def updateHighlightPalette(self, editors):
+        """
+        主题切换后更新所有编辑器的高亮配色
+        
+        只替换调色板，分词结果从缓存复用，不重新创建高亮器；
+        不可见的编辑器推迟到下次切换显示（applyHighlighter）时再重绘
+        """
+        palette = self.currentHighlightPalette()
+        for editor in editors:
+            highlighter = getattr(editor, 'highlighter', None)
+            if not highlighter:
+                continue
+            try:
+                highlighter.set_palette(palette, repaint=False)
+                if highlighter.repaint_pending and editor.isVisible():
+                    highlighter.repaint_pending = False
+                    background = getattr(editor, 'backgroundHighlighter', None)
+                    if background is not None:
+                        background.refresh()
+                    else:
+                        highlighter.rehighlight()
+            except Exception as e:
+                print(f"更新高亮配色时出错: {e}")
+    
+    def removeHighlighter(self, editor):
+        """移除编辑器上的语法高亮器及其调度器/后台任务"""
+        background = getattr(editor, 'backgroundHighlighter', None)
+        if background is not None:
+            background.stop()
+            # 后台高亮器以文档为父对象，不释放会一直留在文档上
+            background.deleteLater()
+            editor.backgroundHighlighter = None
+        
         if hasattr(editor, 'highlighter') and editor.highlighter:
+            if editor.highlighter.scheduler is not None:
+                editor.highlighter.scheduler.stop()
             editor.highlighter.setDocument(None)
+            editor.highlighter = None
+    
+    def applyHighlighter(self, editor, file_type=None, background=None):
+        """
+        应用语法高亮器到编辑器
+        
+        background 为 True 时在线程池中分词，主线程只应用格式；
+        为 None 时读取设置 editor.editing.background_highlight
+        """
+        if hasattr(self.app, 'highlightMode') and not self.app.highlightMode:
+            return
         
+        # 十六进制或分页查看的文件不在编辑器中显示，无需高亮
+        if getattr(editor, 'fileViewer', None) is not None:
+            return
+            
         # 确定文件类型
         fileType = file_type or self.current_file_type
         
@@ -311,16 +394,38 @@ class EditorManager:
             
         print(f"应用高亮，文件类型: {fileType}")
         
-        # 确定是否为亮色主题
-        is_light_theme = False
-        if hasattr(self.app, 'currentTheme'):
-            is_light_theme = self.app.currentTheme == "light"
+        palette = self.currentHighlightPalette()
+        
+        if background is None:
+            background = self.isBackgroundHighlightEnabled()
+        
+        # 同一语言、同一模式的高亮器直接复用，只在主题变化时替换调色板
+        existing = getattr(editor, 'highlighter', None)
+        if (existing and type(existing) is get_highlighter_class(fileType)
+                and (getattr(editor, 'backgroundHighlighter', None) is not None) == bool(background)):
+            self.updateHighlightPalette([editor])
+            return
+        
+        # 清除现有的高亮器
+        self.removeHighlighter(editor)
         
         # 创建新的高亮器
         try:
-            highlighter = get_highlighter(fileType, editor.document(), is_light_theme)
+            document = editor.document()
+            # 后台模式下高亮器不绑定文档，只提供分词器和格式
+            highlighter = get_highlighter(fileType, None if background else document, palette=palette)
             if highlighter:
                 editor.highlighter = highlighter
+                task = None
+                if background:
+                    task = BackgroundHighlighter(highlighter, document)
+                    editor.backgroundHighlighter = task
+                elif document.blockCount() >= LARGE_DOCUMENT_BLOCKS:
+                    # 大文档先高亮可见区域，其余部分分片在后台补全
+                    task = HighlightScheduler(highlighter, editor)
+                if task is not None and hasattr(self.app, 'statusBarWidget'):
+                    task.progressChanged.connect(
+                        lambda done, total: self.app.statusBarWidget.updateTaskProgress("语法高亮", done, total))
                 print(f"已应用 {fileType} 语法高亮器")
             else:
                 editor.highlighter = None
@@ -329,6 +434,69 @@ class EditorManager:
             print(f"应用语法高亮器时出错: {e}")
             editor.highlighter = None
             
+    def loadText(self, editor, content, on_finished=None):
+        """
+        把文本载入编辑器，完成后调用 on_finished()
+        
+        大文本分段追加（见 ProgressiveLoader），载入期间移除语法高亮并屏蔽编辑器信号，
+        状态栏显示载入进度；高亮由调用方在完成后重新应用。小文本直接 setPlainText 并同步回调。
+        """
+        self.cancelTextLoad(editor)
+        if len(content) < PROGRESSIVE_MIN_CHARS:
+            editor.setPlainText(content)
+            if on_finished:
+                on_finished()
+            return None
+        
+        self.removeHighlighter(editor)
+        loader = ProgressiveLoader(editor, content)
+        editor.progressiveLoader = loader
+        if hasattr(self.app, 'statusBarWidget'):
+            loader.progressChanged.connect(
+                lambda done, total: self.app.statusBarWidget.updateTaskProgress("载入文件", done, total))
+        
+        def finish():
+            editor.progressiveLoader = None
+            if on_finished:
+                on_finished()
+        
+        loader.finished.connect(finish)
+        loader.start()
+        return loader
+    
+    def cancelTextLoad(self, editor):
+        """取消编辑器上尚未完成的分段载入"""
+        loader = getattr(editor, 'progressiveLoader', None)
+        if loader is not None:
+            loader.cancel()
+            editor.progressiveLoader = None
+            if hasattr(self.app, 'statusBarWidget'):
+                self.app.statusBarWidget.updateTaskProgress("载入文件", 0, 0)
+    
+    def attachFileViewer(self, editor, filePath, sniff):
+        """
+        用只读查看器代替编辑器显示文件
+        
+        二进制文件使用十六进制查看器，超大文本使用 mmap 虚拟查看器（UTF-16/32 文本按字节找不到换行符，
+        仍使用分页查看器）；编辑器本身保留（保持编辑器索引不变），
+        但隐藏并设为只读，保存时通过 editor.fileViewer 识别并拒绝覆盖原文件
+        """
+        if sniff.kind == KIND_BINARY:
+            viewer = HexViewer(filePath)
+        elif sniff.encoding and sniff.encoding.startswith(('utf-16', 'utf-32')):
+            viewer = PagedTextViewer(filePath, sniff.encoding, sniff.bom_length)
+        else:
+            viewer = LogViewer(filePath, sniff.encoding)
+        
+        self.removeHighlighter(editor)
+        editor.setReadOnly(True)
+        editor.hide()
+        container = editor.parentWidget()
+        if container is not None and container.layout() is not None:
+            container.layout().addWidget(viewer)
+        editor.fileViewer = viewer
+        return viewer
+    
     def scrollToLine(self, editor, lineNumber):
         """滚动编辑器到指定行"""
         if not editor:
@@ -430,10 +598,15 @@ class EditorManager:
         editor.setExtraSelections([selection])
         
     def detectFileType(self, filePath):
-        """根据文件路径检测文件类型"""
+        """根据文件路径检测文件类型，结果与打开、切换、保存共用同一个检测缓存"""
         if not filePath:
             return "text"
-            
+        
+        file_type = FILE_TYPE_CACHE.lookup(filePath, self._detectFileType, 'editor')
+        self.current_file_type = file_type
+        return file_type
+    
+    def _detectFileType(self, filePath):
         # 获取编辑器设置
         try:
             settings_dir = os.path.join(os.path.expanduser("~"), ".hanabi_notes")
@@ -0,0 +1,160 @@
+import os
+from collections import OrderedDict
+from PySide6.QtWidgets import QAbstractScrollArea
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont, QFontMetrics, QPainter, QPalette
+
+# 十六进制查看器
+# 文件不整体读入内存：绘制时只读取可见行所在的页，页按 LRU 缓存，任意大小的文件打开和滚动都只需读取几 KB。
+
+BYTES_PER_ROW = 16
+# 每次从磁盘读取的页大小
+PAGE_BYTES = 64 * 1024
+# 最多缓存的页数
+MAX_CACHED_PAGES = 16
+
+
+class HexViewer(QAbstractScrollArea):
+    """只读的十六进制查看器，按页从文件中懒加载数据"""
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self._file = None
+        self._pages = OrderedDict()
+        self.file_size = 0
+
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        font.setPointSize(11)
+        self.setFont(font)
+        self.viewport().setAutoFillBackground(True)
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+
+        self.reload()
+
+    def reload(self):
+        """重新打开文件，文件大小变化后调用"""
+        self.close_file()
+        try:
+            self._file = open(self.file_path, 'rb')
+            self.file_size = os.fstat(self._file.fileno()).st_size
+        except OSError as e:
+            print(f"十六进制查看器打开文件失败: {e}")
+            self._file = None
+            self.file_size = 0
+        self._update_scrollbar()
+        self.viewport().update()
+
+    def close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        self._pages.clear()
+
+    def closeEvent(self, event):
+        self.close_file()
+        super().closeEvent(event)
+
+    def row_count(self):
+        return (self.file_size + BYTES_PER_ROW - 1) // BYTES_PER_ROW
+
+    def _read(self, offset, length):
+        """读取 [offset, offset + length) 范围内的字节，跨页时拼接"""
+        result = bytearray()
+        end = min(offset + length, self.file_size)
+        while offset < end:
+            page_index = offset // PAGE_BYTES
+            page = self._page(page_index)
+            if not page:
+                break
+            start = offset - page_index * PAGE_BYTES
+            chunk = page[start:start + end - offset]
+            result += chunk
+            offset += len(chunk)
+        return bytes(result)
+
+    def _page(self, page_index):
+        page = self._pages.get(page_index)
+        if page is not None:
+            self._pages.move_to_end(page_index)
+            return page
+        if self._file is None:
+            return b''
+        try:
+            self._file.seek(page_index * PAGE_BYTES)
+            page = self._file.read(PAGE_BYTES)
+        except OSError as e:
+            print(f"十六进制查看器读取文件失败: {e}")
+            return b''
+        self._pages[page_index] = page
+        while len(self._pages) > MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+        return page
+
+    def _line_height(self):
+        return QFontMetrics(self.font()).height()
+
+    def _visible_rows(self):
+        return max(1, self.viewport().height() // max(1, self._line_height()))
+
+    def _update_scrollbar(self):
+        visible = self._visible_rows()
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setRange(0, max(0, self.row_count() - visible))
+        scrollbar.setPageStep(visible)
+        scrollbar.setSingleStep(1)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbar()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def keyPressEvent(self, event):
+        scrollbar = self.verticalScrollBar()
+        key = event.key()
+        if key == Qt.Key.Key_Home and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            scrollbar.setValue(scrollbar.minimum())
+        elif key == Qt.Key.Key_End and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            scrollbar.setValue(scrollbar.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        metrics = QFontMetrics(self.font())
+        line_height = metrics.height()
+        char_width = metrics.horizontalAdvance('0')
+        text_color = self.palette().color(QPalette.ColorRole.Text)
+        dim_color = self.palette().color(QPalette.ColorRole.PlaceholderText)
+
+        offset_digits = max(8, len(f"{self.file_size:x}"))
+        hex_x = (offset_digits + 2) * char_width
+        ascii_x = hex_x + (BYTES_PER_ROW * 3 + 2) * char_width
+
+        first_row = self.verticalScrollBar().value()
+        rows = self._visible_rows() + 1
+        data = self._read(first_row * BYTES_PER_ROW, rows * BYTES_PER_ROW)
+
+        y = metrics.ascent()
+        for row in range(rows):
+            chunk = data[row * BYTES_PER_ROW:(row + 1) * BYTES_PER_ROW]
+            if not chunk:
+                break
+            offset = (first_row + row) * BYTES_PER_ROW
+            painter.setPen(dim_color)
+            painter.drawText(0, y, f"{offset:0{offset_digits}x}")
+            painter.setPen(text_color)
+            # 每 8 个字节之间多留一个空格
+            hex_text = ' '.join(f"{byte:02x}" for byte in chunk[:8])
+            if len(chunk) > 8:
+                hex_text += '  ' + ' '.join(f"{byte:02x}" for byte in chunk[8:])
+            painter.drawText(hex_x, y, hex_text)
+            painter.drawText(ascii_x, y, ''.join(chr(byte) if 32 <= byte < 127 else '.' for byte in chunk))
+            y += line_height
+        painter.end()
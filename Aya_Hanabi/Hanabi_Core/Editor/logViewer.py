@@ -0,0 +1,580 @@
+import os
+import mmap
+import bisect
+from array import array
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QAbstractScrollArea, QLabel, QLineEdit,
+                               QPushButton, QCheckBox, QSpinBox)
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QFont, QFontMetrics, QPainter, QPalette
+
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSniffer import format_size
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import detect_encoding, ENCODING_CACHE
+
+# 基于 mmap 的虚拟文本查看器，用于 GB 级的日志文件
+# 文件通过 mmap 映射，不读入 Python 字符串，也不放入 QTextDocument。
+# 行索引是稀疏的：后台线程按 64 KB 分块统计换行符数量，只保存每块之前的累计行数，
+# 2 GB 文件的索引约 256 KB；定位某一行时二分查找所在块，再在块内向后查找换行符。
+# 绘制时只解码可见的几十行，内存占用与文件大小基本无关。
+# 全文查找同样在后台线程中进行，按块查找以便随时取消，界面不会因为扫描几个 GB 而卡住。
+
+# 索引分块大小
+INDEX_BLOCK_BYTES = 64 * 1024
+# 后台索引每处理多少块向主线程报告一次
+INDEX_REPORT_BLOCKS = 256
+# 单行最多显示的字节数，超长行截断显示
+MAX_LINE_BYTES = 4096
+# 跟随末尾时检查文件大小的间隔（毫秒）
+TAIL_INTERVAL_MS = 500
+# 后台查找每次扫描的字节数，每块之间检查是否已取消
+FIND_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+class _IndexSignals(QObject):
+    """索引任务的信号对象（QRunnable 本身不能发射信号）"""
+    progress = Signal(int, object, int)  # 索引轮次, [每块换行符数, ...], 已索引字节数
+    finished = Signal(int, int)  # 索引轮次, 已索引字节数
+
+
+class _IndexTask(QRunnable):
+    """统计 [start, end) 范围内每个分块的换行符数量，start 必须是分块边界"""
+
+    def __init__(self, file_path, generation, start, end):
+        super().__init__()
+        self.file_path = file_path
+        self.generation = generation
+        self.start = start
+        self.end = end
+        self.cancelled = False
+        self.signals = _IndexSignals()
+
+    def run(self):
+        position = self.start
+        try:
+            with open(self.file_path, 'rb') as f:
+                counts = []
+                f.seek(position)
+                while position < self.end and not self.cancelled:
+                    block = f.read(min(INDEX_BLOCK_BYTES, self.end - position))
+                    if not block:
+                        break
+                    counts.append(block.count(b'\n'))
+                    position += len(block)
+                    if len(counts) >= INDEX_REPORT_BLOCKS:
+                        self.signals.progress.emit(self.generation, counts, position)
+                        counts = []
+                if counts and not self.cancelled:
+                    self.signals.progress.emit(self.generation, counts, position)
+        except OSError as e:
+            print(f"建立行索引时出错: {e}")
+        self.signals.finished.emit(self.generation, position)
+
+
+class _FindSignals(QObject):
+    """查找任务的信号对象"""
+    finished = Signal(int, object)  # 查找轮次, 匹配的字节偏移（未找到为 -1，已取消为 None）
+
+
+class _FindTask(QRunnable):
+    """
+    从字节偏移 start 开始向后（或向前）查找 needle，到达一端后从另一端继续
+
+    与原来在主线程中的查找规则相同：向后查找从 start 开始的匹配，向前查找在 start 之前结束的匹配。
+    使用自己的映射，主线程重新映射文件不影响查找；查找结束后丢弃映射的页。
+    """
+
+    def __init__(self, file_path, generation, needle, start, backward):
+        super().__init__()
+        self.file_path = file_path
+        self.generation = generation
+        self.needle = needle
+        self.start = start
+        self.backward = backward
+        self.cancelled = False
+        self.signals = _FindSignals()
+
+    def run(self):
+        offset = -1
+        try:
+            with open(self.file_path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    try:
+                        offset = self._search(data, size)
+                    finally:
+                        if hasattr(mmap, 'MADV_DONTNEED'):
+                            try:
+                                data.madvise(mmap.MADV_DONTNEED)
+                            except OSError:
+                                pass
+                        data.close()
+        except (OSError, ValueError) as e:
+            print(f"日志查看器查找时出错: {e}")
+        self.signals.finished.emit(self.generation, None if self.cancelled else offset)
+
+    def _search(self, data, size):
+        start = min(self.start, size)
+        if self.backward:
+            offset = self._rfind(data, 0, start)
+            if offset == -1:
+                offset = self._rfind(data, 0, size)
+        else:
+            offset = self._find(data, start, size)
+            if offset == -1:
+                offset = self._find(data, 0, min(size, start + len(self.needle) - 1))
+        return offset
+
+    def _find(self, data, low, high):
+        """data[low:high] 中的第一个匹配，按块查找"""
+        overlap = len(self.needle) - 1
+        position = low
+        while position < high and not self.cancelled:
+            chunk_end = min(high, position + FIND_CHUNK_BYTES)
+            offset = data.find(self.needle, position, min(high, chunk_end + overlap))
+            if offset != -1:
+                return offset
+            position = chunk_end
+        return -1
+
+    def _rfind(self, data, low, high):
+        """data[low:high] 中的最后一个匹配，从后往前按块查找"""
+        overlap = len(self.needle) - 1
+        position = high
+        while position > low and not self.cancelled:
+            chunk_start = max(low, position - FIND_CHUNK_BYTES)
+            offset = data.rfind(self.needle, chunk_start, min(high, position + overlap))
+            if offset != -1:
+                return offset
+            position = chunk_start
+        return -1
+
+
+class LineIndex:
+    """
+    稀疏行索引
+
+    cumulative[i] 为第 i 块之前的换行符总数，最后一块可能不满 INDEX_BLOCK_BYTES。
+    """
+
+    def __init__(self):
+        self.cumulative = array('q', [0])
+        self.indexed_bytes = 0
+
+    def clear(self):
+        self.cumulative = array('q', [0])
+        self.indexed_bytes = 0
+
+    @property
+    def newline_count(self):
+        return self.cumulative[-1]
+
+    def extend(self, counts, indexed_bytes):
+        total = self.cumulative[-1]
+        for count in counts:
+            total += count
+            self.cumulative.append(total)
+        self.indexed_bytes = indexed_bytes
+
+    def drop_partial_block(self):
+        """去掉末尾不满一块的分块，返回重新索引的起点"""
+        full_blocks = self.indexed_bytes // INDEX_BLOCK_BYTES
+        del self.cumulative[full_blocks + 1:]
+        self.indexed_bytes = full_blocks * INDEX_BLOCK_BYTES
+        return self.indexed_bytes
+
+    def locate(self, line):
+        """返回 (块序号, 块内还需跳过的换行符数)，line 从 0 开始"""
+        block = bisect.bisect_left(self.cumulative, line) - 1
+        block = max(0, block)
+        return block, line - self.cumulative[block]
+
+    def line_at(self, data, offset):
+        """字节偏移所在的行号"""
+        block = min(offset // INDEX_BLOCK_BYTES, len(self.cumulative) - 1)
+        start = block * INDEX_BLOCK_BYTES
+        return self.cumulative[block] + data[start:offset].count(b'\n')
+
+
+class _LineView(QAbstractScrollArea):
+    """只绘制可见行的文本区域"""
+
+    def __init__(self, viewer):
+        super().__init__(viewer)
+        self.viewer = viewer
+        self.current_line = -1
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        font.setPointSize(11)
+        self.setFont(font)
+        self.viewport().setAutoFillBackground(True)
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.horizontalScrollBar().setSingleStep(QFontMetrics(font).horizontalAdvance('0') * 4)
+
+    def visible_lines(self):
+        return max(1, self.viewport().height() // max(1, QFontMetrics(self.font()).height()))
+
+    def update_scrollbars(self):
+        visible = self.visible_lines()
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setRange(0, max(0, self.viewer.line_count() - visible))
+        scrollbar.setPageStep(visible)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def keyPressEvent(self, event):
+        scrollbar = self.verticalScrollBar()
+        modifiers = event.modifiers()
+        if event.key() == Qt.Key.Key_Home and modifiers & Qt.KeyboardModifier.ControlModifier:
+            scrollbar.setValue(scrollbar.minimum())
+        elif event.key() == Qt.Key.Key_End and modifiers & Qt.KeyboardModifier.ControlModifier:
+            scrollbar.setValue(scrollbar.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        metrics = QFontMetrics(self.font())
+        line_height = metrics.height()
+        char_width = metrics.horizontalAdvance('0')
+        text_color = self.palette().color(QPalette.ColorRole.Text)
+        dim_color = self.palette().color(QPalette.ColorRole.PlaceholderText)
+        highlight = self.palette().color(QPalette.ColorRole.Highlight)
+        highlight.setAlpha(80)
+
+        first_line = self.verticalScrollBar().value()
+        lines = self.viewer.read_lines(first_line, self.visible_lines() + 1)
+        number_width = (len(str(self.viewer.line_count())) + 2) * char_width
+        x_offset = self.horizontalScrollBar().value()
+        widest = 0
+
+        y = 0
+        for index, text in enumerate(lines):
+            line_number = first_line + index
+            if line_number == self.current_line:
+                painter.fillRect(0, y, self.viewport().width(), line_height, highlight)
+            painter.setPen(text_color)
+            painter.setClipRect(number_width, y, self.viewport().width() - number_width, line_height)
+            painter.drawText(number_width - x_offset, y + metrics.ascent(), text)
+            painter.setClipping(False)
+            painter.setPen(dim_color)
+            painter.drawText(0, y + metrics.ascent(), str(line_number + 1))
+            widest = max(widest, len(text))
+            y += line_height
+        painter.end()
+
+        # 水平滚动范围按当前可见行中最长的一行估算
+        scrollbar = self.horizontalScrollBar()
+        maximum = max(0, widest * char_width + number_width - self.viewport().width())
+        if maximum > scrollbar.maximum():
+            scrollbar.setRange(0, maximum)
+            scrollbar.setPageStep(self.viewport().width())
+
+
+class LogViewer(QWidget):
+    """只读的 GB 级文本查看器，支持跳转到行、查找和跟随末尾"""
+    found = Signal(int)  # 查找结果的行号（从 0 开始），未找到时为 -1
+
+    def __init__(self, file_path, encoding=None, parent=None, thread_pool=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.encoding = encoding
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self.index = LineIndex()
+        self.file_size = 0
+        self._file = None
+        self._data = None
+        self._generation = 0
+        self._task = None
+        # 已启动但尚未结束的索引任务（包括已取消的），结束前保持引用
+        self._running = set()
+        self._indexing = False
+        self._find_generation = 0
+        self._find_task = None
+        self._find_text = ""
+        # 已启动但尚未结束的查找任务，结束前保持引用
+        self._finding = set()
+        self._inode = None
+        self._ends_with_newline = True
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+
+        toolbar = QHBoxLayout()
+        toolbar.setContentsMargins(0, 0, 0, 0)
+        self.infoLabel = QLabel()
+        self.lineSpin = QSpinBox()
+        self.lineSpin.setMinimum(1)
+        self.lineSpin.setMaximum(1)
+        self.lineSpin.setPrefix("行 ")
+        self.searchEdit = QLineEdit()
+        self.searchEdit.setPlaceholderText("查找…")
+        self.prevButton = QPushButton("上一个")
+        self.nextButton = QPushButton("下一个")
+        self.tailCheck = QCheckBox("跟随末尾")
+        toolbar.addWidget(self.infoLabel, 1)
+        toolbar.addWidget(self.lineSpin)
+        toolbar.addWidget(self.searchEdit)
+        toolbar.addWidget(self.prevButton)
+        toolbar.addWidget(self.nextButton)
+        toolbar.addWidget(self.tailCheck)
+        layout.addLayout(toolbar)
+
+        self.view = _LineView(self)
+        layout.addWidget(self.view, 1)
+
+        self.lineSpin.editingFinished.connect(lambda: self.jump_to_line(self.lineSpin.value() - 1))
+        self.searchEdit.returnPressed.connect(lambda: self.find(self.searchEdit.text()))
+        self.nextButton.clicked.connect(lambda: self.find(self.searchEdit.text()))
+        self.prevButton.clicked.connect(lambda: self.find(self.searchEdit.text(), backward=True))
+        self.tailCheck.toggled.connect(self.set_tail)
+
+        self._tail_timer = QTimer(self)
+        self._tail_timer.setInterval(TAIL_INTERVAL_MS)
+        self._tail_timer.timeout.connect(self.reload)
+
+        self.reload()
+
+    # ---- 文件映射与索引 ----
+
+    def _map(self):
+        """重新映射文件，返回文件是否被截断或替换（此时需要重建索引）"""
+        self._unmap()
+        try:
+            self._file = open(self.file_path, 'rb')
+            stat = os.fstat(self._file.fileno())
+        except OSError as e:
+            print(f"日志查看器打开文件失败: {e}")
+            self._file = None
+            self.file_size = 0
+            self._inode = None
+            return True
+        size = stat.st_size
+        replaced = size < self.file_size or (self._inode is not None and stat.st_ino != self._inode)
+        self.file_size = size
+        self._inode = stat.st_ino
+        if size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._ends_with_newline = self._data[size - 1:size] == b'\n'
+        if self.encoding is None:
+            self.encoding = self._guess_encoding()
+        return replaced
+
+    def _unmap(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close_file(self):
+        """停止索引和跟随并释放映射"""
+        self._tail_timer.stop()
+        self._cancel_index()
+        self._cancel_find()
+        self._unmap()
+
+    def closeEvent(self, event):
+        self.close_file()
+        super().closeEvent(event)
+
+    def _guess_encoding(self):
+        """用文件开头判断编码，优先使用记录的编码"""
+        head = self._data[:256 * 1024] if self._data is not None else b''
+        return ENCODING_CACHE.get(self.file_path) or detect_encoding(head, final=False)
+
+    def reload(self):
+        """重新映射文件；文件变长时只索引新增部分，变短或被替换（例如日志轮转）时重建索引"""
+        if self._indexing:
+            return
+        try:
+            stat = os.stat(self.file_path)
+            if (self._file is not None and stat.st_ino == self._inode
+                    and stat.st_size == self.file_size == self.index.indexed_bytes):
+                return
+        except OSError:
+            pass
+        if self._map():
+            self.index.clear()
+        start = self.index.drop_partial_block()
+        self._start_index(start)
+
+    def _start_index(self, start):
+        self._cancel_index()
+        self._generation += 1
+        self._indexing = True
+        task = _IndexTask(self.file_path, self._generation, start, self.file_size)
+        task.setAutoDelete(False)
+        task.signals.progress.connect(self._on_index_progress)
+        task.signals.finished.connect(self._on_index_finished)
+        self._task = task
+        self._running.add(task)
+        self.thread_pool.start(task)
+        self._update_info()
+
+    def _cancel_index(self):
+        if self._task is not None:
+            self._task.cancelled = True
+            self._task = None
+        self._indexing = False
+
+    def _on_index_progress(self, generation, counts, indexed_bytes):
+        if generation != self._generation:
+            return
+        self.index.extend(counts, indexed_bytes)
+        self._after_index_change()
+
+    def _on_index_finished(self, generation, indexed_bytes):
+        self._running = {task for task in self._running if task.generation != generation}
+        if generation != self._generation:
+            return
+        self._task = None
+        self._indexing = False
+        self._after_index_change()
+
+    def _after_index_change(self):
+        self.view.update_scrollbars()
+        self.lineSpin.setMaximum(max(1, self.line_count()))
+        if self.tailCheck.isChecked():
+            scrollbar = self.view.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+        self.view.viewport().update()
+        self._update_info()
+
+    def _update_info(self):
+        state = f"索引中 {self.index.indexed_bytes * 100 // max(1, self.file_size)}%" if self._indexing else "只读"
+        self.infoLabel.setText(f"{state} · {format_size(self.file_size)} · {self.line_count()} 行 · {self.encoding}")
+
+    def line_count(self):
+        """已索引部分的行数，最后一行没有换行符时也计入"""
+        count = self.index.newline_count
+        if not self._indexing and self.file_size and not self._ends_with_newline:
+            count += 1
+        return count
+
+    # ---- 读取 ----
+
+    def _safe(self):
+        """文件被截断后继续读取映射会触发 SIGBUS，读取前确认映射仍然有效"""
+        if self._data is None:
+            return False
+        try:
+            if os.fstat(self._file.fileno()).st_size < self.file_size:
+                QTimer.singleShot(0, self.reload)
+                return False
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def line_offset(self, line):
+        """第 line 行（从 0 开始）的起始字节偏移"""
+        if line <= 0:
+            return 0
+        block, skip = self.index.locate(line)
+        data = self._data
+        position = block * INDEX_BLOCK_BYTES
+        for _ in range(skip):
+            position = data.find(b'\n', position)
+            if position == -1:
+                return self.file_size
+            position += 1
+        return position
+
+    def read_lines(self, first_line, count):
+        """解码从 first_line 开始的 count 行，超长行截断"""
+        if not self._safe():
+            return []
+        data = self._data
+        last = min(first_line + count, self.line_count())
+        position = self.line_offset(first_line)
+        lines = []
+        for _ in range(first_line, last):
+            if position >= self.file_size:
+                break
+            end = data.find(b'\n', position)
+            if end == -1:
+                end = self.file_size
+            raw = data[position:min(end, position + MAX_LINE_BYTES)]
+            text = raw.decode(self.encoding, errors='replace').rstrip('\r').expandtabs(4)
+            if end - position > MAX_LINE_BYTES:
+                text += " …"
+            lines.append(text)
+            position = end + 1
+        return lines
+
+    # ---- 导航 ----
+
+    def jump_to_line(self, line):
+        """滚动到第 line 行（从 0 开始）并标记该行"""
+        line = max(0, min(line, self.line_count() - 1))
+        self.view.current_line = line
+        scrollbar = self.view.verticalScrollBar()
+        if not scrollbar.value() <= line < scrollbar.value() + self.view.visible_lines():
+            scrollbar.setValue(line - self.view.visible_lines() // 2)
+        self.lineSpin.setValue(line + 1)
+        self.view.viewport().update()
+
+    def find(self, text, backward=False):
+        """
+        从当前行之后（或之前）查找文本，到达文件末尾后从另一端继续
+
+        查找在后台线程中进行，找到后跳转到该行；结果通过 found 发出。新的查找会取消尚未完成的查找。
+        """
+        self._cancel_find()
+        if not text or not self._safe():
+            return
+        needle = text.encode(self.encoding, errors='replace')
+        current = self.view.current_line
+        if current < 0:
+            current = self.view.verticalScrollBar().value() - (1 if not backward else 0)
+        if backward:
+            start = self.line_offset(current) if current > 0 else 0
+        else:
+            start = self.line_offset(current + 1)
+
+        self._find_generation += 1
+        self._find_text = text
+        task = _FindTask(self.file_path, self._find_generation, needle, start, backward)
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self._on_find_finished)
+        self._find_task = task
+        self._finding.add(task)
+        self.thread_pool.start(task)
+        self.infoLabel.setText(f"查找中: {text}")
+
+    def _cancel_find(self):
+        if self._find_task is not None:
+            self._find_task.cancelled = True
+            if self.thread_pool.tryTake(self._find_task):
+                self._finding.discard(self._find_task)
+            self._find_task = None
+
+    def _on_find_finished(self, generation, offset):
+        self._finding = {task for task in self._finding if task.generation != generation}
+        if generation != self._find_generation or offset is None:
+            return
+        self._find_task = None
+        if offset == -1 or offset >= self.index.indexed_bytes or not self._safe():
+            self.infoLabel.setText(f"未找到: {self._find_text}")
+            self.found.emit(-1)
+            return
+        self._update_info()
+        line = self.index.line_at(self._data, offset)
+        self.jump_to_line(line)
+        self.found.emit(line)
+
+    def set_tail(self, enabled):
+        """跟随末尾：定时检查文件是否增长，新内容追加到索引并滚动到最后"""
+        if enabled:
+            self._tail_timer.start()
+            self.reload()
+            scrollbar = self.view.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+        else:
+            self._tail_timer.stop()
@@ -0,0 +1,145 @@
+import os
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QLabel, QPushButton, QSpinBox
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSniffer import format_size
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import detect_encoding, ENCODING_CACHE
+
+# 超大文本的只读分页查看
+# 文件按固定字节数分页，页边界对齐到下一个换行符，因此任意一页都可以直接定位读取，
+# 不需要从头扫描；每次只解码并显示一页。
+
+PAGE_BYTES = 256 * 1024
+# 寻找页边界换行符时最多向后读取的字节数，超过后在字符边界处截断
+ALIGN_SEARCH_BYTES = 64 * 1024
+
+
+class PagedTextViewer(QWidget):
+    """只读分页文本查看器"""
+
+    def __init__(self, file_path, encoding=None, bom_length=0, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.encoding = encoding
+        self.bom_length = bom_length
+        self.file_size = 0
+        self.current_page = 0
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+
+        toolbar = QHBoxLayout()
+        toolbar.setContentsMargins(0, 0, 0, 0)
+        self.infoLabel = QLabel()
+        self.prevButton = QPushButton("上一页")
+        self.nextButton = QPushButton("下一页")
+        self.pageSpin = QSpinBox()
+        self.pageSpin.setMinimum(1)
+        self.pageLabel = QLabel()
+        toolbar.addWidget(self.infoLabel, 1)
+        toolbar.addWidget(self.prevButton)
+        toolbar.addWidget(self.pageSpin)
+        toolbar.addWidget(self.pageLabel)
+        toolbar.addWidget(self.nextButton)
+        layout.addLayout(toolbar)
+
+        self.textView = QPlainTextEdit()
+        self.textView.setReadOnly(True)
+        self.textView.setUndoRedoEnabled(False)
+        self.textView.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        layout.addWidget(self.textView, 1)
+
+        self.prevButton.clicked.connect(lambda: self.show_page(self.current_page - 1))
+        self.nextButton.clicked.connect(lambda: self.show_page(self.current_page + 1))
+        self.pageSpin.editingFinished.connect(lambda: self.show_page(self.pageSpin.value() - 1))
+
+        self.reload()
+
+    def page_count(self):
+        return max(1, (self.file_size - self.bom_length + PAGE_BYTES - 1) // PAGE_BYTES)
+
+    def reload(self):
+        """重新读取文件大小并显示当前页"""
+        try:
+            self.file_size = os.path.getsize(self.file_path)
+        except OSError as e:
+            print(f"分页查看器读取文件大小失败: {e}")
+            self.file_size = 0
+        if self.encoding is None:
+            self.encoding = self._guess_encoding()
+        self.pageSpin.setMaximum(self.page_count())
+        self.pageLabel.setText(f"/ {self.page_count()}")
+        self.show_page(min(self.current_page, self.page_count() - 1))
+
+    def _guess_encoding(self):
+        """用第一页判断编码，优先使用记录的编码"""
+        cached = ENCODING_CACHE.get(self.file_path)
+        if cached:
+            return cached
+        try:
+            with open(self.file_path, 'rb') as f:
+                head = f.read(PAGE_BYTES)
+        except OSError:
+            return 'utf-8'
+        # 末尾可能截断在多字节字符中间
+        return detect_encoding(head, final=False)
+
+    def _page_start(self, f, page):
+        """第 page 页的起始字节偏移，第 0 页以外对齐到换行符之后"""
+        if page <= 0:
+            return self.bom_length
+        offset = self.bom_length + page * PAGE_BYTES
+        if offset >= self.file_size:
+            return self.file_size
+        if self.encoding.startswith(('utf-16', 'utf-32')):
+            # 多字节编码不能按单字节换行符对齐，只保证按字符宽度对齐
+            width = 2 if self.encoding.startswith('utf-16') else 4
+            return offset - (offset - self.bom_length) % width
+        f.seek(offset)
+        chunk = f.read(ALIGN_SEARCH_BYTES)
+        newline = chunk.find(b'\n')
+        if newline != -1:
+            return offset + newline + 1
+        # 超长行：退到 UTF-8 字符的起始字节
+        if self.encoding == 'utf-8':
+            index = 0
+            while index < len(chunk) and chunk[index] & 0xC0 == 0x80:
+                index += 1
+            return offset + index
+        return offset
+
+    def _codec(self):
+        """实际解码使用的编码，BOM 已经跳过，需要按 BOM 确定字节序"""
+        if self.encoding == 'utf-8-sig':
+            return 'utf-8'
+        if self.encoding in ('utf-16', 'utf-32') and self.bom_length:
+            try:
+                with open(self.file_path, 'rb') as f:
+                    little_endian = f.read(2) == b'\xff\xfe'
+            except OSError:
+                little_endian = True
+            return f"{self.encoding}-{'le' if little_endian else 'be'}"
+        return self.encoding
+
+    def read_page(self, page):
+        """读取并解码第 page 页，返回 (文本, 起始偏移, 结束偏移)"""
+        with open(self.file_path, 'rb') as f:
+            start = self._page_start(f, page)
+            end = self._page_start(f, page + 1)
+            f.seek(start)
+            data = f.read(max(0, end - start))
+        return data.decode(self._codec(), errors='replace'), start, end
+
+    def show_page(self, page):
+        page = max(0, min(page, self.page_count() - 1))
+        try:
+            text, start, end = self.read_page(page)
+        except OSError as e:
+            print(f"分页查看器读取文件失败: {e}")
+            text, start, end = f"无法读取文件: {e}", 0, 0
+        self.current_page = page
+        self.textView.setPlainText(text)
+        self.pageSpin.setValue(page + 1)
+        self.prevButton.setEnabled(page > 0)
+        self.nextButton.setEnabled(page < self.page_count() - 1)
+        self.infoLabel.setText(f"只读分页模式 · {format_size(self.file_size)} · {self.encoding} · "
+                               f"字节 {start}-{end}")
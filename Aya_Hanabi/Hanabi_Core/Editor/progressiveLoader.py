@@ -0,0 +1,93 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextCursor
+
+# 大文本分段载入编辑器
+# 一次 setPlainText 会在一次事件循环中完成整篇文档的分块和布局，几十 MB 的文本会让界面停顿数秒。
+# 这里每次事件循环只在文档末尾追加 CHUNK_BLOCKS 行，载入期间关闭撤销记录、屏蔽编辑器信号
+# （行数统计、预览等 textChanged 处理函数），完成后一次性恢复。
+
+# 小于该字符数的文本直接 setPlainText
+PROGRESSIVE_MIN_CHARS = 512 * 1024
+# 每次事件循环追加的行数
+CHUNK_BLOCKS = 2000
+
+
+class ProgressiveLoader(QObject):
+    """
+    分段载入器
+
+    载入期间编辑器只读、不记录撤销、不发出信号；完成后恢复原状态，
+    文档标记为未修改，光标回到开头，并发出 finished。cancel() 停止载入且不发出 finished。
+    """
+    progressChanged = Signal(int, int)  # 已载入字符数, 总字符数
+    finished = Signal()
+
+    def __init__(self, editor, content, chunk_blocks=CHUNK_BLOCKS):
+        super().__init__(editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.content = content
+        self.chunk_blocks = max(1, chunk_blocks)
+        self.position = 0
+        self.done = False
+        self._was_read_only = editor.isReadOnly()
+        self._was_undo_enabled = self.document.isUndoRedoEnabled()
+        self._cursor = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        editor = self.editor
+        editor.setReadOnly(True)
+        self.document.setUndoRedoEnabled(False)
+        editor.blockSignals(True)
+        editor.clear()
+        self._cursor = QTextCursor(self.document)
+        self._tick()
+
+    def cancel(self):
+        if self.done:
+            return
+        self._timer.stop()
+        self._restore()
+
+    def _next_position(self):
+        """从当前位置向后 chunk_blocks 行的结束位置"""
+        content = self.content
+        position = self.position
+        for _ in range(self.chunk_blocks):
+            position = content.find('\n', position)
+            if position == -1:
+                return len(content)
+            position += 1
+        return position
+
+    def _tick(self):
+        try:
+            end = self._next_position()
+            chunk = self.content[self.position:end]
+            self._cursor.movePosition(QTextCursor.End)
+            self._cursor.insertText(chunk)
+            self.position = end
+        except Exception as e:
+            print(f"分段载入文本时出错: {e}")
+            self.position = len(self.content)
+
+        self.progressChanged.emit(self.position, len(self.content))
+        if self.position >= len(self.content):
+            self._restore()
+            self.finished.emit()
+        else:
+            self._timer.start(0)
+
+    def _restore(self):
+        self.done = True
+        self.content = None
+        self.document.setUndoRedoEnabled(self._was_undo_enabled)
+        self.document.setModified(False)
+        editor = self.editor
+        editor.blockSignals(False)
+        editor.setReadOnly(self._was_read_only)
+        editor.moveCursor(QTextCursor.Start)
@@ -8,6 +8,7 @@ from .newFile import new_file
 from .deleteFile import delete_file
 from .closeFile import close_file
 from .changeFile import change_file
+from .recoverFile import recover_sessions
 
 # 兼容性导入，允许直接从模块导入函数
 from .saveFile import saveFile as save_file 
\ No newline at end of file
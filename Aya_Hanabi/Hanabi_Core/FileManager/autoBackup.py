@@ -139,11 +139,12 @@ class AutoBackup:
             return
         
         for file_info in self.parent.openFiles:
-            file_path = file_info.get('filePath')
-            if not file_path:
+            file_path = file_info.filePath
+            # 加载中或只读查看模式的文件内容没有读入编辑器
+            if not file_path or file_info.readOnly:
                 continue
                 
-            editor_index = file_info.get('editorIndex')
+            editor_index = file_info.editorIndex
             if 0 <= editor_index < len(self.parent.editors):
                 try:
                     editor = self.parent.editors[editor_index]
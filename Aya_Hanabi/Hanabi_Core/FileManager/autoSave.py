@@ -1,118 +1,226 @@
 import os
 import time
 import datetime
-import hashlib
 from PySide6.QtCore import QTimer
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import ENCODING_CACHE, DEFAULT_ENCODING
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSaver import SaveRequest
+from Aya_Hanabi.Hanabi_Core.FileManager.autoSaveWriter import AutoSaveWriter
+
+# 自动保存
+# 每个编辑器的文档修改状态由 QTextDocument.modificationChanged 通知，只在“未修改/已修改”切换时触发，
+# 打字时没有额外开销（contentsChange 连高亮格式变化也会触发，不适合用来判断）。
+# 只有已修改的文档才会取文本快照和计算哈希；没有已修改的文档时定时器不运行，空闲时不占用 CPU。
+# 主线程只取文本快照，编码、指纹比较和写盘由 AutoSaveWriter 的写入线程完成。
+
+# 文档变为已修改后至少等待的时间（秒），让连续输入告一段落再保存
+MIN_DELAY = 10
+
 
 class AutoSave:
     def __init__(self, parent=None, interval=120):
         """
         初始化自动保存功能
-        
+
         parent: HanabiNotesApp实例
         interval: 自动保存间隔（秒）
         """
         self.parent = parent
         self.interval = interval
         self.lastSaveTime = {}  # 记录每个文件最后保存时间
-        self.lastContentHash = {}  # 记录每个文件上次保存的内容哈希
         self.enabled = True
         self.timer = None
-        
+        # 已修改的文档：编辑器索引 -> 变为已修改的时间
+        self.dirty = {}
+        self.writer = None
+
     def start(self):
-        """启动自动保存定时器"""
+        """启动自动保存"""
+        self.enabled = True
         if not self.timer:
             self.timer = QTimer(self.parent)
+            self.timer.setSingleShot(True)
             self.timer.timeout.connect(self.check_files)
-            self.timer.start(10000)  # 每10秒检查一次
-            print(f"自动保存功能已启用，检查间隔：10秒，保存间隔：{self.interval}秒")
-    
+            print(f"自动保存功能已启用，保存间隔：{self.interval}秒")
+        self._schedule()
+
     def stop(self):
-        """停止自动保存定时器"""
+        """停止自动保存定时器（仍然记录文档修改状态）"""
+        self.enabled = False
         if self.timer:
             self.timer.stop()
             self.timer = None
             print("自动保存功能已禁用")
-    
+
     def toggle(self):
         """切换自动保存状态"""
-        self.enabled = not self.enabled
         if self.enabled:
-            self.start()
-        else:
             self.stop()
+        else:
+            self.start()
         return self.enabled
-    
+
     def set_interval(self, seconds):
         """设置自动保存间隔"""
         self.interval = seconds
+        self._schedule()
         print(f"自动保存间隔已设置为 {seconds} 秒")
-    
-    def get_content_hash(self, content):
-        """计算内容的MD5哈希值，用于检测变化"""
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
-    
+
+    def get_writer(self):
+        """获取后台写入线程，首次调用时创建"""
+        if self.writer is None:
+            self.writer = AutoSaveWriter(self.parent)
+            self.writer.saved.connect(self._on_written)
+            self.writer.failed.connect(self._on_write_failed)
+        return self.writer
+
+    def discard(self, file_path):
+        """丢弃该文件尚未写入的自动保存快照（手动保存前调用）"""
+        if self.writer is not None:
+            self.writer.discard(file_path)
+
+    def shutdown(self, timeout=None):
+        """写完排队的快照并结束写入线程（退出程序前调用）"""
+        self.stop()
+        if self.writer is not None:
+            self.writer.stop(timeout)
+
+    def track_editor(self, editor_index, editor):
+        """跟踪编辑器文档的修改状态（创建编辑器时调用一次）"""
+        editor.document().modificationChanged.connect(
+            lambda modified: self._on_modification_changed(editor_index, modified))
+
+    def _on_modification_changed(self, editor_index, modified):
+        file_info = self.parent.openFiles.by_editor(editor_index) if self.parent else None
+        if file_info is not None:
+            file_info.isModified = modified
+        if modified:
+            self.dirty[editor_index] = time.time()
+        else:
+            self.dirty.pop(editor_index, None)
+        self._schedule()
+
+    def _savable(self, editor_index):
+        """返回可以自动保存的文档信息，不可保存时返回 None"""
+        file_info = self.parent.openFiles.by_editor(editor_index)
+        # 跳过未保存过的文件（没有文件路径）、只读（加载中或只读查看模式）的文件
+        # 和被其他程序修改后用户选择不重新加载的文件（自动保存会覆盖外部修改）
+        if file_info is None or not file_info.filePath or file_info.readOnly or file_info.externalChange:
+            return None
+        if not 0 <= editor_index < len(self.parent.editors):
+            return None
+        return file_info
+
+    def _is_pending(self, file_path):
+        return self.writer is not None and self.writer.is_pending(file_path)
+
+    def _due_time(self, file_info, dirty_since):
+        return max(self.lastSaveTime.get(file_info.filePath, 0) + self.interval, dirty_since + MIN_DELAY)
+
+    def _schedule(self):
+        """定时器设为最早到期的已修改文档的保存时间，没有可保存的文档时停止"""
+        if not self.timer or not self.enabled or not self.parent:
+            return
+        due_times = []
+        for editor_index, dirty_since in self.dirty.items():
+            file_info = self._savable(editor_index)
+            # 上一个快照还在写入队列中的文档等写入完成后再安排
+            if file_info is not None and not self._is_pending(file_info.filePath):
+                due_times.append(self._due_time(file_info, dirty_since))
+        if not due_times:
+            self.timer.stop()
+            return
+        delay = max(0.0, min(due_times) - time.time())
+        self.timer.start(int(delay * 1000))
+
     def check_files(self):
-        """检查并保存需要自动保存的文件"""
+        """把到期的已修改文档的文本快照交给写入线程"""
         if not self.enabled or not self.parent:
             return
-        
+
         current_time = time.time()
-        
-        # 检查所有打开的文件
-        for file_info in self.parent.openFiles:
-            file_path = file_info.get('filePath')
-            editor_index = file_info.get('editorIndex')
-            
-            # 跳过未保存过的文件（没有文件路径）
-            if not file_path:
+        writer = self.get_writer()
+        file_saver = getattr(self.parent, 'fileSaver', None)
+
+        # 只检查已修改的文档
+        for editor_index, dirty_since in list(self.dirty.items()):
+            file_info = self.parent.openFiles.by_editor(editor_index)
+            if file_info is None:
+                # 标签页已关闭
+                self.dirty.pop(editor_index, None)
+                continue
+            if self._savable(editor_index) is None:
+                continue
+            file_path = file_info.filePath
+            if current_time < self._due_time(file_info, dirty_since) or writer.is_pending(file_path):
+                continue
+            if file_saver is not None and file_saver.is_saving(file_path):
+                # 手动保存正在写入，完成后会更新修改状态；仍未保存的编辑稍后再试
+                self.dirty[editor_index] = current_time
                 continue
-                
-            # 检查是否需要保存
-            last_save = self.lastSaveTime.get(file_path, 0)
-            if current_time - last_save >= self.interval:
-                if 0 <= editor_index < len(self.parent.editors):
-                    try:
-                        editor = self.parent.editors[editor_index]
-                        content = editor.toPlainText()
-                        
-                        # 计算当前内容哈希
-                        current_hash = self.get_content_hash(content)
-                        
-                        # 如果内容未发生变化，跳过保存
-                        if file_path in self.lastContentHash and self.lastContentHash[file_path] == current_hash:
-                            # 虽然不保存，但更新时间记录，避免频繁检查
-                            self.lastSaveTime[file_path] = current_time
-                            continue
-                        
-                        # 直接写入文件而不显示对话框
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                            
-                        # 更新最后保存时间和内容哈希
-                        self.lastSaveTime[file_path] = current_time
-                        self.lastContentHash[file_path] = current_hash
-                        
-                        # 获取当前时间
-                        now = datetime.datetime.now().strftime("%H:%M:%S")
-                        print(f"[{now}] 已自动保存文件: {os.path.basename(file_path)}")
-                    except Exception as e:
-                        print(f"自动保存文件时出错: {e}")
-    
-    def file_saved(self, file_path):
-        """手动保存文件后更新时间记录和内容哈希"""
-        if file_path:
-            self.lastSaveTime[file_path] = time.time()
-            
-            # 更新内容哈希
-            try:
-                for file_info in self.parent.openFiles:
-                    if file_info.get('filePath') == file_path:
-                        editor_index = file_info.get('editorIndex')
-                        if 0 <= editor_index < len(self.parent.editors):
-                            editor = self.parent.editors[editor_index]
-                            content = editor.toPlainText()
-                            self.lastContentHash[file_path] = self.get_content_hash(content)
-                            break
-            except Exception as e:
-                print(f"更新内容哈希时出错: {e}")
+
+            document = self.parent.editors[editor_index].document()
+            context = {
+                'tabId': file_info.tabId,
+                'editorIndex': editor_index,
+                'revision': document.revision(),
+            }
+            # 沿用打开时检测到的编码，避免自动保存把 GB18030 等编码的文件改写成 UTF-8
+            encoding = file_info.encoding or DEFAULT_ENCODING
+            # 与打开或上次保存时磁盘上的内容相同（例如改动后又改了回来）时写入线程不会写入
+            request = SaveRequest(file_path, document.toPlainText(), encoding, context=context, skip_unchanged=True,
+                                  newline=file_info.newline)
+            if writer.submit(request):
+                self.lastSaveTime[file_path] = current_time
+            else:
+                # 写入队列已满，稍后再试
+                self.dirty[editor_index] = current_time
+
+        self._schedule()
+
+    def _on_written(self, file_path, result):
+        """写入线程完成写入（或内容未变而跳过）"""
+        ENCODING_CACHE.set(file_path, result.encoding)
+        if result.written:
+            now = datetime.datetime.now().strftime("%H:%M:%S")
+            print(f"[{now}] 已自动保存文件: {os.path.basename(file_path)} ({result.elapsed * 1000:.1f}ms)")
+        context = result.request.context
+        file_info = self.parent.openFiles.by_tab(context['tabId'])
+        editor_index = context['editorIndex']
+        if file_info is not None and file_info.filePath == file_path and 0 <= editor_index < len(self.parent.editors):
+            document = self.parent.editors[editor_index].document()
+            # 快照之后又有编辑时文档仍是已修改状态，等下一次自动保存
+            if document.revision() == context['revision']:
+                document.setModified(False)
+        self._notify_journal(file_path)
+        self._schedule()
+
+    def _notify_journal(self, file_path):
+        journal = getattr(self.parent, 'editJournal', None)
+        if journal is not None:
+            journal.file_written(file_path)
+
+    def _on_write_failed(self, file_path, result):
+        """写入失败：文档保持已修改状态，一个间隔后重试，并在状态栏提示"""
+        print(f"自动保存文件时出错: {file_path}: {result.error}")
+        status_bar = getattr(self.parent, 'statusBarWidget', None)
+        if status_bar is not None and hasattr(status_bar, 'showMessage'):
+            status_bar.showMessage(f"自动保存失败: {os.path.basename(file_path)}")
+        self._schedule()
+
+    def file_saved(self, file_path, revision=None):
+        """
+        手动保存或加载文件后调用（内容指纹由读取和保存流程记录）
+
+        revision: 保存时文档的 revision()；保存期间没有新的编辑时把文档标记为未修改
+        """
+        if not file_path:
+            return
+        self.lastSaveTime[file_path] = time.time()
+        file_info = self.parent.openFiles.by_path(file_path) if self.parent else None
+        if file_info is not None and revision is not None and 0 <= file_info.editorIndex < len(self.parent.editors):
+            document = self.parent.editors[file_info.editorIndex].document()
+            if document.revision() == revision:
+                document.setModified(False)
+            self._notify_journal(file_path)
+        # 保存后文档可能有了路径或解除了外部修改标记，重新计算下次保存时间
+        self._schedule()
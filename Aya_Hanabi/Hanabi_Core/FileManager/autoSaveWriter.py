@@ -0,0 +1,163 @@
+import time
+import threading
+from collections import OrderedDict
+from PySide6.QtCore import QObject, Signal
+
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSaver import write_request, path_lock
+
+# 自动保存写入线程
+# 自动保存只在主线程取得文本快照，编码、比较指纹和原子写入都交给一个专用线程按提交顺序处理。
+# 队列按路径合并：同一路径排队期间再次提交只保留最新的快照；队列中的路径数有上限，
+# 队列满时拒绝新的路径，由调用方稍后重试，主线程不会因为磁盘慢而等待。
+
+# 队列中最多等待写入的路径数
+MAX_PENDING = 32
+
+
+class AutoSaveWriter(QObject):
+    """
+    自动保存的后台写入线程
+
+    submit(request) 立即返回；写入完成后在主线程发出 saved(path, SaveResult) 或 failed(path, SaveResult)。
+    discard(path) 丢弃该路径排队中的快照，正在写入的快照在写入锁内检查后也会放弃（手动保存前调用，
+    避免较旧的自动保存快照覆盖手动保存的内容）。被合并或丢弃的快照不再发出信号。
+    """
+    saved = Signal(str, object)  # 文件路径, SaveResult
+    failed = Signal(str, object)  # 文件路径, SaveResult
+
+    def __init__(self, parent=None, max_pending=MAX_PENDING):
+        super().__init__(parent)
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        # 路径 -> (SaveRequest, 提交时间, 提交时的丢弃计数)，按首次提交的顺序写入
+        self._pending = OrderedDict()
+        # 路径 -> discard 次数
+        self._epochs = {}
+        self._writing = None
+        self._stopping = False
+        self._thread = None
+        self._stats = {
+            'submitted': 0,
+            'written': 0,
+            'unchanged': 0,
+            'coalesced': 0,
+            'rejected': 0,
+            'discarded': 0,
+            'failed': 0,
+            'maxQueueDepth': 0,
+            'lastLatency': 0.0,
+            'maxLatency': 0.0,
+            'totalLatency': 0.0,
+            'lastWriteTime': 0.0,
+        }
+
+    def submit(self, request):
+        """提交快照，返回是否被接受（队列已满时返回 False）"""
+        file_path = request.file_path
+        with self._cond:
+            if self._stopping:
+                return False
+            if file_path in self._pending:
+                self._stats['coalesced'] += 1
+            elif len(self._pending) >= self.max_pending:
+                self._stats['rejected'] += 1
+                return False
+            self._pending[file_path] = (request, time.time(), self._epochs.get(file_path, 0))
+            self._stats['submitted'] += 1
+            self._stats['maxQueueDepth'] = max(self._stats['maxQueueDepth'], len(self._pending))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="AutoSaveWriter", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return True
+
+    def discard(self, file_path):
+        with self._cond:
+            self._epochs[file_path] = self._epochs.get(file_path, 0) + 1
+            if self._pending.pop(file_path, None) is not None:
+                self._stats['discarded'] += 1
+
+    def is_pending(self, file_path=None):
+        """是否有排队或正在写入的快照"""
+        with self._cond:
+            if file_path is None:
+                return bool(self._pending) or self._writing is not None
+            return file_path in self._pending or self._writing == file_path
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self):
+        """
+        写入统计
+
+        queueDepth 为当前排队的路径数；latency 是从提交到写完的时间（包括排队），
+        lastWriteTime 是上一次编码和写盘本身的耗时，单位都是秒。
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queueDepth'] = len(self._pending)
+        completed = stats['written'] + stats['unchanged'] + stats['failed']
+        stats['avgLatency'] = stats.pop('totalLatency') / completed if completed else 0.0
+        return stats
+
+    def stop(self, timeout=None):
+        """写完队列中的快照后结束写入线程（退出程序前调用）"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _next(self):
+        """取出下一个快照，队列为空且正在停止时返回 None"""
+        with self._cond:
+            while not self._pending:
+                if self._stopping:
+                    return None
+                self._cond.wait()
+            file_path, item = self._pending.popitem(last=False)
+            self._writing = file_path
+            return item
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            request, submit_time, epoch = item
+            file_path = request.file_path
+            result = None
+            try:
+                with path_lock(file_path):
+                    with self._cond:
+                        discarded = self._epochs.get(file_path, 0) != epoch
+                    if not discarded:
+                        result = write_request(request)
+            except Exception as e:
+                print(f"自动保存写入线程出错: {e}")
+            with self._cond:
+                self._writing = None
+                if result is not None:
+                    self._record(result, time.time() - submit_time)
+            if result is None:
+                continue
+            if result.error is None:
+                self.saved.emit(file_path, result)
+            else:
+                self.failed.emit(file_path, result)
+
+    def _record(self, result, latency):
+        stats = self._stats
+        if result.error is not None:
+            stats['failed'] += 1
+        elif result.written:
+            stats['written'] += 1
+        else:
+            stats['unchanged'] += 1
+        stats['lastLatency'] = latency
+        stats['maxLatency'] = max(stats['maxLatency'], latency)
+        stats['totalLatency'] += latency
+        stats['lastWriteTime'] = result.elapsed
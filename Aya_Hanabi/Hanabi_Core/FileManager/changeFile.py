@@ -1,5 +1,21 @@
 import os
 from PySide6.QtWidgets import QApplication
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import decode_bytes, detect_newline, ENCODING_CACHE
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS
+from Aya_Hanabi.Hanabi_Core.FileManager.openFile import get_file_watcher
+from Aya_Hanabi.Hanabi_Core.FileManager.openDocuments import OpenDocument
+
+
+def _read_file_content(filePath):
+    """读取文件并按记录的编码（没有记录时检测）解码，返回 (内容, 编码, 原来的换行符)"""
+    with open(filePath, 'rb') as file:
+        data = file.read()
+    content, encoding = decode_bytes(data, ENCODING_CACHE.get(filePath))
+    ENCODING_CACHE.set(filePath, encoding)
+    newline = detect_newline(content)
+    FINGERPRINTS.record(filePath, data, newline)
+    return content.replace('\r\n', '\n').replace('\r', '\n'), encoding, newline
+
 
 def change_file(self, filePath, fileName):
     """
@@ -35,22 +51,18 @@ def change_file(self, filePath, fileName):
     fileInfo = None
     
     # 首先尝试通过文件路径查找（如果提供了路径）
-    if filePath is not None:
-        for info in self.openFiles:
-            if info.get('filePath') == filePath:
-                fileInfo = info
-                editorIndex = info.get('editorIndex')
-                print(f"通过文件路径找到编辑器索引: {editorIndex}")
-                break
+    fileInfo = self.openFiles.by_path(filePath)
+    if fileInfo is not None:
+        editorIndex = fileInfo.editorIndex
+        print(f"通过文件路径找到编辑器索引: {editorIndex}")
     
-    # 如果通过路径没找到，则尝试通过标签索引查找
+    # 如果通过路径没找到，则尝试通过标签页 ID 查找
+    current_tab_id = self.sidebar.tabIdAt(current_tab_index)
     if editorIndex == -1:
-        for info in self.openFiles:
-            if info.get('index') == current_tab_index:
-                fileInfo = info
-                editorIndex = info.get('editorIndex')
-                print(f"通过活动标签索引 {current_tab_index} 找到编辑器索引: {editorIndex}")
-                break
+        fileInfo = self.openFiles.by_tab(current_tab_id)
+        if fileInfo is not None:
+            editorIndex = fileInfo.editorIndex
+            print(f"通过活动标签页 {current_tab_id} 找到编辑器索引: {editorIndex}")
     
     # 如果仍未找到，可能是新打开的虚拟标签页或文件
     if editorIndex == -1:
@@ -60,28 +72,26 @@ def change_file(self, filePath, fileName):
         newEditorIndex = self.createNewEditor()
         
         # 如果有文件路径，尝试加载文件内容
+        encoding = None
+        newline = None
         if filePath:
             try:
-                with open(filePath, 'r', encoding='utf-8') as file:
-                    content = file.read()
+                content, encoding, newline = _read_file_content(filePath)
                 
                 if 0 <= newEditorIndex < len(self.editors):
                     self.editors[newEditorIndex].setPlainText(content)
-                    print(f"从文件加载内容，长度：{len(content)}")
+                    print(f"从文件加载内容，长度：{len(content)}，编码：{encoding}")
             except Exception as e:
                 print(f"加载文件内容时出错：{e}")
         
-        # 记录文件信息
-        fileInfo = {
-            'index': current_tab_index,
-            'editorIndex': newEditorIndex,
-            'filePath': filePath,
-            'title': fileName
-        }
-        if filePath is None:
-            fileInfo['isVirtual'] = True  # 标记为虚拟标签页
+        # 记录文件信息，没有文件路径时为虚拟标签页
+        fileInfo = OpenDocument(current_tab_id, newEditorIndex, filePath, fileName)
+        if encoding:
+            fileInfo.encoding = encoding
+            fileInfo.newline = newline
+            get_file_watcher(self).watch(filePath)
         
-        self.openFiles.append(fileInfo)
+        self.openFiles.add(fileInfo)
         
         print(f"创建新编辑器成功，索引：{newEditorIndex}, 虚拟标签: {filePath is None}")
         
@@ -105,16 +115,19 @@ def change_file(self, filePath, fileName):
         
         # 明确更新当前文件路径，确保它与fileInfo一致
         if fileInfo:
-            self.currentFilePath = fileInfo.get('filePath')
+            self.currentFilePath = fileInfo.filePath
             print(f"确认当前文件路径: {self.currentFilePath}")
         
         # 更新行数计数
         self.updateLineCount(editor)
         
         # 先确定文件类型，再应用高亮
-        if fileInfo and fileInfo.get('filePath'):
+        if fileInfo and (fileInfo.viewer or fileInfo.loading):
+            # 只读查看模式的文件不做内容检测，加载中的文件在加载完成后再检测
+            self.currentFileType = "text"
+        elif fileInfo and fileInfo.filePath:
             from Aya_Hanabi.Hanabi_HighLight import detect_file_type
-            self.currentFileType = detect_file_type(fileInfo.get('filePath'))
+            self.currentFileType = detect_file_type(fileInfo.filePath)
         else:
             self.currentFileType = "text"  # 默认为普通文本
             
@@ -131,28 +144,26 @@ def change_file(self, filePath, fileName):
         newEditorIndex = self.createNewEditor()
         
         # 如果有文件路径，尝试加载文件内容
+        encoding = None
+        newline = None
         if filePath:
             try:
-                with open(filePath, 'r', encoding='utf-8') as file:
-                    content = file.read()
+                content, encoding, newline = _read_file_content(filePath)
                 
                 if 0 <= newEditorIndex < len(self.editors):
                     self.editors[newEditorIndex].setPlainText(content)
-                    print(f"从文件加载内容，长度：{len(content)}")
+                    print(f"从文件加载内容，长度：{len(content)}，编码：{encoding}")
             except Exception as e:
                 print(f"加载文件内容时出错：{e}")
         
-        # 记录文件信息
-        fileInfo = {
-            'index': current_tab_index,
-            'editorIndex': newEditorIndex,
-            'filePath': filePath,
-            'title': fileName
-        }
-        if filePath is None:
-            fileInfo['isVirtual'] = True  # 标记为虚拟标签页
-        
-        self.openFiles.append(fileInfo)
+        # 记录文件信息，没有文件路径时为虚拟标签页
+        fileInfo = OpenDocument(current_tab_id, newEditorIndex, filePath, fileName)
+        if encoding:
+            fileInfo.encoding = encoding
+            fileInfo.newline = newline
+            get_file_watcher(self).watch(filePath)
+        
+        self.openFiles.add(fileInfo)
         
         # 确保当前编辑器引用更新
         self.currentEditor = self.editors[newEditorIndex]
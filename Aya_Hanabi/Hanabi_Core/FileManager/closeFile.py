@@ -1,5 +1,6 @@
 import datetime
 from Aya_Hanabi.Hanabi_Core.UI.messageBox import HanabiMessageBox, question, information
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS
 
 def close_file(self, filePath):
     """
@@ -17,34 +18,20 @@ def close_file(self, filePath):
         information(self, "操作提示", "至少需要保留一个标签页")
         return
     
-    editorIndex = -1
-    fileIndex = -1
     isVirtual = not filePath  # 标记是否为虚拟标签页
     
-    # 处理虚拟标签页（无文件路径）的情况
     if isVirtual:
+        # 虚拟标签页（无文件路径）按当前活动标签页查找
         print("正在关闭虚拟标签页")
-        for i, tab_btn in enumerate(self.sidebar.tabs):
-            if tab_btn.filePath is None:
-                # 找到与当前活动标签页匹配的虚拟标签页
-                if i == self.sidebar.current_tab_index:
-                    for j, file_info in enumerate(self.openFiles):
-                        if file_info.get('index') == i and file_info.get('filePath') is None:
-                            editorIndex = file_info.get('editorIndex')
-                            fileIndex = j
-                            print(f"找到要关闭的虚拟标签页索引：{i}，编辑器索引：{editorIndex}")
-                            break
-                    break
+        file_info = self.openFiles.by_tab(self.sidebar.currentTabId())
+        if file_info is not None and file_info.filePath is not None:
+            file_info = None
     else:
-        # 处理有文件路径的标签页
-        for i, file_info in enumerate(self.openFiles):
-            if file_info.get('filePath') == filePath:
-                editorIndex = file_info.get('editorIndex')
-                fileIndex = i
-                print(f"找到要关闭的文件索引：{i}，编辑器索引：{editorIndex}")
-                break
+        file_info = self.openFiles.by_path(filePath)
+    editorIndex = file_info.editorIndex if file_info is not None else -1
     
-    if editorIndex >= 0 and fileIndex >= 0:
+    if file_info is not None:
+        print(f"找到要关闭的标签页：{file_info.tabId}，编辑器索引：{editorIndex}")
         # 检查文件是否被修改
         modified = False
         if hasattr(self, 'isTextModified'):
@@ -56,12 +43,7 @@ def close_file(self, filePath):
         
         # 如果文件被修改，提示用户保存
         if modified:
-            fileName = "未命名"
-            # 尝试获取文件名
-            for tab_btn in self.sidebar.tabs:
-                if (isVirtual and tab_btn.filePath is None) or (not isVirtual and tab_btn.filePath == filePath):
-                    fileName = tab_btn.fileName
-                    break
+            fileName = file_info.title or "未命名"
             
             result = question(self, "保存文件", f"文件 {fileName} 已修改，是否保存？", 
                            HanabiMessageBox.YesNoCancel)
@@ -76,8 +58,25 @@ def close_file(self, filePath):
                 return
             # 如果选择"No"，则不保存继续关闭
         
-        # 从记录中移除文件信息
-        self.openFiles.pop(fileIndex)
+        # 从记录中移除文件信息，取消尚未完成的后台读取
+        self.openFiles.remove(file_info)
+        if filePath and getattr(self, 'fileLoader', None) is not None:
+            self.fileLoader.cancel(filePath)
+        if filePath and getattr(self, 'fileWatcher', None) is not None:
+            self.fileWatcher.unwatch(filePath)
+        # 关闭标签页时已经询问过是否保存，删除编辑日志
+        if hasattr(self, 'editJournal'):
+            self.editJournal.discard(editorIndex)
+        # 正在保存的文件写入完成后会重新记录指纹
+        if filePath and not _is_writing(self, filePath):
+            FINGERPRINTS.forget(filePath)
+        if 0 <= editorIndex < len(self.editors) and hasattr(self, 'editorManager'):
+            self.editorManager.cancelTextLoad(self.editors[editorIndex])
+        # 只读查看器持有文件句柄（日志查看器还有 mmap 和后台索引），关闭标签时释放
+        if 0 <= editorIndex < len(self.editors):
+            viewer = getattr(self.editors[editorIndex], 'fileViewer', None)
+            if viewer is not None and hasattr(viewer, 'close_file'):
+                viewer.close_file()
         
         # 记录关闭前的编辑器堆栈索引
         closed_stack_index = self.editorsStack.currentIndex()
@@ -92,14 +91,7 @@ def close_file(self, filePath):
             self.closedEditors.append(editor_info)
             print(f"添加到已关闭编辑器列表：{editor_info}")
         
-        # 更新剩余标签页的索引
-        for i, tab_btn in enumerate(self.sidebar.tabs):
-            for file_info in self.openFiles:
-                if (tab_btn.filePath is None and file_info.get('filePath') is None) or \
-                   (tab_btn.filePath == file_info.get('filePath')):
-                    file_info['index'] = i
-                    break
-        
+        # 文档记录的是标签页 ID，关闭标签页后其余文档不需要更新
         print(f"关闭文件成功，剩余文件数量：{len(self.openFiles)}，已关闭编辑器数量：{len(self.closedEditors)}")
         
         # 如果没有剩余文件，创建一个新的空白标签页
@@ -111,11 +103,18 @@ def close_file(self, filePath):
             print("当前编辑器被关闭，切换到其他编辑器")
             if len(self.openFiles) > 0:
                 # 尝试切换到第一个可用的标签页
-                first_file = self.openFiles[0]
-                first_index = first_file.get('index')
+                first_index = self.sidebar.indexOfTab(self.openFiles.first().tabId)
                 if 0 <= first_index < len(self.sidebar.tabs):
                     self.sidebar.activateTab(first_index, True)
         
         # 强制处理事件以确保UI更新
         from PySide6.QtWidgets import QApplication
-        QApplication.processEvents() 
\ No newline at end of file
+        QApplication.processEvents() 
+
+
+def _is_writing(self, filePath):
+    """手动保存或自动保存是否还有该文件尚未完成的写入"""
+    if getattr(self, 'fileSaver', None) is not None and self.fileSaver.is_saving(filePath):
+        return True
+    autoSaveWriter = getattr(getattr(self, 'autoSaveManager', None), 'writer', None)
+    return autoSaveWriter is not None and autoSaveWriter.is_pending(filePath)
@@ -0,0 +1,446 @@
+import os
+import json
+import time
+import queue
+import threading
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QTextCursor, QTextDocument
+
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import decode_bytes, DEFAULT_ENCODING
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS, content_digest
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSaver import write_atomic
+
+# 编辑日志（崩溃恢复）
+# 每个有未保存修改的文档对应一个只追加的日志文件，记录 contentsChange 的增量（位置、删除字符数、插入文本）。
+# 日志的起点是磁盘上的文件（按文件指纹校验）、空文档或一份全文检查点；增量多了以后在空闲时写一次检查点，
+# 把日志压缩成“文件头 + 全文”。文档保存后（回到未修改状态）日志删除。
+# 主线程每次编辑只取出插入的文本放进队列，JSON 编码和写盘都在写入线程中进行。
+# 日志文件在文档变为已修改时才创建，载入文件、重新加载这类整体替换内容后又回到未修改状态的变化不会产生磁盘写入。
+# 程序下次启动时，没有对应进程的日志可以重放成文本，由用户选择是否恢复。
+
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".hanabi_notes", "journal")
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_VERSION = 1
+
+# 增量达到这么多条或插入了这么多字符后写检查点
+CHECKPOINT_EDITS = 1000
+CHECKPOINT_CHARS = 256 * 1024
+# 检查点在停止输入这么久（毫秒）之后写，不打断输入；一直在输入时最多推迟这么久（秒）
+CHECKPOINT_IDLE_MS = 2000
+CHECKPOINT_MAX_WAIT = 10
+# 一次插入超过这么多字符（载入文件、粘贴大段文本）时不记录增量，直接写检查点
+BULK_CHARS = 64 * 1024
+
+# 日志起点
+BASE_EMPTY = "empty"
+BASE_FILE = "file"
+BASE_CHECKPOINT = "checkpoint"
+
+
+def _document_length(document):
+    """文档纯文本的长度（UTF-16 单元，与 contentsChange 的位置一致）"""
+    return document.characterCount() - 1
+
+
+class _JournalState:
+    """一个文档的日志状态"""
+    __slots__ = ('journal_file', 'length', 'edits', 'chars', 'needs_checkpoint', 'compact', 'started', 'pending')
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        # 日志文件已创建；创建前的操作暂存在 pending 中，文档变为已修改时再提交
+        self.started = False
+        self.pending = []
+        # 按日志推算的文档长度，与实际长度不一致时说明漏掉了变化，需要重新写检查点
+        self.length = 0
+        self.edits = 0
+        self.chars = 0
+        # 日志与文档不同步，写检查点之前不再记录增量
+        self.needs_checkpoint = False
+        # 日志有效但增量较多，空闲时压缩
+        self.compact = False
+
+
+class JournalWriter:
+    """
+    日志写入线程
+
+    操作按提交顺序执行：begin 新建日志并写入文件头，append 追加一条增量，
+    rewrite 用文件头和全文原子替换日志（检查点），remove 删除日志。
+    追加只写到系统缓冲区，进程崩溃不会丢失；检查点会 fsync。
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._files = {}
+
+    def submit(self, operation, journal_file, *args):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="EditJournalWriter", daemon=True)
+            self._thread.start()
+        self._queue.put((operation, journal_file, args))
+
+    def stop(self, timeout=None):
+        """写完队列中的操作后结束写入线程"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._close_all()
+                return
+            try:
+                self._execute(*item)
+            except Exception as e:
+                print(f"写入编辑日志时出错: {e}")
+            # 队列暂时为空时把缓冲区交给系统
+            if self._queue.empty():
+                for f in self._files.values():
+                    try:
+                        f.flush()
+                    except OSError:
+                        pass
+
+    def _execute(self, operation, journal_file, args):
+        if operation == 'append':
+            f = self._files.get(journal_file)
+            if f is None:
+                f = self._files[journal_file] = open(journal_file, 'a', encoding='utf-8')
+            f.write(json.dumps(args, ensure_ascii=False, separators=(',', ':')) + "\n")
+        elif operation == 'begin':
+            self._close(journal_file)
+            os.makedirs(os.path.dirname(journal_file), exist_ok=True)
+            self._files[journal_file] = f = open(journal_file, 'w', encoding='utf-8')
+            f.write(json.dumps(args[0], ensure_ascii=False) + "\n")
+        elif operation == 'rewrite':
+            header, text = args
+            self._close(journal_file)
+            lines = json.dumps(header, ensure_ascii=False) + "\n" + json.dumps({'cp': text}, ensure_ascii=False) + "\n"
+            write_atomic(journal_file, lines.encode('utf-8'))
+        elif operation == 'remove':
+            self._close(journal_file)
+            try:
+                os.remove(journal_file)
+            except FileNotFoundError:
+                pass
+
+    def _close(self, journal_file):
+        f = self._files.pop(journal_file, None)
+        if f is not None:
+            f.close()
+
+    def _close_all(self):
+        for journal_file in list(self._files):
+            self._close(journal_file)
+
+
+class EditJournal:
+    """
+    编辑日志
+
+    track_editor(editor_index, editor) 在创建编辑器时调用；file_written(path) 在文件写入后调用，
+    写入时文档仍有未保存的修改就写一次检查点（日志原来的起点已经不是磁盘上的内容）；
+    discard(editor_index) 在关闭标签页时调用。
+    """
+
+    def __init__(self, parent=None, journal_dir=None):
+        self.parent = parent
+        self.journal_dir = journal_dir or JOURNAL_DIR
+        # 本次运行的会话标识：启动时间-进程号，下次启动时据此判断日志是否属于正在运行的程序
+        self.session = f"{int(time.time())}-{os.getpid()}"
+        self.writer = JournalWriter()
+        # 编辑器索引 -> _JournalState
+        self.states = {}
+        self._timer = None
+        # 一直在输入时检查点最晚的时间
+        self._deadline = 0
+
+    def track_editor(self, editor_index, editor):
+        """记录编辑器文档的修改（创建编辑器时调用一次）"""
+        document = editor.document()
+        document.contentsChange.connect(
+            lambda position, removed, added: self._on_contents_change(editor_index, document, position, removed, added))
+        document.modificationChanged.connect(
+            lambda modified: self._on_modification_changed(editor_index, modified))
+
+    def _journal_file(self, editor_index):
+        return os.path.join(self.journal_dir, f"{self.session}-{editor_index}{JOURNAL_SUFFIX}")
+
+    def _header(self, file_info, base, digest=None):
+        return {
+            'v': JOURNAL_VERSION,
+            'path': file_info.filePath,
+            'title': file_info.title,
+            'encoding': file_info.encoding,
+            'newline': file_info.newline,
+            'time': time.time(),
+            'base': base,
+            'digest': digest,
+        }
+
+    def _on_contents_change(self, editor_index, document, position, removed, added):
+        file_info = self.parent.openFiles.by_editor(editor_index)
+        if file_info is None or file_info.viewer:
+            return
+        state = self.states.get(editor_index)
+        if file_info.loading:
+            # 载入过程中的变化不记录，载入完成后文档回到未修改状态
+            if state is not None:
+                self._request_checkpoint(state)
+            return
+        if state is not None and state.needs_checkpoint:
+            # 检查点会包含全部内容
+            self._restart_timer()
+            return
+        length = _document_length(document)
+        if state is None:
+            state = self._begin(editor_index, file_info, document, length - added + removed)
+            if state.needs_checkpoint:
+                return
+        if added > BULK_CHARS or position + removed > state.length or state.length - removed + added != length:
+            self._request_checkpoint(state)
+            return
+
+        text = ""
+        if added:
+            cursor = QTextCursor(document)
+            cursor.setPosition(position)
+            cursor.setPosition(min(position + added, length), QTextCursor.KeepAnchor)
+            text = cursor.selectedText().replace("\u2029", "\n")
+        self._submit(state, 'append', position, removed, text)
+        state.length = length
+        state.edits += 1
+        state.chars += added
+        if state.edits >= CHECKPOINT_EDITS or state.chars >= CHECKPOINT_CHARS:
+            state.compact = True
+            self._restart_timer()
+
+    def _begin(self, editor_index, file_info, document, length_before):
+        """文档第一次修改时开始日志，选择日志的起点"""
+        state = self.states[editor_index] = _JournalState(self._journal_file(editor_index))
+        state.length = length_before
+        fingerprint = FINGERPRINTS.get(file_info.filePath)
+        if document.isModified():
+            state.started = True
+        if length_before == 0:
+            self._submit(state, 'begin', self._header(file_info, BASE_EMPTY))
+        elif (fingerprint is not None and not file_info.externalChange
+              and not file_info.readOnly and not document.isModified()):
+            # 修改前的内容就是打开或上次保存时磁盘上的内容
+            self._submit(state, 'begin', self._header(file_info, BASE_FILE, fingerprint.digest))
+        else:
+            self._request_checkpoint(state)
+        return state
+
+    def _submit(self, state, operation, *args):
+        if state.started:
+            self.writer.submit(operation, state.journal_file, *args)
+        else:
+            state.pending.append((operation, args))
+
+    def _on_modification_changed(self, editor_index, modified):
+        state = self.states.get(editor_index)
+        if state is None:
+            if modified:
+                # 没有经过编辑就被标记为已修改（例如恢复的内容），以检查点为起点
+                file_info = self.parent.openFiles.by_editor(editor_index)
+                if file_info is not None and not file_info.viewer and not file_info.loading:
+                    state = self.states[editor_index] = _JournalState(self._journal_file(editor_index))
+                    self._request_checkpoint(state)
+            return
+        if modified:
+            if not state.started:
+                state.started = True
+                for operation, args in state.pending:
+                    self.writer.submit(operation, state.journal_file, *args)
+                state.pending = []
+            return
+        file_info = self.parent.openFiles.by_editor(editor_index)
+        if file_info is not None and file_info.filePath:
+            # 已保存或撤销到了与磁盘相同的内容
+            self._drop(editor_index)
+        else:
+            # 未命名文档被整体替换（例如清空），以检查点为准
+            self._request_checkpoint(state)
+
+    def file_written(self, file_path):
+        """文件被保存或自动保存后调用"""
+        file_info = self.parent.openFiles.by_path(file_path)
+        if file_info is None:
+            return
+        state = self.states.get(file_info.editorIndex)
+        if state is not None:
+            # 以磁盘文件为起点的日志已经无法校验，立即写检查点
+            self._checkpoint(file_info.editorIndex, state)
+
+    def discard(self, editor_index):
+        """关闭标签页时删除日志"""
+        self._drop(editor_index)
+
+    def _drop(self, editor_index):
+        state = self.states.pop(editor_index, None)
+        if state is not None and state.started:
+            self.writer.submit('remove', state.journal_file)
+
+    def _request_checkpoint(self, state):
+        state.needs_checkpoint = True
+        self._restart_timer()
+
+    def _restart_timer(self):
+        if self._timer is None:
+            self._timer = QTimer(self.parent)
+            self._timer.setSingleShot(True)
+            self._timer.setInterval(CHECKPOINT_IDLE_MS)
+            self._timer.timeout.connect(self.checkpoint)
+        if not self._timer.isActive():
+            self._deadline = time.time() + CHECKPOINT_MAX_WAIT
+        elif time.time() >= self._deadline:
+            return
+        self._timer.start()
+
+    def checkpoint(self):
+        """为需要的文档写检查点"""
+        for editor_index, state in list(self.states.items()):
+            if state.needs_checkpoint or state.compact:
+                self._checkpoint(editor_index, state)
+
+    def _checkpoint(self, editor_index, state):
+        """用全文替换日志；已保存或为空的文档直接删除日志"""
+        file_info = self.parent.openFiles.by_editor(editor_index)
+        if file_info is None or not 0 <= editor_index < len(self.parent.editors):
+            self._drop(editor_index)
+            return
+        if file_info.loading:
+            return
+        document = self.parent.editors[editor_index].document()
+        if file_info.filePath and not document.isModified():
+            self._drop(editor_index)
+            return
+        text = document.toPlainText()
+        if not file_info.filePath and not text:
+            self._drop(editor_index)
+            return
+        state.started = True
+        state.pending = []
+        self.writer.submit('rewrite', state.journal_file, self._header(file_info, BASE_CHECKPOINT), text)
+        state.length = _document_length(document)
+        state.edits = 0
+        state.chars = 0
+        state.needs_checkpoint = False
+        state.compact = False
+
+    def shutdown(self, timeout=None):
+        """退出前写入待写的检查点并结束写入线程；未保存文档的日志保留，下次启动时可以恢复"""
+        if self._timer is not None:
+            self._timer.stop()
+        self.checkpoint()
+        self.writer.stop(timeout)
+
+
+class RecoveredSession:
+    """从日志重放出的文档"""
+    __slots__ = ('journal_file', 'path', 'title', 'encoding', 'newline', 'time', 'text')
+
+    def __init__(self, journal_file, header, text):
+        self.journal_file = journal_file
+        self.path = header.get('path')
+        self.title = header.get('title') or "未命名"
+        self.encoding = header.get('encoding')
+        self.newline = header.get('newline')
+        self.time = header.get('time')
+        self.text = text
+
+
+def _read_disk_text(file_path, encoding):
+    """按读取流程解码磁盘上的文件，返回 (文本, 内容哈希)；文件不存在时返回 (None, None)"""
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None, None
+    text, _ = decode_bytes(data, encoding or DEFAULT_ENCODING)
+    return text.replace('\r\n', '\n').replace('\r', '\n'), content_digest(data)
+
+
+def replay_journal(journal_file):
+    """
+    重放一个日志，返回 RecoveredSession
+
+    没有需要恢复的内容（未命名文档为空、文件内容与磁盘相同）或无法重放（起点文件已被修改）时返回 None。
+    崩溃时写了一半的最后一行会被忽略。
+    """
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        lines = f.read().split("\n")
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        return None
+    if header.get('v') != JOURNAL_VERSION:
+        return None
+
+    disk_text = None
+    if header.get('path'):
+        disk_text, disk_digest = _read_disk_text(header['path'], header.get('encoding'))
+    base = header.get('base')
+    if base == BASE_FILE:
+        if disk_text is None or disk_digest != header.get('digest'):
+            print(f"编辑日志的起点文件已被修改，无法恢复: {header.get('path')}")
+            return None
+        text = disk_text
+    else:
+        text = ""
+
+    # 用 QTextDocument 重放，位置与编辑器一致（UTF-16 单元、换行即分段）
+    document = QTextDocument()
+    document.setUndoRedoEnabled(False)
+    document.setPlainText(text)
+    cursor = QTextCursor(document)
+    for line in lines[1:]:
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            break
+        if isinstance(record, dict):
+            document.setPlainText(record.get('cp', ""))
+            continue
+        position, removed, inserted = record
+        end = _document_length(document)
+        cursor.setPosition(min(position, end))
+        cursor.setPosition(min(position + removed, end), QTextCursor.KeepAnchor)
+        cursor.insertText(inserted)
+
+    text = document.toPlainText()
+    if (not header.get('path') and not text) or text == disk_text:
+        return None
+    return RecoveredSession(journal_file, header, text)
+
+
+def find_orphan_journals(journal_dir=None, current_session=None):
+    """列出不属于正在运行的程序的日志文件"""
+    import psutil
+    journal_dir = journal_dir or JOURNAL_DIR
+    try:
+        names = os.listdir(journal_dir)
+    except OSError:
+        return []
+    journals = []
+    for name in sorted(names):
+        if not name.endswith(JOURNAL_SUFFIX):
+            continue
+        parts = name.split("-")
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        if current_session and name.startswith(current_session + "-"):
+            continue
+        # 会话的进程还在运行（另一个窗口）时不动它的日志
+        if int(parts[1]) != os.getpid() and psutil.pid_exists(int(parts[1])):
+            continue
+        journals.append(os.path.join(journal_dir, name))
+    return journals
@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import codecs
+import threading
+from collections import OrderedDict
+
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSniffer import BOMS
+
+# 文本编码检测
+# 打开文件时只读取一次字节：先看 BOM，再按 UTF-8 校验（解码成功即得到文本），
+# 失败后按内容判断是 GB18030 还是 cp1252。检测结果记录在标签页信息和按路径持久化的缓存中，
+# 再次打开时直接用记录的编码解码，保存时沿用该编码，不再逐个尝试或弹出编码选择框。
+
+# 判断 GB18030 时检查的字符数
+HEURISTIC_SAMPLE_CHARS = 64 * 1024
+# 非 ASCII 字符中中日韩字符和全角标点的占比不低于该值时视为 GB18030
+GB18030_CJK_RATIO = 0.6
+# 最后的兜底编码，cp1252 未定义的 5 个字节用 latin-1 解码
+FALLBACK_ENCODING = 'cp1252'
+# 新文件和没有记录的文件保存时使用的编码
+DEFAULT_ENCODING = 'utf-8'
+# 新文件和没有换行的文件保存时使用的换行符，与文本模式写入一致
+DEFAULT_NEWLINE = os.linesep
+
+_CJK_RE = re.compile('[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+_NON_ASCII_RE = re.compile('[^\x00-\x7f]')
+
+
+def detect_bom(data):
+    """返回 (BOM 对应的编码, BOM 长度)，没有 BOM 时返回 (None, 0)"""
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return encoding, len(bom)
+    return None, 0
+
+
+def _decodes(data, encoding, final):
+    """用增量解码器校验 data，final 为 False 时允许末尾截断在多字节字符中间"""
+    try:
+        return codecs.getincrementaldecoder(encoding)().decode(data, final)
+    except UnicodeDecodeError:
+        return None
+
+
+def _looks_like_gb18030(text):
+    sample = text[:HEURISTIC_SAMPLE_CHARS]
+    non_ascii = len(_NON_ASCII_RE.findall(sample))
+    if not non_ascii:
+        return True
+    return len(_CJK_RE.findall(sample)) / non_ascii >= GB18030_CJK_RATIO
+
+
+def detect_encoding(data, final=True):
+    """
+    检测字节串的编码
+
+    final 为 False 表示 data 只是文件开头的一部分，末尾被截断的多字节字符不算错误。
+    """
+    encoding, _ = detect_bom(data)
+    if encoding:
+        return encoding
+    if _decodes(data, 'utf-8', final) is not None:
+        return 'utf-8'
+    text = _decodes(data[:HEURISTIC_SAMPLE_CHARS * 2], 'gb18030', False)
+    if text is not None and _looks_like_gb18030(text):
+        return 'gb18030'
+    return FALLBACK_ENCODING
+
+
+def decode_bytes(data, encoding=None):
+    """
+    把完整的文件内容解码为文本，返回 (文本, 编码)
+
+    给出 encoding（例如缓存中记录的编码）时优先使用，解码失败才重新检测。
+    UTF-8 文件只解码一次：校验和解码是同一次 decode。
+    """
+    if encoding:
+        try:
+            return data.decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            pass
+
+    bom_encoding, _ = detect_bom(data)
+    if bom_encoding:
+        return data.decode(bom_encoding, errors='replace'), bom_encoding
+    try:
+        return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        text = data.decode('gb18030')
+        if _looks_like_gb18030(text):
+            return text, 'gb18030'
+    except UnicodeDecodeError:
+        pass
+    try:
+        return data.decode(FALLBACK_ENCODING), FALLBACK_ENCODING
+    except UnicodeDecodeError:
+        return data.decode('latin-1'), 'latin-1'
+
+
+def detect_newline(text):
+    """
+    返回解码后的文本（统一换行符之前）使用的换行符：'\r\n'、'\r' 或 '\n'，没有换行时返回 None
+
+    以第一个换行为准；编辑器内统一使用 '\n'，保存时再换回该换行符。
+    """
+    cr = text.find('\r')
+    lf = text.find('\n', 0, cr) if cr != -1 else text.find('\n')
+    if lf != -1:
+        return '\n'
+    if cr == -1:
+        return None
+    return '\r\n' if text.startswith('\n', cr + 1) else '\r'
+
+
+class EncodingCache:
+    """
+    按路径记录文件编码，保存在 ~/.hanabi_notes/encodings.json
+
+    记录中同时保存记录时的文件大小和修改时间。文件被其他程序改写后，记录的编码只作为保存时的默认编码，
+    打开时不再直接使用（cp1252 这类编码几乎能解码任何字节，用错了也不会报错）。
+    只保留最近使用的 max_entries 条；读取线程和主线程都会访问，内部加锁。
+    """
+
+    def __init__(self, cache_file=None, max_entries=2000):
+        self.cache_file = cache_file or os.path.join(os.path.expanduser("~"), ".hanabi_notes", "encodings.json")
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._entries.update(json.load(f))
+        except Exception as e:
+            print(f"加载编码记录失败: {e}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_path = f"{self.cache_file}.temp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_file)
+        except Exception as e:
+            print(f"保存编码记录失败: {e}")
+
+    @staticmethod
+    def _stat(file_path):
+        try:
+            stat = os.stat(file_path)
+            return [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            return None
+
+    def get(self, file_path, verify=True):
+        """返回记录的编码；verify 为 True 时文件在记录之后被修改过则返回 None"""
+        if not file_path:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._entries.get(self._key(file_path))
+        if not entry:
+            return None
+        if verify and entry[1:] != self._stat(file_path):
+            return None
+        return entry[0]
+
+    def set(self, file_path, encoding):
+        """记录文件编码（在文件读取或写入之后调用），与已有记录相同时不写磁盘"""
+        if not file_path or not encoding:
+            return
+        key = self._key(file_path)
+        entry = [encoding] + (self._stat(file_path) or [])
+        with self._lock:
+            self._load()
+            if self._entries.get(key) == entry:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+
+# 全局编码记录
+ENCODING_CACHE = EncodingCache()
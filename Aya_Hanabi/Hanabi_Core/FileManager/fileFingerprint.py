@@ -0,0 +1,132 @@
+import os
+import hashlib
+import threading
+
+# 文件指纹
+# 记录打开或保存时磁盘上文件的大小、修改时间和内容哈希，由读取和写入流程在手上已有字节时顺便更新。
+# 备份判断、外部修改检测、自动保存的内容比较都查询这里，不再为此重新读取整个文件。
+# 大小和修改时间一致时认为文件未变；只有修改时间变了而大小没变时才读取文件计算哈希确认。
+# 编辑器中的文本统一使用 '\n'，指纹同时记录文件的换行符，比较前先把文本换回该换行符再编码。
+
+
+def content_digest(data):
+    """字节串的内容哈希（blake2b，16 字节），比 MD5 更快"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _stat(file_path):
+    try:
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None
+
+
+class Fingerprint:
+    """磁盘上文件的指纹"""
+    __slots__ = ('size', 'mtime_ns', 'digest', 'newline')
+
+    def __init__(self, size, mtime_ns, digest, newline=None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        # 文件使用的换行符（detect_newline），没有换行或未知时为 None
+        self.newline = newline
+
+    def __repr__(self):
+        return (f"Fingerprint(size={self.size}, mtime_ns={self.mtime_ns}, digest={self.digest!r}, "
+                f"newline={self.newline!r})")
+
+
+class FingerprintStore:
+    """
+    按路径记录文件指纹
+
+    record() 在读取或写入文件之后调用，传入刚读到或刚写入的字节；读取线程、保存线程和主线程都会访问，内部加锁。
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def record(self, file_path, data, newline=None):
+        """
+        记录文件当前的大小、修改时间和 data 的哈希，返回 Fingerprint；文件不存在时返回 None
+
+        newline: data 中使用的换行符，供保存时把编辑器中的 '\n' 换回后再比较
+        """
+        stat = _stat(file_path)
+        if stat is None:
+            return None
+        fingerprint = Fingerprint(stat[0], stat[1], content_digest(data), newline)
+        with self._lock:
+            self._entries[self._key(file_path)] = fingerprint
+        return fingerprint
+
+    def get(self, file_path):
+        if not file_path:
+            return None
+        with self._lock:
+            return self._entries.get(self._key(file_path))
+
+    def forget(self, file_path):
+        if file_path:
+            with self._lock:
+                self._entries.pop(self._key(file_path), None)
+
+    def newline(self, file_path):
+        """记录的换行符，没有记录或文件没有换行时返回 None"""
+        fingerprint = self.get(file_path)
+        return fingerprint.newline if fingerprint is not None else None
+
+    def size(self, file_path):
+        """记录的文件大小，没有记录时取磁盘上的大小，文件不存在时返回 None"""
+        fingerprint = self.get(file_path)
+        if fingerprint is not None:
+            return fingerprint.size
+        stat = _stat(file_path)
+        return stat[0] if stat else None
+
+    def has_changed(self, file_path):
+        """
+        文件在上次记录之后是否被修改（没有记录时视为已修改）
+
+        大小和修改时间都没变时直接返回 False；只有修改时间变化时读取文件比较哈希，
+        内容相同（例如只是被 touch）时更新记录中的修改时间。
+        """
+        fingerprint = self.get(file_path)
+        if fingerprint is None:
+            return True
+        stat = _stat(file_path)
+        if stat is None:
+            return True
+        if stat == (fingerprint.size, fingerprint.mtime_ns):
+            return False
+        if stat[0] != fingerprint.size:
+            return True
+        try:
+            with open(file_path, 'rb') as f:
+                digest = content_digest(f.read())
+        except OSError:
+            return True
+        if digest != fingerprint.digest:
+            return True
+        fingerprint.mtime_ns = stat[1]
+        return False
+
+    def matches(self, file_path, data):
+        """
+        data 是否与上次记录的内容相同（用于跳过没有变化的写入）
+
+        data 必须是已经换回记录的换行符（newline()）后编码的字节串，编辑器中的文本直接编码不会相同。
+        """
+        fingerprint = self.get(file_path)
+        return fingerprint is not None and fingerprint.size == len(data) and fingerprint.digest == content_digest(data)
+
+
+# 全局文件指纹记录
+FINGERPRINTS = FingerprintStore()
@@ -0,0 +1,137 @@
+import os
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSniffer import sniff_file, KIND_TEXT
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import decode_bytes, detect_newline, ENCODING_CACHE
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS
+
+# 异步读取文件
+# 磁盘读取、嗅探、解码和文件类型检测都在线程池中进行，主线程只接收结果并填充编辑器。
+# 同一路径同时只有一个读取任务，重复请求共用结果；取消的任务结果直接丢弃。
+
+
+class LoadResult:
+    """文件读取结果"""
+    __slots__ = ('file_path', 'content', 'encoding', 'sniff', 'file_type', 'mtime', 'newline')
+
+    def __init__(self, file_path, content, encoding, sniff, file_type, mtime, newline=None):
+        self.file_path = file_path
+        # 以只读查看器打开的文件（sniff.kind 不是 text）content 为 None
+        self.content = content
+        self.encoding = encoding
+        self.sniff = sniff
+        self.file_type = file_type
+        self.mtime = mtime
+        # 文件原来的换行符（detect_newline），content 中统一为 '\n'
+        self.newline = newline
+
+
+def read_text_file(file_path):
+    """嗅探并解码文件，返回 LoadResult；读取或解码失败时抛出异常"""
+    sniff = sniff_file(file_path)
+    mtime = os.path.getmtime(file_path)
+    if sniff.kind != KIND_TEXT:
+        return LoadResult(file_path, None, None, sniff, 'text', mtime)
+
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    # 文件在嗅探之后被修改时，以实际读取的数据为准
+    sniff.size = len(data)
+
+    # 文件未被修改过时直接使用上次记录的编码，否则只检测一次
+    content, encoding = decode_bytes(data, ENCODING_CACHE.get(file_path) or sniff.encoding)
+    ENCODING_CACHE.set(file_path, encoding)
+    # 与文本模式读取保持一致，统一换行符；原来的换行符保存时再换回去
+    newline = detect_newline(content)
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    FINGERPRINTS.record(file_path, data, newline)
+
+    from Aya_Hanabi.Hanabi_HighLight import detect_file_type
+    return LoadResult(file_path, content, encoding, sniff, detect_file_type(file_path), mtime, newline)
+
+
+class _LoadSignals(QObject):
+    """读取任务的信号对象（QRunnable 本身不能发射信号）"""
+    finished = Signal(object, object)  # 读取任务, LoadResult
+    failed = Signal(object, str)  # 读取任务, 错误信息
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        self.cancelled = False
+        self.signals = _LoadSignals()
+
+    def run(self):
+        # 取消的任务也发出信号，FileLoader 据此释放任务对象
+        try:
+            result = read_text_file(self.file_path)
+        except Exception as e:
+            self.signals.failed.emit(self, str(e))
+            return
+        self.signals.finished.emit(self, result)
+
+
+class FileLoader(QObject):
+    """
+    异步文件读取器
+
+    load(path) 立即返回，读取完成后在主线程发出 loaded(path, LoadResult) 或 failed(path, 错误信息)。
+    同一路径正在读取时再次 load 不会重复读取；cancel(path) 之后该路径的结果不再发出。
+    """
+    loaded = Signal(str, object)  # 文件路径, LoadResult
+    failed = Signal(str, str)  # 文件路径, 错误信息
+
+    def __init__(self, parent=None, thread_pool=None):
+        super().__init__(parent)
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self._pending = {}
+        # 已启动但尚未结束的任务（包括已取消的），结束前保持引用
+        self._running = set()
+
+    def load(self, file_path):
+        """开始读取文件，返回是否新建了读取任务（False 表示已在读取中）"""
+        if file_path in self._pending:
+            return False
+        task = _LoadTask(file_path)
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self._pending[file_path] = task
+        self._running.add(task)
+        self.thread_pool.start(task)
+        return True
+
+    def is_loading(self, file_path):
+        return file_path in self._pending
+
+    def cancel(self, file_path):
+        """取消读取，尚未开始的任务从线程池中移除"""
+        task = self._pending.pop(file_path, None)
+        if task is None:
+            return False
+        task.cancelled = True
+        if self.thread_pool.tryTake(task):
+            self._running.discard(task)
+        return True
+
+    def cancel_all(self):
+        for file_path in list(self._pending):
+            self.cancel(file_path)
+
+    def _take(self, task):
+        self._running.discard(task)
+        # 取消后又重新发起的读取，旧任务的结果不能当作新任务的结果
+        if task.cancelled or self._pending.get(task.file_path) is not task:
+            return False
+        del self._pending[task.file_path]
+        return True
+
+    def _on_finished(self, task, result):
+        if self._take(task):
+            self.loaded.emit(task.file_path, result)
+
+    def _on_failed(self, task, message):
+        if self._take(task):
+            self.failed.emit(task.file_path, message)
@@ -0,0 +1,278 @@
+import os
+import stat
+import time
+import tempfile
+import threading
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import DEFAULT_NEWLINE
+
+# 后台保存文件
+# 主线程只取得文档文本的快照，编码、备份和写盘都在线程池中进行。
+# 写入先写到同目录下的临时文件并 fsync，再用 os.replace 原子替换原文件，任何时刻磁盘上都有一份完整的文件。
+# 同一路径同时只有一个写入任务；写入期间的新请求只保留最后一个，当前写入结束后再写。
+# 手动保存和自动保存在不同线程写入，同一路径的写入由 path_lock 串行化。
+
+# 原文件大于该值时保存前先备份
+BACKUP_SIZE_THRESHOLD = 10240
+# 新旧内容大小变化超过该比例时保存前先备份
+BACKUP_CHANGE_RATIO = 0.2
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+# 进程的 umask 只能在设置时读出，导入时读取一次；新文件的权限与 open() 创建的文件相同
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def path_lock(file_path):
+    """同一路径的写入锁（可重入），手动保存和自动保存共用"""
+    key = os.path.normcase(os.path.abspath(file_path))
+    with _path_locks_guard:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = _path_locks[key] = threading.RLock()
+        return lock
+
+
+def write_atomic(file_path, data):
+    """
+    把字节串原子地写入文件
+
+    先写同目录下的临时文件并 fsync，再用 os.replace 替换原文件。
+    file_path 是符号链接时替换链接指向的文件，链接本身保持不变；
+    原文件存在时保留它的权限，新文件使用 0o666 去掉 umask 后的权限（mkstemp 默认是 0o600）。
+    失败时删除临时文件并抛出异常，原文件不受影响。
+    """
+    file_path = os.path.realpath(file_path)
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(file_path).st_mode)
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".temp", dir=directory)
+    try:
+        try:
+            if hasattr(os, 'fchmod'):
+                os.fchmod(fd, mode)
+            else:
+                os.chmod(temp_path, mode)
+        except OSError:
+            pass
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    # 目录项也写入磁盘，断电后不会丢失替换结果（Windows 不支持打开目录）
+    if hasattr(os, 'O_DIRECTORY'):
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+
+def _needs_backup(file_path, new_size):
+    """原文件较大或大小变化较多时需要备份，原文件大小取自文件指纹"""
+    old_size = FINGERPRINTS.size(file_path)
+    if old_size is None:
+        return False
+    if old_size > BACKUP_SIZE_THRESHOLD:
+        return True
+    return abs(old_size - new_size) / max(1, old_size) > BACKUP_CHANGE_RATIO
+
+
+class SaveRequest:
+    """一次保存请求，content 是提交时文档文本的快照"""
+    __slots__ = ('file_path', 'content', 'encoding', 'backup', 'context', 'skip_unchanged', 'newline')
+
+    def __init__(self, file_path, content, encoding, backup=None, context=None, skip_unchanged=False,
+                 newline=None):
+        self.file_path = file_path
+        self.content = content
+        self.encoding = encoding
+        # 写入前调用 backup(file_path) 备份原文件，为 None 时不备份
+        self.backup = backup
+        # 调用方附带的信息（例如编辑器索引），原样放入 SaveResult
+        self.context = context
+        # 换回换行符并编码后的内容与文件指纹记录的相同时不写入
+        self.skip_unchanged = skip_unchanged
+        # 写入的换行符，content 中的 '\n' 编码前换成它；为 None 时使用 DEFAULT_NEWLINE
+        self.newline = newline
+
+
+class SaveResult:
+    """保存结果"""
+    __slots__ = ('request', 'size', 'elapsed', 'mtime', 'error', 'encoding_error', 'written')
+
+    def __init__(self, request, size=0, elapsed=0.0, mtime=None, error=None, encoding_error=False, written=True):
+        self.request = request
+        self.size = size
+        self.elapsed = elapsed
+        self.mtime = mtime
+        self.error = error
+        # 当前编码无法表示文本中的字符，调用方可以换一种编码重新提交
+        self.encoding_error = encoding_error
+        # 内容没有变化而跳过写入时为 False
+        self.written = written
+
+    @property
+    def file_path(self):
+        return self.request.file_path
+
+    @property
+    def encoding(self):
+        return self.request.encoding
+
+
+def write_request(request):
+    """编码并写入一次保存请求，返回 SaveResult；不抛出异常"""
+    start_time = time.time()
+    content = request.content
+    # 调用方不知道换行符时沿用文件指纹记录的换行符
+    newline = request.newline or FINGERPRINTS.newline(request.file_path) or DEFAULT_NEWLINE
+    if newline != '\n':
+        content = content.replace('\n', newline)
+    try:
+        data = content.encode(request.encoding)
+    except UnicodeEncodeError as e:
+        return SaveResult(request, error=str(e), encoding_error=True)
+    except LookupError as e:
+        return SaveResult(request, error=str(e))
+    try:
+        with path_lock(request.file_path):
+            if request.skip_unchanged and FINGERPRINTS.matches(request.file_path, data):
+                return SaveResult(request, len(data), time.time() - start_time, written=False)
+            if request.backup is not None and _needs_backup(request.file_path, len(data)):
+                request.backup(request.file_path)
+            write_atomic(request.file_path, data)
+            fingerprint = FINGERPRINTS.record(request.file_path, data, newline)
+        mtime = fingerprint.mtime_ns / 1e9 if fingerprint else None
+    except Exception as e:
+        return SaveResult(request, error=str(e))
+    return SaveResult(request, len(data), time.time() - start_time, mtime)
+
+
+class _SaveSignals(QObject):
+    """写入任务的信号对象（QRunnable 本身不能发射信号）"""
+    finished = Signal(object, object)  # 写入任务, SaveResult
+
+
+class _SaveTask(QRunnable):
+    def __init__(self, request):
+        super().__init__()
+        self.request = request
+        self.signals = _SaveSignals()
+        self.result = None
+        # 写入完成后设置，flush 在主线程等待它
+        self.done = threading.Event()
+
+    def run(self):
+        self.result = write_request(self.request)
+        self.done.set()
+        self.signals.finished.emit(self, self.result)
+
+
+class FileSaver(QObject):
+    """
+    后台文件保存器
+
+    save(request) 立即返回，写入完成后在主线程发出 saved(path, SaveResult) 或 failed(path, SaveResult)。
+    同一路径正在写入时再次 save 不会并发写入，只保留最新的请求；被替换的请求不再发出信号。
+    """
+    saved = Signal(str, object)  # 文件路径, SaveResult
+    failed = Signal(str, object)  # 文件路径, SaveResult
+
+    def __init__(self, parent=None, thread_pool=None):
+        super().__init__(parent)
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        # 正在写入的任务
+        self._running = {}
+        # 等待当前写入结束后再写的请求
+        self._queued = {}
+        # shutdown() 之后为 True，结果信号的接收方据此只更新状态、不再操作界面
+        self.shutting_down = False
+
+    def save(self, request):
+        """提交保存请求，返回是否立即开始写入（False 表示排在当前写入之后）"""
+        file_path = request.file_path
+        if file_path in self._running:
+            if file_path in self._queued:
+                print(f"合并保存请求: {file_path}")
+            self._queued[file_path] = request
+            return False
+        self._start(request)
+        return True
+
+    def is_saving(self, file_path=None):
+        if file_path is None:
+            return bool(self._running or self._queued)
+        return file_path in self._running or file_path in self._queued
+
+    def flush(self, timeout=10):
+        """
+        等待本保存器提交的写入完成（退出程序时通过 shutdown 调用），返回是否全部完成
+
+        只等待自己的写入任务（线程池中的其他任务不影响），总共最多等待 timeout 秒。
+        还没开始的任务从线程池取回，和排在后面的请求一样直接在当前线程写入；
+        已完成任务的结果信号立即发出，超时仍未完成的任务保留，结果稍后照常发出。
+        """
+        deadline = time.time() + timeout
+        for file_path, task in list(self._running.items()):
+            if self.thread_pool.tryTake(task):
+                task.result = write_request(task.request)
+            elif not task.done.wait(max(0.0, deadline - time.time())):
+                print(f"等待保存超时: {file_path}")
+                continue
+            del self._running[file_path]
+            self._emit(task.result)
+            request = self._queued.pop(file_path, None)
+            if request is not None:
+                self._emit(write_request(request))
+        return not self._running
+
+    def shutdown(self, timeout=10):
+        """
+        退出程序前调用：标记为正在退出后 flush，返回是否全部完成
+
+        事件循环已经结束，之后发出的结果信号由接收方检查 shutting_down，只更新状态。
+        """
+        self.shutting_down = True
+        return self.flush(timeout)
+
+    def _start(self, request):
+        task = _SaveTask(request)
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self._on_finished)
+        self._running[request.file_path] = task
+        self.thread_pool.start(task)
+
+    def _emit(self, result):
+        if result.error is None:
+            self.saved.emit(result.file_path, result)
+        else:
+            self.failed.emit(result.file_path, result)
+
+    def _on_finished(self, task, result):
+        file_path = task.request.file_path
+        if self._running.get(file_path) is not task:
+            # flush 已经发出过该任务的结果
+            return
+        del self._running[file_path]
+        self._emit(result)
+        request = self._queued.pop(file_path, None)
+        if request is not None:
+            self._start(request)
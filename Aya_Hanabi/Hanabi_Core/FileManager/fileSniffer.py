@@ -0,0 +1,142 @@
+import os
+
+# 打开文件前的嗅探
+# 只读取文件开头的一小段字节，根据魔数、BOM、NUL 字节和文件大小判断文件应当如何打开：
+#   text        普通文本，完整读入编辑器
+#   large_text  超大文本，只读查看，不整体解码（ASCII 兼容编码用 mmap 虚拟查看器，UTF-16/32 分页查看）
+#   binary      二进制文件，用十六进制查看器按需读取
+
+KIND_TEXT = 'text'
+KIND_LARGE_TEXT = 'large_text'
+KIND_BINARY = 'binary'
+
+# 嗅探读取的字节数
+SNIFF_BYTES = 8192
+# 超过该大小的文本文件以只读分页模式打开
+LARGE_TEXT_BYTES = 32 * 1024 * 1024
+# 日志、CSV 这类只追加、很少手工编辑的文件，超过该大小就以只读查看器打开
+LOG_EXTENSIONS = ('.log', '.csv')
+LARGE_LOG_BYTES = 8 * 1024 * 1024
+# 控制字符占比超过该值时视为二进制
+CONTROL_RATIO = 0.3
+
+# (偏移, 魔数, 说明)
+MAGIC_NUMBERS = [
+    (0, b'\x89PNG\r\n\x1a\n', 'PNG 图片'),
+    (0, b'\xff\xd8\xff', 'JPEG 图片'),
+    (0, b'GIF87a', 'GIF 图片'),
+    (0, b'GIF89a', 'GIF 图片'),
+    (0, b'BM', 'BMP 图片'),
+    (0, b'II*\x00', 'TIFF 图片'),
+    (0, b'MM\x00*', 'TIFF 图片'),
+    (0, b'\x00\x00\x01\x00', 'ICO 图标'),
+    (8, b'WEBP', 'WebP 图片'),
+    (0, b'%PDF-', 'PDF 文档'),
+    (0, b'PK\x03\x04', 'ZIP 压缩包'),
+    (0, b'PK\x05\x06', 'ZIP 压缩包'),
+    (0, b'\x1f\x8b', 'GZIP 压缩包'),
+    (0, b'BZh', 'BZIP2 压缩包'),
+    (0, b'\xfd7zXZ\x00', 'XZ 压缩包'),
+    (0, b"7z\xbc\xaf'\x1c", '7z 压缩包'),
+    (0, b'Rar!\x1a\x07', 'RAR 压缩包'),
+    (0, b'\x28\xb5\x2f\xfd', 'Zstandard 压缩包'),
+    (0, b'\x7fELF', 'ELF 可执行文件'),
+    (0, b'MZ', 'Windows 可执行文件'),
+    (0, b'\xca\xfe\xba\xbe', 'Java 类文件'),
+    (0, b'\xcf\xfa\xed\xfe', 'Mach-O 可执行文件'),
+    (0, b'\x00asm', 'WebAssembly 模块'),
+    (0, b'SQLite format 3\x00', 'SQLite 数据库'),
+    (0, b'ID3', 'MP3 音频'),
+    (0, b'OggS', 'Ogg 媒体'),
+    (0, b'fLaC', 'FLAC 音频'),
+    (4, b'ftyp', 'MP4 媒体'),
+    (0, b'\x1aE\xdf\xa3', 'Matroska 媒体'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'Office 文档'),
+    (0, b'wOFF', 'WOFF 字体'),
+    (0, b'wOF2', 'WOFF2 字体'),
+    (0, b'\x00\x01\x00\x00\x00', 'TrueType 字体'),
+]
+
+# 文件头 BOM，UTF-32 必须排在 UTF-16 之前
+BOMS = [
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe\x00\x00', 'utf-32'),
+    (b'\x00\x00\xfe\xff', 'utf-32'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16'),
+]
+
+# 文本中常见的控制字符：\b \t \n \f \r 和 ESC
+_TEXT_CONTROLS = frozenset(b'\x08\t\n\x0c\r\x1b')
+_CONTROL_BYTES = bytes(byte for byte in range(32) if byte not in _TEXT_CONTROLS) + b'\x7f'
+
+
+class SniffResult:
+    """文件嗅探结果"""
+    __slots__ = ('kind', 'size', 'description', 'encoding', 'bom_length')
+
+    def __init__(self, kind, size, description='', encoding=None, bom_length=0):
+        self.kind = kind
+        self.size = size
+        self.description = description
+        # 由 BOM 确定的编码，没有 BOM 时为 None
+        self.encoding = encoding
+        self.bom_length = bom_length
+
+    @property
+    def is_text(self):
+        return self.kind == KIND_TEXT
+
+    def __repr__(self):
+        return f"SniffResult({self.kind!r}, size={self.size}, description={self.description!r}, encoding={self.encoding!r})"
+
+
+def sniff_bytes(head, size=None):
+    """根据文件开头的字节判断文件类型，size 为文件总大小（未知时使用 head 的长度）"""
+    if size is None:
+        size = len(head)
+
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            kind = KIND_LARGE_TEXT if size > LARGE_TEXT_BYTES else KIND_TEXT
+            return SniffResult(kind, size, f"{encoding} 文本", encoding, len(bom))
+
+    for offset, magic, description in MAGIC_NUMBERS:
+        if head[offset:offset + len(magic)] == magic:
+            # 'BM'、'MZ' 这类短魔数也可能是普通文本的开头，需要同时包含 NUL 字节
+            if len(magic) <= 2 and b'\x00' not in head:
+                continue
+            return SniffResult(KIND_BINARY, size, description)
+
+    if b'\x00' in head:
+        return SniffResult(KIND_BINARY, size, "二进制文件")
+
+    if head:
+        controls = len(head) - len(head.translate(None, _CONTROL_BYTES))
+        if controls / len(head) > CONTROL_RATIO:
+            return SniffResult(KIND_BINARY, size, "二进制文件")
+
+    if size > LARGE_TEXT_BYTES:
+        return SniffResult(KIND_LARGE_TEXT, size, "大文本文件")
+    return SniffResult(KIND_TEXT, size, "文本文件")
+
+
+def sniff_file(file_path):
+    """读取文件开头的 SNIFF_BYTES 字节进行嗅探，读取失败时抛出 OSError"""
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    result = sniff_bytes(head, size)
+    if (result.kind == KIND_TEXT and size > LARGE_LOG_BYTES
+            and os.path.splitext(file_path)[1].lower() in LOG_EXTENSIONS):
+        result.kind = KIND_LARGE_TEXT
+        result.description = "大日志文件"
+    return result
+
+
+def format_size(size):
+    """把字节数格式化为便于阅读的字符串"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
@@ -0,0 +1,109 @@
+import os
+import time
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS
+
+# 外部修改检测
+# 打开的文件都注册到 QFileSystemWatcher，由系统通知文件变化，不做定时轮询。
+# 一次保存常常产生多个事件（截断、写入、替换），事件先收集起来，安静一段时间后统一处理（持续写入时最多等待 MAX_WAIT_MS）；
+# 处理时再与文件指纹比较，本程序自己的写入和只改了修改时间的事件都不会报告。
+# 文件所在目录也被监视，文件被删除后重新创建时能重新登记。
+
+# 最后一个事件之后等待的时间（毫秒）
+DEBOUNCE_MS = 300
+# 从第一个未处理的事件算起最长等待时间（毫秒），文件被持续写入时也会按这个间隔处理
+MAX_WAIT_MS = 1000
+
+
+class FileWatcher(QObject):
+    """
+    监视打开的文件
+
+    watch(path) / unwatch(path) 登记和移除文件。文件内容被其他程序修改时发出 changed(path)，
+    被删除或移走时发出 removed(path)。
+    """
+    changed = Signal(str)  # 文件路径
+    removed = Signal(str)  # 文件路径
+
+    def __init__(self, parent=None, debounce_ms=DEBOUNCE_MS, max_wait_ms=MAX_WAIT_MS):
+        super().__init__(parent)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._paths = set()
+        # 目录 -> 该目录下被监视的文件数
+        self._dirs = {}
+        self._dirty = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._flush)
+        self._max_wait = max_wait_ms / 1000
+        # 本批第一个事件的时间，None 表示没有待处理的事件
+        self._first_event = None
+
+    def watch(self, file_path):
+        if not file_path or file_path in self._paths:
+            return
+        self._paths.add(file_path)
+        if os.path.exists(file_path):
+            self._watcher.addPath(file_path)
+        directory = os.path.dirname(file_path)
+        self._dirs[directory] = self._dirs.get(directory, 0) + 1
+        if self._dirs[directory] == 1 and os.path.isdir(directory):
+            self._watcher.addPath(directory)
+
+    def unwatch(self, file_path):
+        if file_path not in self._paths:
+            return
+        self._paths.discard(file_path)
+        self._dirty.discard(file_path)
+        if file_path in self._watcher.files():
+            self._watcher.removePath(file_path)
+        directory = os.path.dirname(file_path)
+        self._dirs[directory] -= 1
+        if not self._dirs[directory]:
+            del self._dirs[directory]
+            if directory in self._watcher.directories():
+                self._watcher.removePath(directory)
+
+    def watched_files(self):
+        return set(self._paths)
+
+    def _on_file_changed(self, file_path):
+        if file_path in self._paths:
+            self._dirty.add(file_path)
+            self._schedule()
+
+    def _on_directory_changed(self, directory):
+        # 只关心之前被删除、现在又出现的文件
+        watched = set(self._watcher.files())
+        for file_path in self._paths:
+            if file_path not in watched and os.path.dirname(file_path) == directory and os.path.exists(file_path):
+                self._dirty.add(file_path)
+                self._schedule()
+
+    def _schedule(self):
+        """推迟处理直到事件安静下来，但不超过最长等待时间"""
+        now = time.monotonic()
+        if self._first_event is None:
+            self._first_event = now
+        elif self._timer.isActive() and now - self._first_event >= self._max_wait:
+            # 已经等得够久，不再推迟，让计时器按原计划触发
+            return
+        self._timer.start()
+
+    def _flush(self):
+        self._first_event = None
+        dirty, self._dirty = self._dirty, set()
+        watched = set(self._watcher.files())
+        for file_path in dirty:
+            if not os.path.exists(file_path):
+                self.removed.emit(file_path)
+                continue
+            # 原子替换（写临时文件再改名）之后原来的监视会失效，需要重新登记
+            if file_path not in watched:
+                self._watcher.addPath(file_path)
+            if FINGERPRINTS.has_changed(file_path):
+                self.changed.emit(file_path)
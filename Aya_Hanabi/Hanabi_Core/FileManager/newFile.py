@@ -1,4 +1,5 @@
 from PySide6.QtWidgets import QApplication
+from Aya_Hanabi.Hanabi_Core.FileManager.openDocuments import OpenDocument
 
 def new_file(self):
     """
@@ -19,13 +20,7 @@ def new_file(self):
         editor.setFocus()
         
     # 记录新标签页信息，特别标记为虚拟标签页（无文件路径）
-    self.openFiles.append({
-        'index': index,
-        'editorIndex': editorIndex,
-        'filePath': None,
-        'title': "未命名",
-        'isVirtual': True  # 标记为虚拟标签页
-    })
+    self.openFiles.add(OpenDocument(self.sidebar.tabIdAt(index), editorIndex))
     
     # 更新当前文件信息
     self.currentFilePath = None
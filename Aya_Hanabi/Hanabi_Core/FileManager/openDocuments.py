@@ -0,0 +1,106 @@
+# 打开的文档
+# 每个标签页对应一个 OpenDocument，由 OpenDocumentRegistry 按文件路径、标签页 ID 和编辑器索引建立索引，
+# 三种查找都是 O(1)。标签页 ID 由侧边栏在创建标签页时分配，关闭其他标签页时不会改变，
+# 因此不再需要在关闭标签页后重新同步每个文档的标签页位置。
+
+
+class OpenDocument:
+    """一个打开的标签页"""
+    __slots__ = ('tabId', 'editorIndex', 'filePath', 'title', 'isVirtual', 'isModified', 'isLoaded',
+                 'encoding', 'newline', 'loading', 'readOnly', 'viewer', 'externalChange',
+                 'last_load_time', 'last_save_time')
+
+    def __init__(self, tabId, editorIndex, filePath=None, title="未命名"):
+        self.tabId = tabId
+        self.editorIndex = editorIndex
+        # 只能通过 OpenDocumentRegistry.set_path 修改，以保持路径索引一致
+        self.filePath = filePath
+        self.title = title
+        # 没有文件路径的标签页（新建后尚未保存）
+        self.isVirtual = filePath is None
+        self.isModified = False
+        self.isLoaded = False
+        # 打开时检测到或上次保存使用的编码
+        self.encoding = None
+        # 打开时文件使用的换行符，编辑器内统一为 '\n'，保存时换回；None 表示新文件或文件没有换行
+        self.newline = None
+        # 正在后台读取或分段载入
+        self.loading = False
+        # 编辑器只读（加载中或只读查看模式），保存、自动保存和备份都会跳过
+        self.readOnly = False
+        # 只读查看器的类型（sniff.kind），普通编辑器为 None
+        self.viewer = None
+        # 文件被其他程序修改或删除后没有重新加载，自动保存不能覆盖
+        self.externalChange = False
+        self.last_load_time = 0
+        self.last_save_time = None
+
+    def __repr__(self):
+        return (f"OpenDocument(tabId={self.tabId}, editorIndex={self.editorIndex}, "
+                f"filePath={self.filePath!r}, title={self.title!r})")
+
+
+class OpenDocumentRegistry:
+    """
+    打开文档的索引
+
+    迭代顺序为打开顺序。by_path / by_tab / by_editor 查找不到时返回 None。
+    """
+
+    def __init__(self):
+        # 标签页 ID -> 文档，同时保持打开顺序
+        self._by_tab = {}
+        self._by_path = {}
+        self._by_editor = {}
+
+    def add(self, document):
+        self._by_tab[document.tabId] = document
+        self._by_editor[document.editorIndex] = document
+        if document.filePath:
+            self._by_path[document.filePath] = document
+        return document
+
+    def remove(self, document):
+        if self._by_tab.get(document.tabId) is not document:
+            return False
+        del self._by_tab[document.tabId]
+        if self._by_editor.get(document.editorIndex) is document:
+            del self._by_editor[document.editorIndex]
+        if document.filePath and self._by_path.get(document.filePath) is document:
+            del self._by_path[document.filePath]
+        return True
+
+    def set_path(self, document, filePath):
+        """修改文档的文件路径（另存为、保存新文件）"""
+        if document.filePath and self._by_path.get(document.filePath) is document:
+            del self._by_path[document.filePath]
+        document.filePath = filePath
+        if filePath:
+            document.isVirtual = False
+            if document.tabId in self._by_tab:
+                self._by_path[filePath] = document
+
+    def by_path(self, filePath):
+        return self._by_path.get(filePath) if filePath else None
+
+    def by_tab(self, tabId):
+        return self._by_tab.get(tabId)
+
+    def by_editor(self, editorIndex):
+        return self._by_editor.get(editorIndex)
+
+    def first(self):
+        return next(iter(self._by_tab.values()), None)
+
+    def __iter__(self):
+        # 迭代快照，迭代过程中可以增删文档
+        return iter(list(self._by_tab.values()))
+
+    def __len__(self):
+        return len(self._by_tab)
+
+    def __bool__(self):
+        return bool(self._by_tab)
+
+    def __contains__(self, document):
+        return self._by_tab.get(getattr(document, 'tabId', None)) is document
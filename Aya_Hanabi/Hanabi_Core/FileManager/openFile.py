@@ -2,6 +2,11 @@ import os
 import time
 from PySide6.QtWidgets import QFileDialog, QMessageBox, QApplication, QWidget
 from Aya_Hanabi.Hanabi_Core.UI.messageBox import HanabiMessageBox, information, warning, critical, question, success
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSniffer import format_size
+from Aya_Hanabi.Hanabi_Core.FileManager.fileLoader import FileLoader
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS
+from Aya_Hanabi.Hanabi_Core.FileManager.fileWatcher import FileWatcher
+from Aya_Hanabi.Hanabi_Core.FileManager.openDocuments import OpenDocument
 
 # 添加一个标志位来跟踪是否已经在处理文件打开操作
 _file_open_in_progress = False
@@ -115,95 +120,42 @@ def open_file(self):
             title = os.path.splitext(fileName)[0]
             
             # 检查文件是否已经打开
-            for i, file_info in enumerate(self.openFiles):
-                if file_info.get('filePath') == filePath:
-                    editorIndex = file_info.get('editorIndex')
-                    print(f"文件已经打开，重新激活标签页: {i}，编辑器索引: {editorIndex}")
-                    
-                    # 性能优化：仅在文件被修改时重新加载内容
-                    if os.path.exists(filePath):
-                        file_mtime = os.path.getmtime(filePath)
-                        last_load_time = file_info.get('last_load_time', 0)
-                        
-                        if file_mtime > last_load_time:
-                            # 文件被修改，需要重新加载
-                            try:
-                                with open(filePath, 'r', encoding='utf-8') as file:
-                                    fresh_content = file.read()
-                                self.editors[editorIndex].setPlainText(fresh_content)
-                                file_info['last_load_time'] = file_mtime  # 更新加载时间
-                                print(f"文件已修改，更新内容，长度: {len(fresh_content)}")
-                            except UnicodeDecodeError:
-                                # 尝试使用其他编码
-                                try:
-                                    with open(filePath, 'r', encoding='gbk') as file:
-                                        fresh_content = file.read()
-                                    self.editors[editorIndex].setPlainText(fresh_content)
-                                    file_info['last_load_time'] = file_mtime
-                                    print(f"使用GBK编码读取文件")
-                                except Exception as e:
-                                    print(f"读取文件内容时出错: {e}")
-                                    warning(self, "读取错误", f"无法读取文件内容: {str(e)}")
-                                    return None, None, None
-                            except Exception as e:
-                                print(f"更新已打开文件内容时出错: {e}")
-                                warning(self, "读取错误", f"无法读取文件内容: {str(e)}")
-                                return None, None, None
-                        else:
-                            print("文件未修改，使用当前内容")
-                    
-                    # 激活对应的标签页并立即返回
-                    self.sidebar.activateTab(file_info.get('index'), True)
-                    return filePath, title, self.editors[editorIndex].toPlainText()
+            file_info = self.openFiles.by_path(filePath)
+            if file_info is not None:
+                editorIndex = file_info.editorIndex
+                print(f"文件已经打开，重新激活标签页: {file_info.tabId}，编辑器索引: {editorIndex}")
+                
+                viewer = getattr(self.editors[editorIndex], 'fileViewer', None)
+                if file_info.loading:
+                    # 正在加载，不重复读取
+                    print("文件正在加载中")
+                elif viewer is not None:
+                    # 查看器按需读取文件，只需刷新文件大小
+                    viewer.reload()
+                # 性能优化：仅在文件被修改时重新加载内容（按文件指纹判断，不读取文件）
+                elif FINGERPRINTS.has_changed(filePath):
+                    # 文件被修改，在后台重新读取
+                    print("文件已修改，重新加载内容")
+                    _start_loading(self, file_info)
+                else:
+                    print("文件未修改，使用当前内容")
+                
+                # 激活对应的标签页并立即返回
+                self.sidebar.activateTab(self.sidebar.indexOfTab(file_info.tabId), True)
+                return filePath, title, None if file_info.loading else self.editors[editorIndex].toPlainText()
             
-            # 文件尚未打开，读取文件内容
-            content = ""
-            try:
-                # 性能优化：使用with语句确保文件正确关闭
-                with open(filePath, 'r', encoding='utf-8') as file:
-                    content = file.read()
-            except UnicodeDecodeError:
-                # 尝试使用其他编码
-                try:
-                    with open(filePath, 'r', encoding='gbk') as file:
-                        content = file.read()
-                    print(f"使用GBK编码读取文件")
-                except Exception as e:
-                    print(f"读取文件内容时出错: {e}")
-                    warning(self, "读取错误", f"无法读取文件内容: {str(e)}")
-                    return None, None, None
-            except Exception as e:
-                print(f"读取文件内容时出错: {e}")
-                warning(self, "读取错误", f"无法读取文件内容: {str(e)}")
-                return None, None, None
-                    
-            # 文件尚未打开，创建新标签页
+            # 文件尚未打开，立即创建标签页，内容在后台读取完成后再填入
             index = self.sidebar.addTab(title, filePath)
             editorIndex = self.createNewEditor()
             
-            # 设置编辑器内容
-            if 0 <= editorIndex < len(self.editors):
-                self.editors[editorIndex].setPlainText(content)
-                print(f"新文件加载到编辑器，内容长度: {len(content)}")
-            
             # 记录文件信息
-            current_time = os.path.getmtime(filePath) if os.path.exists(filePath) else 0
-            self.openFiles.append({
-                'index': index,
-                'editorIndex': editorIndex,
-                'filePath': filePath,
-                'title': title,
-                'last_load_time': current_time  # 记录加载时间用于后续检查文件是否更新
-            })
+            file_info = self.openFiles.add(OpenDocument(self.sidebar.tabIdAt(index), editorIndex, filePath, title))
+            _start_loading(self, file_info)
             
             # 更新当前文件信息
             self.currentFilePath = filePath
             self.currentTitle = title
-            
-            # 获取文件类型
-            from Aya_Hanabi.Hanabi_HighLight import detect_file_type
-            self.currentFileType = detect_file_type(filePath)
-            print(f"打开文件类型: {self.currentFileType}")
+            self.currentFileType = 'text'
             
             # 激活对应的标签页
             if self.sidebar.current_tab_index != index:
@@ -212,11 +164,8 @@ def open_file(self):
             # 更新窗口标题
             self.setWindowTitle(f"Hanabi Notes - {title}")
             
-            # 应用高亮
-            if 0 <= editorIndex < len(self.editors) and hasattr(self, 'highlightMode') and self.highlightMode:
-                self.applyHighlighter(self.editors[editorIndex], self.currentFileType)
-            
-            return filePath, title, content
+            # 内容尚未读取，加载完成后触发 file_opened 插件钩子
+            return filePath, title, None
         
         except Exception as e:
             print(f"打开文件时出错: {e}")
@@ -227,3 +176,170 @@ def open_file(self):
     finally:
         # 最后重置标志位，无论成功或失败
         _file_open_in_progress = False
+
+
+def get_file_loader(self):
+    """获取主窗口的异步文件读取器，首次调用时创建"""
+    loader = getattr(self, 'fileLoader', None)
+    if loader is None:
+        loader = FileLoader(self)
+        loader.loaded.connect(lambda filePath, result: _on_file_loaded(self, filePath, result))
+        loader.failed.connect(lambda filePath, message: _on_file_load_failed(self, filePath, message))
+        self.fileLoader = loader
+    return loader
+
+
+def get_file_watcher(self):
+    """获取主窗口的外部修改监视器，首次调用时创建"""
+    watcher = getattr(self, 'fileWatcher', None)
+    if watcher is None:
+        watcher = FileWatcher(self)
+        watcher.changed.connect(lambda filePath: _on_external_change(self, filePath))
+        watcher.removed.connect(lambda filePath: _on_external_remove(self, filePath))
+        self.fileWatcher = watcher
+    return watcher
+
+
+def _on_external_change(self, filePath):
+    """
+    文件被其他程序修改：文档没有未保存的修改时直接在后台重新加载，
+    有未保存的修改时询问用户；不重新加载则标记该标签页，自动保存不再覆盖外部修改
+    """
+    file_info = _find_file_info(self, filePath)
+    if file_info is None or file_info.loading:
+        return
+    if getattr(self, 'fileSaver', None) is not None and self.fileSaver.is_saving(filePath):
+        # 正在写入，写入完成后指纹会更新
+        return
+    autoSaveWriter = getattr(getattr(self, 'autoSaveManager', None), 'writer', None)
+    if autoSaveWriter is not None and autoSaveWriter.is_pending(filePath):
+        return
+    editorIndex = file_info.editorIndex
+    if not 0 <= editorIndex < len(self.editors):
+        return
+    editor = self.editors[editorIndex]
+    
+    viewer = getattr(editor, 'fileViewer', None)
+    if viewer is not None:
+        viewer.reload()
+        return
+    
+    # 加载和保存完成后文档标记为未修改，不重新编码整个文档与磁盘内容比较
+    # （toPlainText 会统一换行符、把不换行空格换成空格，与磁盘上的字节并不相同）
+    if editor.document().isModified():
+        fileName = os.path.basename(filePath)
+        choice = question(self, "文件已修改",
+                          f"文件 {fileName} 已被其他程序修改，是否重新加载？\n重新加载将丢失未保存的修改。",
+                          HanabiMessageBox.YesNo)
+        if choice != HanabiMessageBox.Yes_Result:
+            file_info.externalChange = True
+            return
+    
+    print(f"文件被外部修改，重新加载: {filePath}")
+    file_info.externalChange = False
+    _start_loading(self, file_info)
+
+
+def _on_external_remove(self, filePath):
+    """文件被删除或移走：保留编辑器内容，标记标签页，自动保存不会重新创建该文件"""
+    file_info = _find_file_info(self, filePath)
+    if file_info is None:
+        return
+    print(f"文件已被删除或移动: {filePath}")
+    file_info.externalChange = True
+    FINGERPRINTS.forget(filePath)
+
+
+def _start_loading(self, file_info):
+    """把标签页置为加载中（只读并显示占位提示），在后台读取文件"""
+    file_info.loading = True
+    file_info.readOnly = True
+    editorIndex = file_info.editorIndex
+    if 0 <= editorIndex < len(self.editors):
+        editor = self.editors[editorIndex]
+        editor.setReadOnly(True)
+        if editor.document().isEmpty():
+            editor.setPlaceholderText(f"正在加载 {os.path.basename(file_info.filePath)} …")
+    get_file_loader(self).load(file_info.filePath)
+
+
+def _find_file_info(self, filePath):
+    return self.openFiles.by_path(filePath)
+
+
+def _on_file_loaded(self, filePath, result):
+    """后台读取完成：填充编辑器（二进制和超大文本改用只读查看器），大文本分段载入"""
+    file_info = _find_file_info(self, filePath)
+    if file_info is None or not file_info.loading:
+        # 标签页在加载期间已关闭
+        return
+    editorIndex = file_info.editorIndex
+    if not 0 <= editorIndex < len(self.editors):
+        return
+    editor = self.editors[editorIndex]
+    
+    file_info.last_load_time = result.mtime
+    file_info.encoding = result.encoding
+    file_info.newline = result.newline
+    get_file_watcher(self).watch(filePath)
+    if result.content is None:
+        print(f"以只读查看模式打开: {filePath} ({result.sniff.description}, {format_size(result.sniff.size)})")
+        if getattr(editor, 'fileViewer', None) is None:
+            self.editorManager.attachFileViewer(editor, filePath, result.sniff)
+        file_info.viewer = result.sniff.kind
+        _finish_loading(self, file_info, editor, 'text')
+        return
+    
+    print(f"文件读取完成，内容长度: {len(result.content)}，编码: {result.encoding}，类型: {result.file_type}")
+    # 载入完成前标签页保持加载中（只读，自动保存跳过）
+    self.editorManager.loadText(editor, result.content,
+                                lambda: _finish_loading(self, file_info, editor, result.file_type))
+
+
+def _finish_loading(self, file_info, editor, file_type):
+    """内容已进入编辑器：恢复编辑，当前标签页应用高亮并刷新行数和预览，触发插件钩子"""
+    if file_info not in self.openFiles:
+        return
+    file_info.loading = False
+    editorIndex = file_info.editorIndex
+    if not file_info.viewer:
+        file_info.readOnly = False
+        editor.setPlaceholderText("输入内容...")
+        editor.setReadOnly(False)
+    
+    # 只有当前显示的标签页需要更新文件类型和高亮，其他标签页在切换时处理
+    if self.editorsStack.currentIndex() == editorIndex:
+        self.currentFileType = file_type
+        if not file_info.viewer and hasattr(self, 'highlightMode') and self.highlightMode:
+            self.applyHighlighter(editor, file_type)
+        if hasattr(self, 'updateLineCount'):
+            self.updateLineCount(editor)
+    # 分段载入期间屏蔽了 textChanged，预览在这里统一刷新一次
+    if hasattr(self, 'updatePreview'):
+        self.updatePreview(editorIndex)
+    
+    filePath = file_info.filePath
+    if getattr(self, 'plugin_manager', None):
+        try:
+            self.plugin_manager.trigger_hook('file_opened', filePath)
+        except Exception as e:
+            print(f"触发插件钩子时出错: {e}")
+
+
+def _on_file_load_failed(self, filePath, message):
+    """后台读取失败：保留只读的空标签页，避免保存时用空内容覆盖原文件"""
+    print(f"读取文件内容时出错: {message}")
+    file_info = _find_file_info(self, filePath)
+    if file_info is None or not file_info.loading:
+        return
+    file_info.loading = False
+    editorIndex = file_info.editorIndex
+    if 0 <= editorIndex < len(self.editors):
+        editor = self.editors[editorIndex]
+        if editor.document().isEmpty():
+            editor.setPlaceholderText(f"无法读取文件: {message}")
+        else:
+            # 重新加载失败，保留原有内容继续编辑
+            file_info.readOnly = False
+            editor.setReadOnly(False)
+    warning(self, "读取错误", f"无法读取文件内容: {message}")
@@ -0,0 +1,88 @@
+import os
+from Aya_Hanabi.Hanabi_Core.UI.messageBox import HanabiMessageBox, question
+from Aya_Hanabi.Hanabi_Core.FileManager.openDocuments import OpenDocument
+from Aya_Hanabi.Hanabi_Core.FileManager.fileFingerprint import FINGERPRINTS
+from Aya_Hanabi.Hanabi_Core.FileManager.editJournal import find_orphan_journals, replay_journal
+from Aya_Hanabi.Hanabi_Core.FileManager.openFile import get_file_watcher
+
+
+def recover_sessions(self):
+    """
+    启动时检查上次运行留下的编辑日志，询问用户是否恢复未保存的内容
+
+    恢复的内容在新标签页中打开并标记为已修改；文件仍存在且没有打开时标签页关联到原文件，
+    否则作为未命名标签页打开。不恢复时删除这些日志。
+
+    Args:
+        self: HanabiNotesApp实例
+    """
+    journal = getattr(self, 'editJournal', None)
+    if journal is None:
+        return
+    journal_files = find_orphan_journals(journal.journal_dir, journal.session)
+    if not journal_files:
+        return
+
+    sessions = []
+    for journal_file in journal_files:
+        try:
+            session = replay_journal(journal_file)
+        except Exception as e:
+            print(f"重放编辑日志时出错: {journal_file}: {e}")
+            session = None
+        if session is not None:
+            sessions.append(session)
+
+    if sessions:
+        names = "\n".join(session.path or session.title for session in sessions[:10])
+        if len(sessions) > 10:
+            names += f"\n……等 {len(sessions)} 个文档"
+        result = question(self, "恢复未保存的内容",
+                          f"上次运行时有未保存的修改，是否恢复？\n\n{names}", HanabiMessageBox.YesNo)
+        if result == HanabiMessageBox.Yes_Result:
+            for session in sessions:
+                try:
+                    _open_recovered(self, session)
+                except Exception as e:
+                    print(f"恢复文档时出错: {session.title}: {e}")
+
+    # 恢复的标签页已由本次运行的日志记录，旧日志不再需要
+    for journal_file in journal_files:
+        try:
+            os.remove(journal_file)
+        except OSError as e:
+            print(f"删除编辑日志时出错: {journal_file}: {e}")
+
+
+def _open_recovered(self, session):
+    filePath = session.path
+    if filePath and (not os.path.exists(filePath) or self.openFiles.by_path(filePath) is not None):
+        filePath = None
+    title = session.title if filePath else f"{session.title} (恢复)"
+
+    index = self.sidebar.addTab(title, filePath)
+    editorIndex = self.createNewEditor()
+    fileInfo = OpenDocument(self.sidebar.tabIdAt(index), editorIndex, filePath, title)
+    fileInfo.isLoaded = True
+    if filePath:
+        fileInfo.encoding = session.encoding
+        fileInfo.newline = session.newline
+        # 自动保存和外部修改检测按磁盘上的当前内容比较
+        with open(filePath, 'rb') as f:
+            FINGERPRINTS.record(filePath, f.read(), session.newline)
+    self.openFiles.add(fileInfo)
+
+    editor = self.editors[editorIndex]
+    editor.setPlainText(session.text)
+    editor.document().setModified(True)
+    if filePath:
+        get_file_watcher(self).watch(filePath)
+        from Aya_Hanabi.Hanabi_HighLight import detect_file_type
+        self.currentFilePath = filePath
+        self.currentFileType = detect_file_type(filePath)
+        self.applyHighlighter(editor, self.currentFileType)
+    else:
+        self.currentFilePath = None
+    self.currentTitle = title
+    self.updateLineCount(editor)
+    print(f"已恢复未保存的内容: {session.path or session.title}")
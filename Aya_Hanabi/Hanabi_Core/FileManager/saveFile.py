@@ -1,24 +1,50 @@
 import os
 import sys
 import time
-import shutil
-import codecs
 from pathlib import Path
 from Aya_Hanabi.Hanabi_Core.UI.messageBox import HanabiMessageBox, information, warning, critical, question, success
 from PySide6.QtWidgets import QFileDialog, QApplication, QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QPushButton, QWidget
 from Aya_Hanabi.Hanabi_Core.UI.HanabiDialog import EncodingSelectionDialog
+from Aya_Hanabi.Hanabi_Core.FileManager.encodingDetector import ENCODING_CACHE, DEFAULT_ENCODING, DEFAULT_NEWLINE
+from Aya_Hanabi.Hanabi_Core.FileManager.fileSaver import FileSaver, SaveRequest
+from Aya_Hanabi.Hanabi_Core.FileManager.openFile import get_file_watcher
+
+# UI显示的编码名称与Python编码名称的对应关系
+ENCODING_NAMES = {
+    "UTF-8": "utf-8",
+    "ANSI": "cp1252",  # Windows下的ANSI通常是cp1252
+    "UTF-16 LE": "utf-16-le",
+    "UTF-16 BE": "utf-16-be",
+    "UTF-8 BOM": "utf-8-sig",
+    "GB18030": "gb18030"
+}
 
 def get_encoding_name_to_python(encoding_name):
     """将UI显示的编码名称转换为Python的编码名称"""
-    encoding_map = {
-        "UTF-8": "utf-8",
-        "ANSI": "cp1252",  # Windows下的ANSI通常是cp1252
-        "UTF-16 LE": "utf-16-le",
-        "UTF-16 BE": "utf-16-be",
-        "UTF-8 BOM": "utf-8-sig",
-        "GB18030": "gb18030"
-    }
-    return encoding_map.get(encoding_name, "utf-8")
+    return ENCODING_NAMES.get(encoding_name, "utf-8")
+
+def get_encoding_display_name(encoding):
+    """将Python的编码名称转换为UI显示的编码名称，没有对应项时返回 UTF-8"""
+    for name, python_name in ENCODING_NAMES.items():
+        if python_name == encoding:
+            return name
+    return "UTF-8"
+
+def _document_encoding(self, savePath):
+    """当前文档的编码：打开时检测到或上次保存使用的编码，新文件使用 UTF-8"""
+    fileData = self.openFiles.by_editor(self.editorsStack.currentIndex())
+    if fileData is not None and fileData.encoding:
+        return fileData.encoding
+    return ENCODING_CACHE.get(savePath, verify=False) or DEFAULT_ENCODING
+
+def _ask_encoding(self, current_encoding):
+    """弹出编码选择对话框，返回选择的Python编码名称，取消时返回None"""
+    encoding_dialog = EncodingSelectionDialog(self, get_encoding_display_name(current_encoding))
+    if encoding_dialog.exec_() != QDialog.Accepted:
+        return None
+    selected_encoding_name = encoding_dialog.get_selected_encoding()
+    self.last_used_encoding = selected_encoding_name
+    return get_encoding_name_to_python(selected_encoding_name)
 
 def saveFile(self, savePath=None, encoding=None):
     start_time = time.time()
@@ -26,6 +52,11 @@ def saveFile(self, savePath=None, encoding=None):
     if not hasattr(self, 'currentEditor') or self.currentEditor is None:
         print("没有可保存的编辑器内容")
         return False
+    
+    # 仍在加载或以十六进制/分页方式查看的文件没有完整读入编辑器，保存会用不完整的内容覆盖原文件
+    if self.currentEditor.isReadOnly():
+        warning(self, "无法保存", "该文件正在加载或以只读查看模式打开，不能保存")
+        return False
 
     content = self.currentEditor.toPlainText()
     content_size = len(content)
@@ -77,22 +108,15 @@ def saveFile(self, savePath=None, encoding=None):
         )
         
         defaultFileName = ""
-        currentEditorIndex = self.editorsStack.currentIndex()
-        isVirtualTab = True
+        fileInfo = self.openFiles.by_editor(self.editorsStack.currentIndex())
         
-        if hasattr(self, 'openFiles') and self.openFiles:
-            for fileInfo in self.openFiles:
-                if fileInfo.get('editorIndex') == currentEditorIndex:
-                    isVirtualTab = fileInfo.get('isVirtual', True)
-                    
-                    if not isVirtualTab and fileInfo.get('title'):
-                        fileName = fileInfo.get('title')
-                        
-                        if not os.path.splitext(fileName)[1] and defaultExt:
-                            fileName = f"{fileName}{defaultExt}"
-                        
-                        defaultFileName = fileName
-                    break
+        if fileInfo is not None and not fileInfo.isVirtual and fileInfo.title:
+            fileName = fileInfo.title
+            
+            if not os.path.splitext(fileName)[1] and defaultExt:
+                fileName = f"{fileName}{defaultExt}"
+            
+            defaultFileName = fileName
         
         initialPath = self.lastDirectory or os.path.expanduser("~")
         if defaultFileName:
@@ -109,172 +133,154 @@ def saveFile(self, savePath=None, encoding=None):
         )
     
     if savePath:
-        # 如果没有提供编码，弹出编码选择对话框
+        # 没有指定编码时沿用文档的编码，只有该编码无法保存当前内容时才让用户选择
         if encoding is None:
-            # 获取当前使用的编码或默认编码
-            current_encoding = getattr(self, 'last_used_encoding', "UTF-8")
-            
-            # 创建并显示自定义编码选择对话框
-            encoding_dialog = EncodingSelectionDialog(self, current_encoding)
-            if encoding_dialog.exec_() == QDialog.Accepted:
-                selected_encoding_name = encoding_dialog.get_selected_encoding()
-                encoding = get_encoding_name_to_python(selected_encoding_name)
-                
-                # 保存编码选择供下次使用
-                self.last_used_encoding = selected_encoding_name
-            else:
-                return False  # 用户取消了编码选择
+            encoding = _document_encoding(self, savePath)
+        
+        self.lastDirectory = os.path.dirname(savePath)
+        currentEditorIndex = self.editorsStack.currentIndex()
+        fileData = self.openFiles.by_editor(currentEditorIndex)
         
+        backup = None
+        if hasattr(self, 'autoBackupManager') and self.autoBackupManager:
+            backup = self.autoBackupManager.create_backup
+        
+        # 编码、备份和写盘在后台进行，编辑器在写入期间可以继续编辑
+        context = {
+            'tabId': fileData.tabId if fileData is not None else None,
+            'editorIndex': currentEditorIndex,
+            'originalPath': fileData.filePath if fileData is not None else None,
+            'revision': self.currentEditor.document().revision(),
+            'start_time': start_time,
+        }
+        # 还没写入的自动保存快照比这次保存旧，不能在之后覆盖
+        if getattr(self, 'autoSaveManager', None):
+            self.autoSaveManager.discard(savePath)
+        # 保持文件原来的换行符
+        newline = fileData.newline if fileData is not None else None
+        get_file_saver(self).save(SaveRequest(savePath, content, encoding, backup, context, newline=newline))
+        return True
+    return False
+
+
+def get_file_saver(self):
+    """获取主窗口的后台文件保存器，首次调用时创建"""
+    saver = getattr(self, 'fileSaver', None)
+    if saver is None:
+        saver = FileSaver(self)
+        saver.saved.connect(lambda savePath, result: _on_file_saved(self, savePath, result))
+        saver.failed.connect(lambda savePath, result: _on_file_save_failed(self, savePath, result))
+        self.fileSaver = saver
+    return saver
+
+
+def _find_saved_file_info(self, context, savePath):
+    """保存请求对应的标签页信息；标签页在写入期间已关闭时返回None"""
+    fileData = self.openFiles.by_tab(context['tabId'])
+    if fileData is not None and fileData.filePath in (context['originalPath'], savePath):
+        return fileData
+    return None
+
+
+def _on_file_saved(self, savePath, result):
+    """后台写入完成：更新标签页信息、窗口标题和文件信息"""
+    context = result.request.context
+    encoding_used = result.encoding
+    ENCODING_CACHE.set(savePath, encoding_used)
+    
+    fileName = os.path.basename(savePath)
+    fileTitle = os.path.splitext(fileName)[0]
+    editorIndex = context['editorIndex']
+    fileData = _find_saved_file_info(self, context, savePath)
+    if fileData is not None:
+        self.openFiles.set_path(fileData, savePath)
+        fileData.title = fileTitle
+        fileData.last_save_time = time.time()
+        fileData.encoding = encoding_used  # 保存使用的编码
+        fileData.newline = result.request.newline or DEFAULT_NEWLINE
+        # 用户主动保存，覆盖外部修改
+        fileData.externalChange = False
+    
+    if hasattr(self, 'autoSaveManager') and self.autoSaveManager:
+        # 写入期间又有编辑时文档仍是已修改状态
+        self.autoSaveManager.file_saved(savePath, context['revision'])
+    
+    if get_file_saver(self).shutting_down:
+        # 退出时由 FileSaver.shutdown 写完的保存：事件循环已结束，只更新状态，不再更新界面或弹出提示
+        print(f"文件已保存: {savePath}")
+        return
+    
+    if fileData is not None:
+        if hasattr(self, 'sidebar') and hasattr(self.sidebar, 'updateTabName'):
+            self.sidebar.updateTabName(self.sidebar.indexOfTab(fileData.tabId), fileTitle, savePath)
+        watcher = get_file_watcher(self)
+        if context['originalPath'] and context['originalPath'] != savePath:
+            watcher.unwatch(context['originalPath'])
+        watcher.watch(savePath)
+    
+    if hasattr(self, 'addToRecentFiles'):
+        self.addToRecentFiles(savePath)
+    
+    # 声明了 content 参数的插件直接拿到保存时的编辑器文本（换行符为 \n，与磁盘上的字节可能不同），不需要重新读取文件
+    if getattr(self, 'plugin_manager', None):
         try:
-            self.lastDirectory = os.path.dirname(savePath)
-            
-            save_dir = os.path.dirname(savePath)
-            if save_dir and not os.path.exists(save_dir):
-                try:
-                    os.makedirs(save_dir)
-                    print(f"创建目录: {save_dir}")
-                except Exception as e:
-                    print(f"创建目录失败: {e}")
-                    warning(self, "保存警告", f"无法创建目录 {save_dir}，将尝试保存到当前位置。")
-            
-            should_backup = False
-            if hasattr(self, 'autoBackupManager') and self.autoBackupManager and os.path.exists(savePath):
-                file_size = os.path.getsize(savePath)
-                if file_size > 10240:
-                    should_backup = True
-                else:
-                    try:
-                        with open(savePath, 'r', encoding='utf-8') as f:
-                            old_content = f.read()
-                        if abs(len(old_content) - content_size) / max(1, len(old_content)) > 0.2:
-                            should_backup = True
-                    except:
-                        should_backup = True
-                
-                if should_backup:
-                    self.autoBackupManager.create_backup(savePath)
-                    print(f"已创建文件备份: {savePath}")
-            
-            temp_path = f"{savePath}.temp"
-            
-            encoding_used = encoding
-            try:
-                with open(temp_path, 'w', encoding=encoding) as f:
-                    f.write(content)
-            except UnicodeEncodeError:
-                error_msg = f"使用 {encoding} 编码保存文件失败，是否尝试使用其他编码？"
-                retry_choice = question(
-                    self, "编码错误", error_msg, HanabiMessageBox.YesNo)
-                
-                if retry_choice == HanabiMessageBox.Yes_Result:
-                    # 递归调用但不指定路径以避免再次弹出文件选择对话框
-                    return self.saveFile(savePath, None)
-                else:
-                    return False
-            
-            if os.path.exists(savePath):
-                try:
-                    os.remove(savePath)
-                except Exception as e:
-                    print(f"删除原文件时出错: {e}")
-            
-            try:
-                os.rename(temp_path, savePath)
-            except Exception as e:
-                print(f"重命名临时文件失败，尝试直接复制: {e}")
-                shutil.copy2(temp_path, savePath)
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
-            
-            self.currentFilePath = savePath
-            fileName = os.path.basename(savePath)
-            fileTitle = os.path.splitext(fileName)[0]
-            
-            suffix = os.path.splitext(fileName)[1].lower()
-            file_type_map = {
-                '.py': 'python',
-                '.txt': 'text',
-                '.md': 'markdown',
-                '.html': 'html',
-                '.htm': 'html',
-                '.css': 'css',
-                '.js': 'javascript',
-                '.ts': 'typescript',
-                '.json': 'json',
-                '.xml': 'xml',
-                '.yaml': 'yaml',
-                '.yml': 'yaml',
-                '.ini': 'ini',
-                '.toml': 'toml',
-                '.c': 'c',
-                '.cpp': 'cpp',
-                '.h': 'c',
-                '.hpp': 'cpp',
-                '.java': 'java',
-                '.cs': 'cs',
-                '.go': 'go',
-                '.rs': 'rust',
-                '.php': 'php',
-                '.sql': 'sql',
-                '.sh': 'bash',
-                '.rb': 'ruby',
-                '.pl': 'perl'
-            }
-            self.currentFileType = file_type_map.get(suffix, 'text')
-            
-            self.setWindowTitle(f"{fileName} - Hanabi Notes")
-            if hasattr(self, 'updateWindowTitle'):
-                self.updateWindowTitle()
-            
-            currentEditorIndex = self.editorsStack.currentIndex()
-            for fileData in self.openFiles:
-                if fileData.get('editorIndex') == currentEditorIndex:
-                    fileData['isModified'] = False
-                    fileData['isVirtual'] = False
-                    fileData['filePath'] = savePath
-                    fileData['title'] = fileTitle
-                    fileData['last_save_time'] = time.time()
-                    fileData['encoding'] = encoding_used  # 保存使用的编码
-                    break
-            
-            if hasattr(self, 'sidebar') and hasattr(self.sidebar, 'updateTabName'):
-                activeTabIndex = self.sidebar.current_tab_index if hasattr(self.sidebar, 'current_tab_index') else -1
-                if activeTabIndex >= 0:
-                    self.sidebar.updateTabName(activeTabIndex, fileTitle, savePath)
-            
-            if hasattr(self, 'autoSaveManager') and self.autoSaveManager:
-                self.autoSaveManager.file_saved(savePath)
-            
-            if hasattr(self, 'addToRecentFiles'):
-                self.addToRecentFiles(savePath)
-            
-            if hasattr(self, 'getFileInfo') and hasattr(self, 'updateFileInfo'):
-                fileInfo = self.getFileInfo(savePath)
-                self.updateFileInfo(fileInfo)
-            
-            if hasattr(self, 'highlightMode') and self.highlightMode and hasattr(self, 'applyHighlighter'):
-                self.applyHighlighter(self.currentEditor)
-            
-            elapsed_time = time.time() - start_time
-            save_speed = content_size / (elapsed_time + 0.001)
-            print(f"文件已保存: {savePath}")
-            print(f"保存性能: {elapsed_time:.3f}秒, {save_speed:.1f} 字符/秒, 使用编码: {encoding_used}")
-            
-            message = f"文件已保存: {fileName}\n大小: {content_size/1024:.1f} KB\n编码: {encoding_used}"
-            information(self, "保存成功", message)
-            
-            return True
+            self.plugin_manager.trigger_hook('file_saved', savePath, optional={'content': result.request.content})
         except Exception as e:
-            if hasattr(self, 'logError'):
-                self.logError(f"保存文件出错: {str(e)}")
-            else:
-                print(f"保存文件出错: {str(e)}")
-                import traceback
-                traceback.print_exc()
-            
-            error_message = f"无法保存文件: {str(e)}\n路径: {savePath}"
-            critical(self, "保存失败", error_message)
-            return False
-    return False
\ No newline at end of file
+            print(f"触发插件钩子时出错: {e}")
+    
+    # 只有仍在显示的标签页需要更新窗口标题、文件类型和高亮
+    if fileData is not None and self.editorsStack.currentIndex() == editorIndex:
+        self.currentFilePath = savePath
+        
+        # 与打开、切换标签页共用检测缓存；新写入的文件修改时间已变化，会重新检测一次
+        from Aya_Hanabi.Hanabi_HighLight import detect_file_type
+        self.currentFileType = detect_file_type(savePath)
+        
+        self.setWindowTitle(f"{fileName} - Hanabi Notes")
+        if hasattr(self, 'updateWindowTitle'):
+            self.updateWindowTitle()
+        
+        if hasattr(self, 'getFileInfo') and hasattr(self, 'updateFileInfo'):
+            fileInfo = self.getFileInfo(savePath)
+            self.updateFileInfo(fileInfo)
+        
+        if hasattr(self, 'highlightMode') and self.highlightMode and hasattr(self, 'applyHighlighter'):
+            self.applyHighlighter(self.currentEditor, self.currentFileType)
+    
+    content_size = len(result.request.content)
+    elapsed_time = time.time() - context['start_time']
+    print(f"文件已保存: {savePath}")
+    print(f"保存性能: 总计 {elapsed_time:.3f}秒, 写入 {result.elapsed:.3f}秒, "
+          f"{result.size / 1024:.1f} KB, 使用编码: {encoding_used}")
+    
+    message = f"文件已保存: {fileName}\n大小: {content_size/1024:.1f} KB\n编码: {encoding_used}"
+    information(self, "保存成功", message)
+
+
+def _on_file_save_failed(self, savePath, result):
+    """后台写入失败：编码无法表示内容时让用户换一种编码，用同一份快照重新提交"""
+    if get_file_saver(self).shutting_down:
+        # 退出时无法再询问用户，未保存的内容仍由编辑日志保留
+        print(f"退出时保存文件失败: {savePath}: {result.error}")
+        return
+    if result.encoding_error:
+        error_msg = f"使用 {result.encoding} 编码保存文件失败，是否尝试使用其他编码？"
+        retry_choice = question(
+            self, "编码错误", error_msg, HanabiMessageBox.YesNo)
+        if retry_choice != HanabiMessageBox.Yes_Result:
+            return
+        new_encoding = _ask_encoding(self, result.encoding)
+        if new_encoding is None:
+            return
+        request = result.request
+        get_file_saver(self).save(SaveRequest(savePath, request.content, new_encoding, request.backup, request.context,
+                                              newline=request.newline))
+        return
+    
+    if hasattr(self, 'logError'):
+        self.logError(f"保存文件出错: {result.error}")
+    else:
+        print(f"保存文件出错: {result.error}")
+    
+    error_message = f"无法保存文件: {result.error}\n路径: {savePath}"
+    critical(self, "保存失败", error_message)
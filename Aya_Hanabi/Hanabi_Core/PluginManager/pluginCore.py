@@ -241,7 +241,7 @@ class PluginHooks:
     
     # 文件操作钩子
     FILE_OPENED = "file_opened"  # 文件打开后
-    FILE_SAVED = "file_saved"  # 文件保存后
+    FILE_SAVED = "file_saved"  # 文件保存后，参数为 (文件路径)；钩子函数声明了 content 参数时另外传入保存时编辑器文本的快照（换行符为 \n，不是写入磁盘的字节）
     FILE_CLOSED = "file_closed"  # 文件关闭后
     FILE_CREATED = "file_created"  # 文件创建后
     FILE_DELETED = "file_deleted"  # 文件删除后
@@ -7,6 +7,7 @@ import os
 import sys
 import json
 import logging
+import inspect
 import importlib.util
 import traceback
 from typing import Dict, List, Any, Callable, Type, Optional, Set
@@ -19,6 +20,18 @@ from .pluginCore import (
 )
 
 
+
+def _accepts_keyword(callback: Callable, name: str) -> bool:
+    """钩子函数能否接受名为 name 的关键字参数"""
+    try:
+        parameters = inspect.signature(callback).parameters
+    except (TypeError, ValueError):
+        return False
+    parameter = parameters.get(name)
+    if parameter is not None:
+        return parameter.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+    return any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values())
+
 class PluginManager:
     """插件管理器类，负责管理所有插件的生命周期"""
     
@@ -375,12 +388,14 @@ class PluginManager:
         
         return True
     
-    def trigger_hook(self, hook_name: str, *args, **kwargs) -> List[Any]:
+    def trigger_hook(self, hook_name: str, *args, optional: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
         """触发钩子
         
         Args:
             hook_name: 钩子名称
             *args, **kwargs: 传递给钩子的参数
+            optional: 可选的关键字参数，只传给声明了同名参数（或 **kwargs）的钩子函数，
+                旧插件的钩子函数签名不需要改变
             
         Returns:
             List[Any]: 钩子函数的返回值列表
@@ -395,7 +410,12 @@ class PluginManager:
                     
                     # 检查插件是否启用
                     if plugin_id in self.enabled_plugins:
-                        result = callback(*args, **kwargs)
+                        call_kwargs = kwargs
+                        if optional:
+                            call_kwargs = dict(kwargs)
+                            call_kwargs.update((name, value) for name, value in optional.items()
+                                               if _accepts_keyword(callback, name))
+                        result = callback(*args, **call_kwargs)
                         results.append(result)
                 except Exception as e:
                     logging.error(f"执行钩子时出错 {hook_name} (插件: {hook.get('plugin_id')}): {e}")
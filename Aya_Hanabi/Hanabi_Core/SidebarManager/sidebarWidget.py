@@ -111,9 +111,11 @@ class ActionButton(QPushButton):
 class TabButton(QPushButton):
     closeRequested = Signal(int)
     
-    def __init__(self, index, iconName="description", parent=None):
+    def __init__(self, index, iconName="description", parent=None, tabId=None):
         super().__init__(parent)
+        # index 是当前位置，关闭前面的标签页后会变化；tabId 在标签页存在期间不变
         self.index = index
+        self.tabId = tabId
         self.fileName = "未命名"
         self.filePath = None
         self.isActive = False
@@ -413,6 +415,8 @@ class SidebarWidget(QWidget):
         self.tabScrollArea.setWidget(self.tabContainer)
         
         self.tabs = []
+        self.tabsById = {}  # 标签页 ID -> 标签按钮
+        self._nextTabId = 0
         self.tab_count = 0  # 初始化标签计数
         self.current_tab_index = -1
         
@@ -505,15 +509,13 @@ class SidebarWidget(QWidget):
     
     def addTab(self, fileName, filePath=None):
         index = len(self.tabs)
-        tabButton = TabButton(index)
+        tabButton = TabButton(index, tabId=self._nextTabId)
+        self._nextTabId += 1
         tabButton.setFileName(fileName)
         tabButton.setFilePath(filePath)
         
-        # 设置按钮点击事件
-        def create_activate_handler(idx):
-            return lambda: self.activateTab(idx, True)
-            
-        tabButton.clicked.connect(create_activate_handler(index))
+        # 设置按钮点击事件，按点击时的位置激活（关闭前面的标签页后位置会变化）
+        tabButton.clicked.connect(lambda: self.activateTab(tabButton.index, True))
         
         # 设置中键关闭事件
         tabButton.closeRequested.connect(self.closeTab)
@@ -523,6 +525,7 @@ class SidebarWidget(QWidget):
             tabButton.updateStyle(self.window().themeManager)
         
         self.tabs.append(tabButton)
+        self.tabsById[tabButton.tabId] = tabButton
         self.tab_layout.addWidget(tabButton, 0, Qt.AlignCenter)
         self.tab_count = len(self.tabs)  # 更新标签页计数
         
@@ -601,6 +604,7 @@ class SidebarWidget(QWidget):
             # 从列表中移除
             filePath = self.tabs[index].filePath
             self.tabs.pop(index)
+            self.tabsById.pop(tab_to_remove.tabId, None)
             self.tab_count -= 1
             
             # 调整剩余标签的索引
@@ -620,6 +624,20 @@ class SidebarWidget(QWidget):
             if filePath:
                 self.fileClosed.emit(filePath)
     
+    def tabIdAt(self, index):
+        """指定位置的标签页 ID，位置无效时返回 None"""
+        if 0 <= index < len(self.tabs):
+            return self.tabs[index].tabId
+        return None
+    
+    def currentTabId(self):
+        return self.tabIdAt(self.current_tab_index)
+    
+    def indexOfTab(self, tabId):
+        """标签页 ID 对应的当前位置，标签页已关闭时返回 -1"""
+        tabButton = self.tabsById.get(tabId)
+        return tabButton.index if tabButton is not None else -1
+    
     def updateTabName(self, index, fileName, filePath=None):
         if 0 <= index < len(self.tabs):
             tabButton = self.tabs[index]
@@ -632,6 +650,7 @@ class SidebarWidget(QWidget):
             tabButton = self.tabs[self.current_tab_index]
             return {
                 'index': self.current_tab_index,
+                'tabId': tabButton.tabId,
                 'fileName': tabButton.fileName,
                 'filePath': tabButton.filePath
             }
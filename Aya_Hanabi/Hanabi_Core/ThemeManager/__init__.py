@@ -89,10 +89,10 @@ class ThemeManager:
         return self.current_theme.get("scrollbar.style", "")
         
     def get_highlight_colors(self):
-        """获取高亮颜色"""
+        """获取高亮调色板（可按 line_color, flash_color 解包）"""
+        from Aya_Hanabi.Hanabi_HighLight.palette import HighlightPalette
         if not self.current_theme:
-            from PySide6.QtGui import QColor
-            return QColor(107, 159, 255, 60), QColor(107, 159, 255, 120)
+            return HighlightPalette(self.current_theme_name, self.current_theme_name == "light")
         
         from PySide6.QtGui import QColor
         line_color_str = self.current_theme.get("highlight.line_color", "rgba(107, 159, 255, 60)")
@@ -109,7 +109,8 @@ class ThemeManager:
             else:
                 return QColor(color_str)
         
-        return parse_color(line_color_str), parse_color(flash_color_str)
+        return HighlightPalette.from_theme(self.current_theme, self.current_theme_name,
+                                           parse_color(line_color_str), parse_color(flash_color_str))
         
     def get_preview_styles(self):
         """获取预览样式"""
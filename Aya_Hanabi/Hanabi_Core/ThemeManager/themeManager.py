@@ -806,8 +806,14 @@ class ThemeManager:
             """
     
     def get_highlight_colors(self):
+        """
+        获取高亮调色板（HighlightPalette）
+        
+        包含语法高亮配色和当前行/闪烁颜色，仍可按 line_color, flash_color = ... 解包
+        """
+        from Aya_Hanabi.Hanabi_HighLight.palette import HighlightPalette
         if not self.current_theme:
-            return (QColor(107, 159, 255, 60), QColor(107, 159, 255, 120))
+            return HighlightPalette(self.current_theme_name, self.current_theme_name == "light")
         
         line_color_str = self.current_theme.get("highlight.line_color", "rgba(107, 159, 255, 60)")
         flash_color_str = self.current_theme.get("highlight.flash_color", "rgba(107, 159, 255, 120)")
@@ -826,7 +832,7 @@ class ThemeManager:
         line_color = parse_rgba(line_color_str)
         flash_color = parse_rgba(flash_color_str)
         
-        return line_color, flash_color
+        return HighlightPalette.from_theme(self.current_theme, self.current_theme_name, line_color, flash_color)
 
     def get_editor_font_settings(self):
         """获取编辑器字体设置"""
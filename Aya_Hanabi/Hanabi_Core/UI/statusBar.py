@@ -131,6 +131,19 @@ class StatusBar(QWidget):
         rightLayout.setContentsMargins(0, 0, 0, 0)
         rightLayout.setSpacing(15)
         
+        # 临时消息（如自动保存失败），显示一段时间后隐藏
+        self.messageLabel = QLabel("")
+        self.messageLabel.setVisible(False)
+        rightLayout.addWidget(self.messageLabel)
+        self.messageTimer = QTimer(self)
+        self.messageTimer.setSingleShot(True)
+        self.messageTimer.timeout.connect(lambda: self.messageLabel.setVisible(False))
+        
+        # 后台任务进度显示（如语法高亮），空闲时隐藏
+        self.taskProgressLabel = QLabel("")
+        self.taskProgressLabel.setVisible(False)
+        rightLayout.addWidget(self.taskProgressLabel)
+        
         # 光标位置显示
         self.cursorPositionLabel = QLabel("第1行 第1列")
         self.cursorPositionLabel.setToolTip("当前光标位置")
@@ -218,6 +231,8 @@ class StatusBar(QWidget):
             self.lineCount.setStyleSheet(status_label_style)
             self.fileTypeLabel.setStyleSheet(status_label_style)
             self.cursorPositionLabel.setStyleSheet(status_label_style)
+            self.taskProgressLabel.setStyleSheet(status_label_style)
+            self.messageLabel.setStyleSheet(status_label_style)
         else:
             # 如果没有主题管理器，则使用 ThemeManager 中的默认主题
             try:
@@ -265,6 +280,8 @@ class StatusBar(QWidget):
                 self.lineCount.setStyleSheet(status_label_style)
                 self.fileTypeLabel.setStyleSheet(status_label_style)
                 self.cursorPositionLabel.setStyleSheet(status_label_style)
+                self.taskProgressLabel.setStyleSheet(status_label_style)
+                self.messageLabel.setStyleSheet(status_label_style)
             except Exception as e:
                 print(f"使用默认主题管理器时出错: {e}")
                 log_to_file(f"使用默认主题管理器时出错: {e}")
@@ -301,6 +318,24 @@ class StatusBar(QWidget):
         self.cursorPositionLabel.setText(f"第{line}行 第{column}列")
         print(f"状态栏更新光标位置: 第{line}行 第{column}列")
     
+    def showMessage(self, message, timeout=5000):
+        """显示临时消息，timeout 毫秒后自动隐藏"""
+        self.messageLabel.setText(message)
+        self.messageLabel.setToolTip(message)
+        self.messageLabel.setVisible(True)
+        self.messageTimer.start(timeout)
+    
+    def updateTaskProgress(self, taskName, done, total):
+        """更新后台任务进度显示，完成后自动隐藏"""
+        if total <= 0 or done >= total:
+            self.taskProgressLabel.setVisible(False)
+            self.taskProgressLabel.setText("")
+            return
+        
+        percent = int(done * 100 / total)
+        self.taskProgressLabel.setText(f"{taskName} {percent}%")
+        self.taskProgressLabel.setVisible(True)
+    
     def openSettings(self):
         # 使用类级别的标志来防止递归
         if StatusBar._settings_opening:
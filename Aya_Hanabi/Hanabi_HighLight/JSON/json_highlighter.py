@@ -1,12 +1,53 @@
-import re
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
 from PySide6.QtGui import QColor, QFont, QTextCharFormat
 from .. import BaseHighlighter, log_highlight_error
+from .json_scanner import JSON_SCANNER, validate_json
+
+# 文档停止变化后多久开始后台校验（毫秒）
+VALIDATE_DELAY_MS = 300
+
+class _ValidateSignals(QObject):
+    finished = Signal(int, object)  # 文档版本, [(起始位置, 长度, 错误信息), ...]
+
+class _ValidateTask(QRunnable):
+    """在线程池中流式校验整篇文档"""
+    def __init__(self, text, revision):
+        super().__init__()
+        self.text = text
+        self.revision = revision
+        self.signals = _ValidateSignals()
+
+    def run(self):
+        try:
+            errors = validate_json(self.text)
+        except Exception as e:
+            log_highlight_error(f"JSON校验出错: {e}")
+            errors = []
+        self.signals.finished.emit(self.revision, errors)
 
 class JSONHighlighter(BaseHighlighter):
-    def __init__(self, document, is_light_theme=False):
-        super().__init__(document, is_light_theme)
-        # 设置JSON特定的属性
-        self.multiline_comment_start = False  # 跟踪多行注释状态
+    tokenizer = JSON_SCANNER
+    language_name = "JSON"
+    file_type = "json"
+
+    def __init__(self, document, is_light_theme=False, palette=None):
+        super().__init__(document, is_light_theme, palette)
+        # 语法错误标记：{块号: [(列, 长度), ...]}，由后台校验结果生成
+        self.error_markers = {}
+        # 最近一次校验的错误列表：[(块号, 列, 错误信息), ...]
+        self.validation_errors = []
+        self._validated_revision = -1
+        self._validate_task = None
+        self._validate_timer = QTimer(self)
+        self._validate_timer.setSingleShot(True)
+        self._validate_timer.setInterval(VALIDATE_DELAY_MS)
+        self._validate_timer.timeout.connect(self._start_validation)
+        # 被校验的文档：绑定的文档，或后台高亮时 watch_markers 传入的文档
+        self._marker_document = None
+        # 后台高亮时标记变化的回调，为 None 时直接重新高亮绑定文档中的块
+        self._markers_changed = None
+        if document is not None:
+            self._watch_document(document)
     
     def _init_formats(self):
         # 基于亮暗主题选择合适的颜色
@@ -35,168 +76,81 @@ class JSONHighlighter(BaseHighlighter):
             self.formats['escape'] = self._create_format('#D7BA7D')  # 金色转义字符
             self.formats['property_value'] = self._create_format('#9CDCFE')  # 浅蓝色属性值
     
-    def highlightBlock(self, text):
-        try:
-            # 处理多行注释状态
-            self._handle_multiline_comments(text)
-            
-            # 如果当前行在多行注释内，直接返回
-            if self.multiline_comment_start:
-                return
-                
-            # 处理单行注释 (// 和 #)
-            self._highlight_single_line_comments(text)
-            
-            # 匹配JSON键（支持嵌套键和特殊字符）
-            key_pattern = r'(?<!\\)"((?:\\"|[^"])+?)"(?=\s*:)'
-            for match in re.finditer(key_pattern, text):
-                # 确保不在注释内
-                if not self._is_in_comment(text, match.start()):
-                    self.setFormat(match.start(), match.end() - match.start(), self.formats['key'])
-                    # 高亮转义字符
-                    self._highlight_escapes(text, match.start(), match.end())
-            
-            # 匹配JSON字符串值（支持转义字符和特殊字符）
-            string_pattern = r'(?<!\\)"(?:\\"|\\\\|\\\/|\\b|\\f|\\n|\\r|\\t|\\u[0-9a-fA-F]{4}|[^"\\])*"'
-            for match in re.finditer(string_pattern, text):
-                # 排除键部分且确保不在注释内
-                if not re.search(r'\s*:\s*$', text[:match.start()]) and not self._is_in_comment(text, match.start()):
-                    self.setFormat(match.start(), match.end() - match.start(), self.formats['string'])
-                    # 高亮转义字符
-                    self._highlight_escapes(text, match.start(), match.end())
-            
-            # 匹配JSON数字（支持科学计数法、十六进制和负数）
-            number_pattern = r'(?<!\w)(-?(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?))(?!\w)'
-            for match in re.finditer(number_pattern, text):
-                if not self._is_in_comment(text, match.start()):
-                    self.setFormat(match.start(), match.end() - match.start(), self.formats['number'])
-            
-            # 匹配JSON布尔值
-            boolean_pattern = r'(?<!\w)(true|false)(?!\w)'
-            for match in re.finditer(boolean_pattern, text):
-                if not self._is_in_comment(text, match.start()):
-                    self.setFormat(match.start(), match.end() - match.start(), self.formats['boolean'])
-            
-            # 匹配JSON null
-            null_pattern = r'(?<!\w)(null)(?!\w)'
-            for match in re.finditer(null_pattern, text):
-                if not self._is_in_comment(text, match.start()):
-                    self.setFormat(match.start(), match.end() - match.start(), self.formats['null'])
-            
-            # 匹配JSON标点符号
-            punctuation_pattern = r'[\[\]\{\}:,]'
-            for match in re.finditer(punctuation_pattern, text):
-                if not self._is_in_comment(text, match.start()):
-                    self.setFormat(match.start(), match.end() - match.start(), self.formats['punctuation'])
-            
-            # 检测并高亮JSON语法错误
-            self._highlight_syntax_errors(text)
-                
-        except Exception as e:
-            log_highlight_error(f"JSON语法高亮出错: {e}")
+    def _derive_formats(self):
+        # 错误标记使用波浪下划线，叠加在原有颜色上也容易辨认
+        error_format = self.formats['error']
+        error_format.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+        error_format.setUnderlineColor(error_format.foreground().color())
+    
+    def block_markers(self, block_number, length):
+        markers = self.error_markers.get(block_number)
+        if not markers:
+            return ()
+        result = []
+        for start, marker_length in markers:
+            if start < length:
+                result.append((start, min(marker_length, length - start), 'error'))
+            else:
+                # 行尾缺失内容时标记最后一个字符
+                result.append((max(0, length - 1), 1, 'error'))
+        return result
     
-    def _highlight_escapes(self, text, start, end):
-        """高亮字符串中的转义序列"""
-        escape_pattern = r'\\(?:["\\\/bfnrt]|u[0-9a-fA-F]{4})'
-        for match in re.finditer(escape_pattern, text[start:end]):
-            esc_start = start + match.start()
-            esc_length = match.end() - match.start()
-            self.setFormat(esc_start, esc_length, self.formats['escape'])
+    def watch_markers(self, document, callback):
+        if self._marker_document is not None:
+            try:
+                self._marker_document.contentsChange.disconnect(self._on_contents_change)
+            except (RuntimeError, TypeError):
+                pass
+            self._marker_document = None
+            self._validate_timer.stop()
+        self._markers_changed = callback
+        if document is not None:
+            self._watch_document(document)
     
-    def _highlight_single_line_comments(self, text):
-        """高亮单行注释 (// 和 #)"""
-        # 匹配 // 注释
-        comment_pattern = r'//.*$'
-        match = re.search(comment_pattern, text)
-        if match:
-            self.setFormat(match.start(), match.end() - match.start(), self.formats['comment'])
-            return True
-        
-        # 匹配 # 注释
-        comment_pattern = r'#.*$'
-        match = re.search(comment_pattern, text)
-        if match:
-            self.setFormat(match.start(), match.end() - match.start(), self.formats['comment'])
-            return True
-        
-        return False
+    def _watch_document(self, document):
+        self._marker_document = document
+        self._validated_revision = -1
+        document.contentsChange.connect(self._on_contents_change)
+        self._validate_timer.start()
     
-    def _handle_multiline_comments(self, text):
-        """处理多行注释 /* ... */"""
-        # 如果已经在多行注释中
-        if self.multiline_comment_start:
-            end_index = text.find('*/')
-            if end_index != -1:
-                # 找到注释结束标记
-                self.setFormat(0, end_index + 2, self.formats['comment'])
-                self.multiline_comment_start = False
-                # 处理注释后的剩余文本
-                if end_index + 2 < len(text):
-                    remaining_text = text[end_index + 2:]
-                    # 递归处理剩余文本
-                    self.highlightBlock(remaining_text)
-            else:
-                # 整行都是注释
-                self.setFormat(0, len(text), self.formats['comment'])
-            return True
-        
-        # 检查是否有新的多行注释开始
-        start_index = text.find('/*')
-        if start_index != -1:
-            end_index = text.find('*/', start_index)
-            if end_index != -1:
-                # 单行内完整的多行注释
-                self.setFormat(start_index, end_index - start_index + 2, self.formats['comment'])
-            else:
-                # 多行注释开始但没有结束
-                self.setFormat(start_index, len(text) - start_index, self.formats['comment'])
-                self.multiline_comment_start = True
-            return True
-        
-        return False
+    def _on_contents_change(self, position, chars_removed, chars_added):
+        if self._marker_document is not None:
+            self._validate_timer.start()
     
-    def _is_in_comment(self, text, position):
-        """检查位置是否在注释内"""
-        # 检查是否在 // 注释内
-        slash_pos = text.find('//', 0, position)
-        if slash_pos != -1:
-            return True
-        
-        # 检查是否在 # 注释内
-        hash_pos = text.find('#', 0, position)
-        if hash_pos != -1:
-            return True
-        
-        return False
+    def _start_validation(self):
+        document = self._marker_document
+        # 仅格式变化（markContentsDirty）不会改变版本号，无需重新校验
+        if document is None or document.revision() == self._validated_revision:
+            return
+        task = _ValidateTask(document.toPlainText(), document.revision())
+        task.signals.finished.connect(self._on_validated)
+        self._validate_task = task
+        QThreadPool.globalInstance().start(task)
     
-    def _highlight_syntax_errors(self, text):
-        """检测并高亮基本的JSON语法错误"""
-        # 检查未闭合的引号
-        quote_count = text.count('"') - text.count('\\"')
-        if quote_count % 2 != 0:
-            # 找到最后一个非转义引号
-            last_quote = -1
-            i = 0
-            while i < len(text):
-                if text[i] == '"' and (i == 0 or text[i-1] != '\\'):
-                    last_quote = i
-                i += 1
-            
-            if last_quote != -1:
-                # 高亮未闭合的引号
-                self.setFormat(last_quote, 1, self.formats['error'])
+    def _on_validated(self, revision, errors):
+        document = self._marker_document
+        if document is None or revision != document.revision():
+            return
+        self._validated_revision = revision
+        self._validate_task = None
+        
+        markers = {}
+        validation_errors = []
+        for position, length, message in errors:
+            block = document.findBlock(position)
+            if not block.isValid():
+                block = document.lastBlock()
+            column = max(0, position - block.position())
+            markers.setdefault(block.blockNumber(), []).append((column, length))
+            validation_errors.append((block.blockNumber(), column, message))
         
-        # 检查未闭合的括号
-        for bracket_pair in [('{', '}'), ('[', ']')]:
-            open_count = text.count(bracket_pair[0])
-            close_count = text.count(bracket_pair[1])
-            if open_count > close_count:
-                # 有未闭合的开括号
-                last_open = text.rfind(bracket_pair[0])
-                if last_open != -1:
-                    self.setFormat(last_open, 1, self.formats['error'])
-            elif close_count > open_count:
-                # 有未闭合的闭括号
-                first_close = text.find(bracket_pair[1])
-                if first_close != -1:
-                    self.setFormat(first_close, 1, self.formats['error'])
\ No newline at end of file
+        changed_blocks = set(self.error_markers) | set(markers)
+        self.error_markers = markers
+        self.validation_errors = validation_errors
+        if self._markers_changed is not None:
+            self._markers_changed(sorted(changed_blocks))
+            return
+        for block_number in sorted(changed_blocks):
+            block = document.findBlockByNumber(block_number)
+            if block.isValid():
+                self.rehighlightBlock(block)
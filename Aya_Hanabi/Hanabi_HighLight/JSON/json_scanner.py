@@ -0,0 +1,253 @@
+import re
+
+# JSON / JSONC 手写扫描器
+# 按首字符分派，每个 token 只用锚定在当前位置的小正则或 str.find 取得结尾，
+# 整行只向前扫描一遍，对单行数 MB 的压缩 JSON 也保持线性时间。
+
+# 块状态：0 普通内容，1 处于 /* */ 多行注释内
+STATE_NORMAL = 0
+STATE_BLOCK_COMMENT = 1
+
+# 校验器最多报告的错误数量，避免损坏的大文件产生海量标记
+MAX_ERRORS = 100
+
+_WHITESPACE_RE = re.compile(r'[ \t\r\n]+')
+# 字符串：分组 close 为空表示字符串没有闭合
+_STRING_RE = re.compile(r'"(?:[^"\\\n]|\\.)*(?P<close>"?)')
+_NUMBER_RE = re.compile(r'-?(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)')
+_WORD_RE = re.compile(r'[A-Za-z0-9_$]+')
+_ESCAPE_RE = re.compile(r'\\(?:["\\\/bfnrt]|u[0-9a-fA-F]{4})')
+
+_PUNCTUATION = frozenset('{}[]:,')
+_NUMBER_START = frozenset('-0123456789')
+_LITERALS = {'true': 'boolean', 'false': 'boolean', 'null': 'null'}
+# 出现了不符合期望的 token 时的错误信息
+_UNEXPECTED_MESSAGES = {
+    'key': "此处应为键",
+    'colon': "缺少冒号",
+    'comma': "缺少逗号",
+    'end': "多余的内容",
+}
+
+
+class JsonScanner:
+    """
+    JSON/JSONC 行扫描器，接口与 Tokenizer 相同
+
+    产出的 token 类型：key、string、escape、number、boolean、null、punctuation、comment
+    """
+
+    def tokenize(self, text, state=STATE_NORMAL, offset=0):
+        """对一行文本分词，返回 (tokens, 结束状态)"""
+        tokens = []
+        append = tokens.append
+        length = len(text)
+        pos = 0
+
+        if state == STATE_BLOCK_COMMENT:
+            end = text.find('*/')
+            if end == -1:
+                if length:
+                    append((offset, length, 'comment'))
+                return tokens, STATE_BLOCK_COMMENT
+            pos = end + 2
+            append((offset, pos, 'comment'))
+            state = STATE_NORMAL
+
+        while pos < length:
+            ch = text[pos]
+
+            if ch in ' \t\r':
+                pos = _WHITESPACE_RE.match(text, pos).end()
+
+            elif ch == '"':
+                end = _STRING_RE.match(text, pos).end()
+                # 字符串后（跳过空白）紧跟冒号的是键
+                after = end
+                if after < length and text[after] in ' \t\r':
+                    after = _WHITESPACE_RE.match(text, after).end()
+                kind = 'key' if after < length and text[after] == ':' else 'string'
+                append((pos + offset, end - pos, kind))
+                if '\\' in text[pos:end]:
+                    for escape in _ESCAPE_RE.finditer(text, pos, end):
+                        append((escape.start() + offset, escape.end() - escape.start(), 'escape'))
+                pos = end
+
+            elif ch in _PUNCTUATION:
+                append((pos + offset, 1, 'punctuation'))
+                pos += 1
+
+            elif ch in _NUMBER_START:
+                match = _NUMBER_RE.match(text, pos)
+                if match is None:
+                    pos += 1
+                    continue
+                end = match.end()
+                # 数字后面紧跟字母数字时视为普通单词（例如 123abc）
+                if end < length and (text[end].isalnum() or text[end] == '_'):
+                    pos = _WORD_RE.match(text, pos).end() if ch != '-' else pos + 1
+                    continue
+                append((pos + offset, end - pos, 'number'))
+                pos = end
+
+            elif ch == '/' and pos + 1 < length and text[pos + 1] == '/':
+                append((pos + offset, length - pos, 'comment'))
+                break
+
+            elif ch == '/' and pos + 1 < length and text[pos + 1] == '*':
+                end = text.find('*/', pos + 2)
+                if end == -1:
+                    append((pos + offset, length - pos, 'comment'))
+                    state = STATE_BLOCK_COMMENT
+                    break
+                append((pos + offset, end + 2 - pos, 'comment'))
+                pos = end + 2
+
+            elif ch == '#':
+                append((pos + offset, length - pos, 'comment'))
+                break
+
+            elif ch.isalpha() or ch == '_' or ch == '$':
+                end = _WORD_RE.match(text, pos).end()
+                kind = _LITERALS.get(text[pos:end])
+                if kind is not None:
+                    append((pos + offset, end - pos, kind))
+                pos = end
+
+            else:
+                pos += 1
+
+        return tokens, state
+
+
+JSON_SCANNER = JsonScanner()
+
+
+def validate_json(text, max_errors=MAX_ERRORS):
+    """
+    流式校验整篇 JSON/JSONC 文本
+
+    允许注释和结尾多余的逗号（JSONC），只向前扫描一遍。
+    返回错误列表 [(起始位置, 长度, 错误信息), ...]
+    """
+    errors = []
+    # 容器栈：[(括号字符, 位置), ...]
+    stack = []
+    # 期望的下一个 token：value、key、colon、comma、end（顶层值已结束）
+    expect = 'value'
+    pos = 0
+    length = len(text)
+
+    def report(start, size, message):
+        if len(errors) < max_errors:
+            errors.append((start, max(1, size), message))
+
+    def after_value():
+        return 'comma' if stack else 'end'
+
+    while pos < length and len(errors) < max_errors:
+        ch = text[pos]
+
+        if ch in ' \t\r\n':
+            pos = _WHITESPACE_RE.match(text, pos).end()
+            continue
+
+        # 注释
+        if ch == '#' or (ch == '/' and text.startswith('//', pos)):
+            end = text.find('\n', pos)
+            pos = length if end == -1 else end
+            continue
+        if ch == '/' and text.startswith('/*', pos):
+            end = text.find('*/', pos + 2)
+            if end == -1:
+                report(pos, 2, "多行注释没有闭合")
+                break
+            pos = end + 2
+            continue
+
+        start = pos
+        if ch == '"':
+            match = _STRING_RE.match(text, pos)
+            pos = match.end()
+            if not match.group('close'):
+                report(start, 1, "字符串没有闭合")
+            if expect == 'key':
+                expect = 'colon'
+            elif expect == 'value':
+                expect = after_value()
+            elif expect == 'comma':
+                report(start, 1, _UNEXPECTED_MESSAGES['comma'])
+                expect = 'colon' if stack[-1][0] == '{' else after_value()
+            else:
+                report(start, pos - start, _UNEXPECTED_MESSAGES[expect])
+                expect = after_value()
+            continue
+
+        if ch in '{[':
+            pos += 1
+            if expect != 'value':
+                report(start, 1, _UNEXPECTED_MESSAGES[expect])
+            stack.append((ch, start))
+            expect = 'key' if ch == '{' else 'value'
+            continue
+
+        if ch in '}]':
+            pos += 1
+            opener = '{' if ch == '}' else '['
+            if stack and stack[-1][0] == opener:
+                if expect == 'colon' or (expect == 'value' and opener == '{'):
+                    report(start, 1, "缺少值")
+                stack.pop()
+                expect = after_value()
+            elif any(item[0] == opener for item in stack):
+                # 中间有未闭合的容器，逐个报告后恢复到匹配的层级
+                while stack and stack[-1][0] != opener:
+                    report(stack[-1][1], 1, "括号没有闭合")
+                    stack.pop()
+                stack.pop()
+                expect = after_value()
+            else:
+                report(start, 1, "多余的闭合括号")
+            continue
+
+        if ch == ':':
+            pos += 1
+            if expect == 'colon':
+                expect = 'value'
+            else:
+                report(start, 1, "多余的冒号")
+            continue
+
+        if ch == ',':
+            pos += 1
+            if expect == 'comma':
+                expect = 'key' if stack[-1][0] == '{' else 'value'
+            else:
+                report(start, 1, "多余的逗号")
+            continue
+
+        # 数字或字面量
+        if ch in _NUMBER_START:
+            match = _NUMBER_RE.match(text, pos)
+            pos = match.end() if match else pos + 1
+            # 紧跟的字母数字一并视为同一个无效值（例如 12abc）
+            trailing = _WORD_RE.match(text, pos)
+            valid = match is not None and trailing is None
+            if trailing is not None:
+                pos = trailing.end()
+        else:
+            match = _WORD_RE.match(text, pos)
+            pos = match.end() if match else pos + 1
+            valid = text[start:pos] in _LITERALS
+
+        if not valid:
+            report(start, pos - start, "无效的值")
+        elif expect != 'value':
+            report(start, pos - start, _UNEXPECTED_MESSAGES[expect])
+        if expect in ('value', 'key', 'colon'):
+            expect = after_value()
+
+    for opener, position in reversed(stack):
+        report(position, 1, "括号没有闭合")
+
+    return errors
@@ -1,11 +1,114 @@
 import re
-from PySide6.QtGui import QColor, QFont, QTextCharFormat
-from .. import BaseHighlighter, log_highlight_error
+import threading
+from .. import BaseHighlighter, Tokenizer, TokenRule, log_highlight_error
+
+# 块状态：0 普通段落，低 8 位为 1 表示处于代码块内
+# 代码块内的状态同时记录嵌入语言和该语言自身的状态：
+#   STATE_CODE_BLOCK | (语言序号 << 8) | (嵌入语言状态 << 16)
+# 语言序号为 0 表示没有语言标记或不支持的语言，整块使用 code 格式
+STATE_NORMAL = 0
+STATE_CODE_BLOCK = 1
+_FENCE_MASK = 0xFF
+_LANGUAGE_SHIFT = 8
+_INNER_SHIFT = 16
+# 块状态是 32 位整数，嵌入语言数量和其内部状态都要有上限
+MAX_EMBEDDED_LANGUAGES = 255
+MAX_INNER_STATE = 0x7FFF
+
+# 代码块围栏及其语言标记，例如 ```python、~~~ {.json}
+_FENCE_RE = re.compile(r'^\s*(?:```|~~~)\s*\{?\.?(?P<lang>[\w+#-]*)')
+
+# 标题级别对应的字号增量
+HEADER_SIZE_DELTA = {1: 4, 2: 3, 3: 2, 4: 1, 5: 0, 6: 0}
+
+MARKDOWN_TOKENIZER = Tokenizer({
+    STATE_NORMAL: [
+        # 代码块开始 (``` 或 ~~~)，高亮标记和语言名称
+        TokenRule(None, r'^\s*(?P<fence>```|~~~)(?P<lang>.*)$',
+                  groups={'fence': 'code', 'lang': 'code'}, next_state=STATE_CODE_BLOCK),
+        # 标题 (# 标题)：整行着色后继续识别行内元素
+        TokenRule('header1', r'^(?P<mark>#\s+).*', resume='mark'),
+        TokenRule('header2', r'^(?P<mark>##\s+).*', resume='mark'),
+        TokenRule('header3', r'^(?P<mark>###\s+).*', resume='mark'),
+        TokenRule('header4', r'^(?P<mark>####\s+).*', resume='mark'),
+        TokenRule('header', r'^(?P<mark>#{5,6}\s+).*', resume='mark'),
+        # 水平线 (--- 或 *** 或 ___)
+        TokenRule('horizontal_rule', r'^\s*(?P<ch>[\*\-_])\s*(?:(?P=ch)\s*){2,}$'),
+        # 引用 (> 文本)
+        TokenRule('blockquote', r'^(?P<mark>>).*', resume='mark'),
+        # 列表 (- 项目 或 * 项目 或 1. 项目)
+        TokenRule(None, r'^\s*(?P<mark>[\*\-\+]|\d+\.)\s', groups={'mark': 'list'}),
+        # 行内代码 (`代码`)
+        TokenRule('code', r'`[^`]+`'),
+        # 图片 ![文本](链接)
+        TokenRule('image', r'!\[[^\]]+\]\([^)]+\)'),
+        # 链接 [文本](链接)
+        TokenRule('link', r'\[[^\]]+\]\([^)]+\)'),
+        # 粗体 (**文本** 或 __文本__)
+        TokenRule('strong', r'\*\*[^\*_]+\*\*|__[^\*_]+__'),
+        # 强调 (*文本* 或 _文本_)
+        TokenRule('emphasis', r'\*[^\*_]+\*|_[^\*_]+_'),
+    ],
+    STATE_CODE_BLOCK: [
+        # 代码块结束
+        TokenRule(None, r'^\s*(?P<fence>```|~~~)(?P<lang>.*)$',
+                  groups={'fence': 'code', 'lang': 'code'}, next_state=STATE_NORMAL),
+        TokenRule('code', r'.+'),
+    ],
+})
+
+# 嵌入语言表：序号 -> 高亮器类，序号只在本进程内有效，分词缓存也按进程保存
+_embedded_classes = [None]
+# 语言标记 -> 序号，不支持的标记对应 0
+_embedded_index = {}
+# 后台高亮线程也会登记语言
+_embedded_lock = threading.Lock()
+
+
+def embedded_language_index(tag):
+    """返回代码块语言标记对应的嵌入语言序号，不支持时返回 0"""
+    tag = tag.lower()
+    index = _embedded_index.get(tag)
+    if index is not None:
+        return index
+
+    from .. import get_highlighter_class, get_type_by_extension, BasicTextHighlighter
+    file_type = get_type_by_extension(f"code.{tag}")
+    if file_type == 'text':
+        file_type = tag
+    highlighter_class = get_highlighter_class(file_type) if tag else BasicTextHighlighter
+    with _embedded_lock:
+        index = _embedded_index.get(tag)
+        if index is not None:
+            return index
+        # Markdown 不嵌套自身，避免状态无限嵌套
+        if (highlighter_class is BasicTextHighlighter or issubclass(highlighter_class, MarkdownHighlighter)
+                or highlighter_class.tokenizer is None):
+            index = 0
+        elif highlighter_class in _embedded_classes:
+            index = _embedded_classes.index(highlighter_class)
+        elif len(_embedded_classes) <= MAX_EMBEDDED_LANGUAGES:
+            _embedded_classes.append(highlighter_class)
+            index = len(_embedded_classes) - 1
+        else:
+            index = 0
+        _embedded_index[tag] = index
+    return index
+
+
+def code_block_state(language_index, inner_state=0):
+    """组合代码块内的块状态"""
+    return STATE_CODE_BLOCK | (language_index << _LANGUAGE_SHIFT) | (inner_state << _INNER_SHIFT)
+
 
 class MarkdownHighlighter(BaseHighlighter):
-    def __init__(self, document, is_light_theme=False):
-        super().__init__(document, is_light_theme)
-    
+    tokenizer = MARKDOWN_TOKENIZER
+    language_name = "Markdown"
+    file_type = "markdown"
+
+    def __init__(self, document, is_light_theme=False, palette=None):
+        super().__init__(document, is_light_theme, palette)
+
     def _init_formats(self):
         # 基于亮暗主题选择合适的颜色
         if self.is_light_theme:
@@ -30,146 +133,58 @@ class MarkdownHighlighter(BaseHighlighter):
             self.formats['blockquote'] = self._create_format('#9CDCFE', italic=True)  # 淡蓝引用
             self.formats['horizontal_rule'] = self._create_format('#569CD6', bold=True)  # 蓝色水平线
             self.formats['image'] = self._create_format('#C586C0')  # 粉色图片
-    
-    def highlightBlock(self, text):
-        try:
-            # 段落格式
-            block_state = self.previousBlockState()
-            
-            # 标题格式 (# 标题)
-            try:
-                header_pattern = r'^(#{1,6})\s+(.+?)(?:\s+#+)?$'
-                header_match = re.match(header_pattern, text)
-                if header_match:
-                    level = len(header_match.group(1))
-                    header_text_start = header_match.start(2)
-                    header_text_length = len(header_match.group(2))
-                    # 使标题粗细与级别对应
-                    header_format = self._create_format(
-                        self.formats['header'].foreground().color().name(),
-                        bold=True,
-                        italic=False
-                    )
-                    # 根据标题级别设置字体大小 (可选)
-                    font = QFont(header_format.font())
-                    if level == 1:
-                        font.setPointSize(font.pointSize() + 4)
-                    elif level == 2:
-                        font.setPointSize(font.pointSize() + 3)
-                    elif level == 3:
-                        font.setPointSize(font.pointSize() + 2)
-                    elif level == 4:
-                        font.setPointSize(font.pointSize() + 1)
-                    header_format.setFont(font)
-                    
-                    # 高亮整行
-                    self.setFormat(0, len(text), header_format)
-            except Exception:
-                pass
-
-            # 代码块 (``` 或 ~~~)
+
+    def _derive_formats(self):
+        # 各级标题格式按字号增量从全局注册表获取，每个主题只创建一次
+        for level in (1, 2, 3, 4):
+            self.formats[f'header{level}'] = self._sized_format('header', HEADER_SIZE_DELTA[level])
+
+    def _build_formats(self):
+        # 共享的格式表不能修改，嵌入语言的格式放在本实例的副本中，键为 (语言序号, token类型)
+        super()._build_formats()
+        self.formats = dict(self.formats)
+        self._embedded_count = 1
+
+    def current_formats(self):
+        # 分词时可能登记了新的嵌入语言，补充它们的格式
+        if self._embedded_count != len(_embedded_classes):
+            self._add_embedded_formats()
+        return self.formats
+
+    def _add_embedded_formats(self):
+        classes = list(_embedded_classes)
+        for index in range(self._embedded_count, len(classes)):
             try:
-                code_pattern = r'^(\s*)(```|~~~)(.*)$'
-                code_match = re.match(code_pattern, text)
-                
-                # 如果是代码块开始或结束标记
-                if code_match:
-                    self.setFormat(code_match.start(2), len(code_match.group(2)), self.formats['code'])
-                    if block_state != 1:  # 不在代码块内
-                        self.setCurrentBlockState(1)  # 进入代码块
-                    else:
-                        self.setCurrentBlockState(0)  # 退出代码块
-                    
-                    # 高亮语言名称
-                    if len(code_match.group(3)) > 0:
-                        self.setFormat(code_match.start(3), len(code_match.group(3)), self.formats['code'])
-                    
-                # 如果处于代码块内部
-                elif block_state == 1:
-                    self.setFormat(0, len(text), self.formats['code'])
-                    self.setCurrentBlockState(1)  # 保持在代码块中
-            except Exception:
-                pass
-                
-            # 如果不在代码块内，应用其他格式
-            if self.currentBlockState() != 1:
-                # 行内代码 (`代码`)
-                try:
-                    code_in_line = re.compile(r'`([^`]+)`')
-                    for match in code_in_line.finditer(text):
-                        start = match.start()
-                        length = match.end() - start
-                        self.setFormat(start, length, self.formats['code'])
-                except Exception:
-                    pass
-                
-                # 引用 (> 文本)
-                try:
-                    if text.startswith('>'):
-                        self.setFormat(0, len(text), self.formats['blockquote'])
-                except Exception:
-                    pass
-                
-                # 强调 (*文本* 或 _文本_)
-                try:
-                    emphasis = re.compile(r'(\*|_)([^\*_]+)(\*|_)')
-                    for match in emphasis.finditer(text):
-                        if match.group(1) == match.group(3):  # 确保开始和结束标记匹配
-                            start = match.start()
-                            length = match.end() - start
-                            self.setFormat(start, length, self.formats['emphasis'])
-                except Exception:
-                    pass
-                
-                # 粗体 (**文本** 或 __文本__)
-                try:
-                    strong = re.compile(r'(\*\*|__)([^\*_]+)(\*\*|__)')
-                    for match in strong.finditer(text):
-                        if match.group(1) == match.group(3):  # 确保开始和结束标记匹配
-                            start = match.start()
-                            length = match.end() - start
-                            self.setFormat(start, length, self.formats['strong'])
-                except Exception:
-                    pass
-                
-                # 链接 [文本](链接)
-                try:
-                    link = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
-                    for match in link.finditer(text):
-                        start = match.start()
-                        length = match.end() - start
-                        self.setFormat(start, length, self.formats['link'])
-                except Exception:
-                    pass
-                
-                # 图片 ![文本](链接)
-                try:
-                    image = re.compile(r'!\[([^\]]+)\]\(([^)]+)\)')
-                    for match in image.finditer(text):
-                        start = match.start()
-                        length = match.end() - start
-                        self.setFormat(start, length, self.formats['image'])
-                except Exception:
-                    pass
-                
-                # 列表 (- 项目 或 * 项目 或 1. 项目)
-                try:
-                    list_pattern = re.compile(r'^\s*([\*\-\+]|\d+\.)\s')
-                    match = list_pattern.search(text)
-                    if match:
-                        start = match.start(1)
-                        length = match.end(1) - start
-                        self.setFormat(start, length, self.formats['list'])
-                except Exception:
-                    pass
-                
-                # 水平线 (--- 或 *** 或 ___)
-                try:
-                    if re.match(r'^\s*([\*\-_])\s*(\1\s*){2,}$', text):
-                        self.setFormat(0, len(text), self.formats['horizontal_rule'])
-                except Exception:
-                    pass
-                    
-        except Exception as e:
-            # 如果出现任何错误，记录错误并避免崩溃
-            log_highlight_error(f"Markdown语法高亮出错: {e}") 
\ No newline at end of file
+                # 不挂载文档的高亮器只用来按当前调色板取得该语言共享的格式表
+                helper = classes[index](None, palette=self.palette)
+                for kind, text_format in helper.formats.items():
+                    self.formats[(index, kind)] = text_format
+            except Exception as e:
+                log_highlight_error(f"获取嵌入语言格式出错: {e}")
+        self._embedded_count = len(classes)
+
+    def _tokenize(self, text, state):
+        if state & _FENCE_MASK != STATE_CODE_BLOCK:
+            tokens, end_state = self.tokenizer.tokenize(text, state)
+            if end_state == STATE_CODE_BLOCK:
+                # 代码块开始，按语言标记选择嵌入语言
+                match = _FENCE_RE.match(text)
+                if match is not None:
+                    end_state = code_block_state(embedded_language_index(match.group('lang')))
+            return tokens, end_state
+
+        # 代码块结束
+        if _FENCE_RE.match(text) is not None:
+            return self.tokenizer.tokenize(text, STATE_CODE_BLOCK)
+
+        language_index = state >> _LANGUAGE_SHIFT & 0xFF
+        if language_index == 0:
+            return self.tokenizer.tokenize(text, STATE_CODE_BLOCK)
+
+        # 嵌入语言：使用该语言高亮器共享的分词器，token 类型加上语言序号以便选择对应格式
+        tokenizer = _embedded_classes[language_index].tokenizer
+        inner_tokens, inner_state = tokenizer.tokenize(text, state >> _INNER_SHIFT)
+        if inner_state > MAX_INNER_STATE:
+            inner_state = 0
+        tokens = [(start, length, (language_index, kind)) for start, length, kind in inner_tokens]
+        return tokens, code_block_state(language_index, inner_state)
@@ -0,0 +1,293 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QTextLayout
+
+# 每个结果批次包含的块数，批次越小界面刷新越及时，但跨线程信号越多
+CHUNK_BLOCKS = 2000
+# 编辑后在主线程同步处理的最大块数，超过后交给后台线程
+SYNC_EDIT_BLOCKS = 200
+# 编辑后延迟启动后台分词的时间（毫秒）
+EDIT_DEBOUNCE_MS = 150
+# 每个后台任务在主线程复制的最大块数，状态未收敛时再从下一个块继续
+SNAPSHOT_BLOCKS = 4000
+
+
+class _TokenizeSignals(QObject):
+    """后台任务的信号对象（QRunnable 本身不能发射信号）"""
+    chunkReady = Signal(int, int, object)  # 文档版本, 起始块号, [(tokens, 结束状态), ...]
+    finished = Signal(int, int)  # 文档版本, 需要继续分词的块号（-1 表示已完成）
+
+
+class _TokenizeTask(QRunnable):
+    """
+    在线程池中对文本快照分词
+
+    texts: 从 first_block 开始的块文本快照（最多 SNAPSHOT_BLOCKS 块）
+    old_states: 对应块原有的结束状态，越过 dirty_end 后状态一致即可提前结束
+    has_more: 快照之后文档还有其他块，未收敛时需要继续
+    """
+
+    def __init__(self, tokenize, revision, first_block, texts, start_state, old_states, dirty_end, has_more):
+        super().__init__()
+        self.tokenize = tokenize
+        self.revision = revision
+        self.first_block = first_block
+        self.texts = texts
+        self.start_state = start_state
+        self.old_states = old_states
+        self.dirty_end = dirty_end
+        self.has_more = has_more
+        self.cancelled = False
+        self.signals = _TokenizeSignals()
+
+    def run(self):
+        tokenize = self.tokenize
+        state = self.start_state
+        chunk = []
+        chunk_start = self.first_block
+        next_block = -1
+        try:
+            for i, text in enumerate(self.texts):
+                if self.cancelled:
+                    return
+                tokens, state = tokenize(text, state if state > 0 else 0)
+                chunk.append((tokens, state))
+
+                block_number = self.first_block + i
+                # 已越过编辑区域且结束状态与原来一致，后面的块无需重新分词
+                converged = block_number > self.dirty_end and state == self.old_states[i]
+                if len(chunk) >= CHUNK_BLOCKS or converged:
+                    self.signals.chunkReady.emit(self.revision, chunk_start, chunk)
+                    chunk_start = block_number + 1
+                    chunk = []
+                if converged:
+                    break
+            else:
+                if self.has_more:
+                    next_block = self.first_block + len(self.texts)
+
+            if chunk and not self.cancelled:
+                self.signals.chunkReady.emit(self.revision, chunk_start, chunk)
+        except Exception as e:
+            print(f"后台语法分析出错: {e}")
+        finally:
+            if not self.cancelled:
+                self.signals.finished.emit(self.revision, next_block)
+
+
+class BackgroundHighlighter(QObject):
+    """
+    后台线程语法高亮
+
+    highlighter 为未绑定文档的 BaseHighlighter，只提供分词器和格式表。
+    分词在 QThreadPool 中进行，主线程只通过 QTextLayout.setFormats 应用结果；
+    文档版本（revision）变化后，尚未应用的旧结果会被取消或丢弃。
+    """
+    progressChanged = Signal(int, int)  # 已完成块数, 总块数
+    finished = Signal()
+
+    def __init__(self, highlighter, document, thread_pool=None):
+        super().__init__(document)
+        self.highlighter = highlighter
+        self.document = document
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self._task = None
+        self._applying = False
+        self._dirty_block = None
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(EDIT_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._start_pending)
+
+        document.contentsChange.connect(self._on_contents_change)
+        # 与位置相关的标记（例如 JSON 语法错误）由高亮器在这个文档上生成，变化后重新应用对应的块
+        highlighter.watch_markers(document, self._on_markers_changed)
+        self._start(0, document.blockCount() - 1)
+
+    def refresh(self):
+        """格式变化（例如切换调色板）后重新应用整篇文档的高亮"""
+        self._debounce.stop()
+        self._dirty_block = None
+        self._start(0, self.document.blockCount() - 1)
+
+    def stop(self, clear_formats=True):
+        """停止后台高亮，可选清除已应用的格式"""
+        self._cancel()
+        self._debounce.stop()
+        self.highlighter.watch_markers(None, None)
+        try:
+            self.document.contentsChange.disconnect(self._on_contents_change)
+        except (RuntimeError, TypeError):
+            pass
+        if clear_formats:
+            self._applying = True
+            try:
+                block = self.document.begin()
+                while block.isValid():
+                    block.layout().clearFormats()
+                    block = block.next()
+                self.document.markContentsDirty(0, self.document.characterCount())
+            finally:
+                self._applying = False
+
+    def _cancel(self):
+        if self._task is not None:
+            self._task.cancelled = True
+            self._task = None
+
+    def _start(self, first_block, dirty_end):
+        """从指定块开始提交后台分词任务"""
+        self._cancel()
+        document = self.document
+        block = document.findBlockByNumber(first_block)
+        if not block.isValid():
+            return
+
+        previous = block.previous()
+        start_state = previous.userState() if previous.isValid() else 0
+        # 只复制一个窗口的块，避免每次编辑都在主线程遍历到文档末尾
+        texts = []
+        old_states = []
+        while block.isValid() and len(texts) < SNAPSHOT_BLOCKS:
+            texts.append(block.text())
+            old_states.append(block.userState())
+            block = block.next()
+
+        task = _TokenizeTask(self.highlighter.tokenize, document.revision(), first_block,
+                             texts, start_state, old_states, dirty_end, block.isValid())
+        task.signals.chunkReady.connect(self._apply_chunk)
+        task.signals.finished.connect(self._on_task_finished)
+        self._task = task
+        self.thread_pool.start(task)
+
+    def _start_pending(self):
+        if self._dirty_block is None:
+            return
+        first_block = self._dirty_block
+        self._dirty_block = None
+        self._start(first_block, first_block)
+
+    def _apply_chunk(self, revision, first_block, results):
+        """在主线程应用一批分词结果"""
+        if revision != self.document.revision():
+            return
+
+        formats = self.highlighter.current_formats()
+        block = self.document.findBlockByNumber(first_block)
+        if not block.isValid():
+            return
+        start_position = block.position()
+        end_position = start_position
+
+        self._applying = True
+        try:
+            for tokens, end_state in results:
+                if not block.isValid():
+                    break
+                self._apply_tokens(block, tokens, formats)
+                block.setUserState(end_state)
+                end_position = block.position() + block.length()
+                block = block.next()
+            self.document.markContentsDirty(start_position, end_position - start_position)
+        finally:
+            self._applying = False
+
+        last_block = first_block + len(results)
+        self.progressChanged.emit(last_block, self.document.blockCount())
+
+    def _apply_tokens(self, block, tokens, formats):
+        """应用 token 格式，标记叠加在最后（后面的格式覆盖前面的同名属性）"""
+        markers = self.highlighter.block_markers(block.blockNumber(), block.length() - 1)
+        ranges = []
+        for start, length, kind in (tuple(tokens) + tuple(markers) if markers else tokens):
+            text_format = formats.get(kind)
+            if text_format is None:
+                continue
+            format_range = QTextLayout.FormatRange()
+            format_range.start = start
+            format_range.length = length
+            format_range.format = text_format
+            ranges.append(format_range)
+        block.layout().setFormats(ranges)
+
+    def _on_markers_changed(self, block_numbers):
+        """标记变化后重新应用这些块的格式（分词结果来自缓存）"""
+        highlighter = self.highlighter
+        formats = highlighter.current_formats()
+        self._applying = True
+        try:
+            for block_number in block_numbers:
+                block = self.document.findBlockByNumber(block_number)
+                if not block.isValid():
+                    continue
+                previous = block.previous()
+                state = previous.userState() if previous.isValid() else 0
+                tokens, _ = highlighter.tokenize(block.text(), state if state > 0 else 0)
+                self._apply_tokens(block, tokens, formats)
+                self.document.markContentsDirty(block.position(), block.length())
+        finally:
+            self._applying = False
+
+    def _on_task_finished(self, revision, next_block):
+        if self._task is not None and self._task.revision == revision:
+            dirty_end = self._task.dirty_end
+            self._task = None
+            if next_block >= 0:
+                # 窗口内状态仍未收敛，从下一个块继续（起始状态取自刚应用的结果）
+                self._start(next_block, dirty_end)
+                return
+            total = self.document.blockCount()
+            self.progressChanged.emit(total, total)
+            self.finished.emit()
+
+    def _on_contents_change(self, position, chars_removed, chars_added):
+        if self._applying:
+            return
+
+        # 文档已变化，正在进行的任务结果全部作废
+        if self._task is not None:
+            pending = self._task.first_block
+            self._cancel()
+            self._schedule(pending)
+
+        document = self.document
+        first = document.findBlock(position)
+        last = document.findBlock(position + chars_added)
+        if not first.isValid():
+            return
+        if not last.isValid():
+            last = document.lastBlock()
+
+        first_number = first.blockNumber()
+        if last.blockNumber() - first_number > SYNC_EDIT_BLOCKS:
+            self._schedule(first_number)
+            return
+
+        # 少量块直接在主线程处理，保证输入时立即看到高亮
+        previous = first.previous()
+        state = previous.userState() if previous.isValid() else 0
+        highlighter = self.highlighter
+        block = first
+        state_changed = False
+        self._applying = True
+        try:
+            while block.isValid():
+                tokens, state = highlighter.tokenize(block.text(), state if state > 0 else 0)
+                self._apply_tokens(block, tokens, highlighter.current_formats())
+                state_changed = block.userState() != state
+                block.setUserState(state)
+                if block == last:
+                    break
+                block = block.next()
+            document.markContentsDirty(first.position(), last.position() + last.length() - first.position())
+        finally:
+            self._applying = False
+
+        # 结束状态改变会影响后续所有块（例如打开了多行字符串），交给后台线程处理
+        if state_changed and last.next().isValid():
+            self._schedule(last.blockNumber() + 1)
+
+    def _schedule(self, block_number):
+        if self._dirty_block is None or block_number < self._dirty_block:
+            self._dirty_block = block_number
+        self._debounce.start()
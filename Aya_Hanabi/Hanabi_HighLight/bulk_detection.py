@@ -0,0 +1,154 @@
+import time
+import threading
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+# 批量文件类型检测
+# 导入文件夹或列出笔记库时一次要检测成百上千个文件，逐个在主线程检测会卡住界面。
+# 文件按批次分给线程池：线程中读取文件开头的样本并分类，每完成一批就通过信号送回主线程。
+
+# 每个任务处理的文件数，批次越小结果返回越及时，但跨线程信号越多
+BATCH_SIZE = 32
+# 读取样本以磁盘 IO 为主，线程数可以多于 CPU 核数
+MAX_THREADS = 16
+
+
+class _DetectSignals(QObject):
+    """检测任务的信号对象（QRunnable 本身不能发射信号）"""
+    batchReady = Signal(int, object)  # 检测轮次, [(路径, 文件类型), ...]
+
+
+class _DetectTask(QRunnable):
+    """在线程池中检测一批文件"""
+
+    def __init__(self, detect, generation, paths, collect):
+        super().__init__()
+        self.detect = detect
+        self.generation = generation
+        self.paths = paths
+        self.collect = collect
+        self.cancelled = False
+        self.signals = _DetectSignals()
+        # 任务结束（完成、取消或从线程池取回）后设置，wait() 只等待自己的任务
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            results = []
+            for path in self.paths:
+                if self.cancelled:
+                    return
+                try:
+                    file_type = self.detect(path)
+                except Exception as e:
+                    print(f"批量检测文件类型出错 {path}: {e}")
+                    file_type = 'text'
+                results.append((path, file_type))
+            if not self.cancelled:
+                self.collect(self.generation, results)
+                self.signals.batchReady.emit(self.generation, results)
+        finally:
+            self.done.set()
+
+
+class BulkFileTypeDetector(QObject):
+    """
+    批量文件类型检测器
+
+    detect 为单个文件的检测函数，在线程池中调用，必须是线程安全的。
+    结果按批次通过 resultsReady 发出，顺序与完成顺序一致，不保证与输入顺序相同；
+    全部完成后 finished 发出 {路径: 文件类型}。调用方需要持有检测器的引用直到完成。
+    """
+    resultsReady = Signal(object)  # [(路径, 文件类型), ...]
+    progressChanged = Signal(int, int)  # 已完成文件数, 总文件数
+    finished = Signal(object)  # {路径: 文件类型}
+
+    def __init__(self, detect, parent=None, thread_pool=None, batch_size=BATCH_SIZE):
+        super().__init__(parent)
+        self.detect = detect
+        self.batch_size = max(1, batch_size)
+        if thread_pool is None:
+            # 使用独立的线程池，不占用后台高亮的全局线程池
+            thread_pool = QThreadPool(self)
+            thread_pool.setMaxThreadCount(min(MAX_THREADS, max(4, QThreadPool.globalInstance().maxThreadCount() * 2)))
+        self.thread_pool = thread_pool
+        self._generation = 0
+        self._tasks = []
+        self._results = {}
+        self._lock = threading.Lock()
+        self._total = 0
+        self._done = 0
+
+    def start(self, paths):
+        """开始检测，之前未完成的检测会被取消"""
+        self.cancel()
+        self._generation += 1
+        paths = list(dict.fromkeys(path for path in paths if path))
+        self._total = len(paths)
+        self._done = 0
+        with self._lock:
+            self._results = {}
+
+        if not paths:
+            # 延迟发出，让调用方有机会先连接信号
+            generation = self._generation
+            QTimer.singleShot(0, self, lambda: self._finish(generation))
+            return
+
+        for offset in range(0, len(paths), self.batch_size):
+            task = _DetectTask(self.detect, self._generation, paths[offset:offset + self.batch_size], self._collect)
+            task.setAutoDelete(False)
+            task.signals.batchReady.connect(self._on_batch_ready)
+            self._tasks.append(task)
+            self.thread_pool.start(task)
+
+    def cancel(self):
+        """
+        取消尚未完成的检测，已发出的结果不受影响
+
+        只从线程池取回自己还没开始的任务，线程池可能是共享的，其他任务不受影响；
+        正在运行的任务在下一个文件前停止。
+        """
+        for task in self._tasks:
+            task.cancelled = True
+            if self.thread_pool.tryTake(task):
+                task.done.set()
+        self._tasks = []
+
+    def is_running(self):
+        return bool(self._tasks)
+
+    def wait(self, timeout_ms=-1):
+        """阻塞等待本次检测的任务完成，返回 {路径: 文件类型}；超时返回 None"""
+        deadline = None if timeout_ms < 0 else time.time() + timeout_ms / 1000
+        for task in list(self._tasks):
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            if not task.done.wait(timeout):
+                return None
+        with self._lock:
+            return dict(self._results)
+
+    def results(self):
+        """已完成部分的检测结果"""
+        with self._lock:
+            return dict(self._results)
+
+    def _collect(self, generation, results):
+        # 在工作线程中调用，wait() 不依赖事件循环也能取得结果
+        with self._lock:
+            if generation == self._generation:
+                self._results.update(results)
+
+    def _on_batch_ready(self, generation, results):
+        if generation != self._generation or not self._tasks:
+            return
+        self._done += len(results)
+        self.resultsReady.emit(results)
+        self.progressChanged.emit(self._done, self._total)
+        if self._done >= self._total:
+            self._finish(generation)
+
+    def _finish(self, generation):
+        if generation != self._generation:
+            return
+        self._tasks = []
+        self.finished.emit(self.results())
@@ -0,0 +1,226 @@
+import os
+import re
+
+# 基于内容的文件类型分类器
+# 所有特征编译进同一个多分支正则，对样本只扫描一遍，每次匹配按分支名给对应类型加分，
+# 最后取得分最高的类型。代码块（```）内的内容不计入其他语言的得分。
+
+# 样本最多分析的字符数
+SAMPLE_SIZE = 4096
+# 得分低于该值时认为无法判断
+MIN_SCORE = 4
+# 同一特征最多计分的次数，避免某一种写法重复出现时压倒其他特征
+MAX_HITS = 3
+
+# 得分相同时的优先顺序
+TYPE_PRIORITY = ('json', 'html', 'python', 'javascript', 'css', 'markdown')
+
+# 特征：(文件类型, 权重, 正则)
+# 行首特征共用一个 换行+缩进 前缀，正则中不再重复写缩进
+LINE_FEATURES = [
+    ('html', 8, r'<!DOCTYPE\b|<\?xml\b'),
+    ('python', 5, r'(?:async[ \t]+)?def[ \t]+\w+[ \t]*\(.*\)[ \t]*(?:->.*)?:[ \t]*$'),
+    ('python', 5, r'class[ \t]+\w+[ \t]*(?:\(.*\))?[ \t]*:[ \t]*$'),
+    ('python', 4, r'from[ \t]+[\w.]+[ \t]+import\b|import[ \t]+[\w.]+(?:[ \t]*,[ \t]*[\w.]+)*(?:[ \t]+as[ \t]+\w+)?[ \t]*$'),
+    ('python', 3, r'(?:elif\b.*|else|try|finally|except\b.*)[ \t]*:[ \t]*$'),
+    ('python', 3, r'(?:for|while|if|with)\b[^{};\n]*:[ \t]*$'),
+    ('python', 3, r'#.*(?:-\*-[ \t]*coding|python)'),
+    ('javascript', 5, r'import\b.*\bfrom[ \t]+[\'"]|export[ \t]+(?:default\b|function\b|class\b|const\b|let\b|var\b|\{)'),
+    ('css', 3, r'[.#:*\w\[][^{}();=\n]*\{[ \t]*$'),
+    ('css', 2, r'-?[a-z][a-z-]*[ \t]*:[ \t]*[^;{}()\n=]+(?:\([^)\n]*\)[^;{}\n]*)?;[ \t]*$'),
+    ('markdown', 2, r'(?<=\n)#{1,6}[ \t]+\S'),
+    ('markdown', 3, r'\|?[ \t]*:?-{3,}:?[ \t]*\|'),
+    ('markdown', 1, r'\|.*\|[ \t]*$'),
+    ('markdown', 1, r'(?:-{3,}|\*{3,}|_{3,})[ \t]*$'),
+    ('markdown', 1, r'(?:[-*+]|\d+\.)[ \t]+(?=\S)'),
+    ('markdown', 1, r'>[ \t]'),
+]
+
+# 行内特征，在任意位置尝试，不能跨越换行
+# 每个特征（或开头 (?:a|b) 展开后的每个分支）必须以一个字面字符开头，前面可以带 \b；
+# 编译时把首字符提到命名分组之外，整个正则因此可以按首字符集合快速跳到候选位置。
+INLINE_FEATURES = [
+    # JSON
+    ('json', 2, r'"[^"\n]{1,64}"[ \t]*:[ \t]*(?=["\[{\d\-tfn])'),
+    ('json', 1, r':[ \t]*(?:true|false|null)[ \t]*(?=[,}\]\n]|$)'),
+    # HTML / XML
+    ('html', 8, r'<(?:html|svg)\b'),
+    ('html', 2, r'<(?:head|body|div|span|p|a|img|script|style|table|tr|td|meta|link|br|hr|ul|ol|li|h[1-6]|form|input)\b[^>\n]*>'),
+    ('html', 2, r'</\w+>'),
+    ('html', 2, r'<!--'),
+    # Python
+    ('python', 6, r'\bif[ \t]+__name__[ \t]*==[ \t]*[\'"]__main__[\'"]'),
+    ('python', 2, r'\bself\.\w+'),
+    ('python', 1, r'\b(?:None|True|False)\b'),
+    # JavaScript / TypeScript
+    ('javascript', 4, r'\bfunction\b[ \t]*[\w$]*[ \t]*\([^)\n]*\)[ \t]*\{'),
+    ('javascript', 3, r'\b(?:const|let|var)[ \t]+[\w$]+[ \t]*(?::[^=\n]+)?='),
+    ('javascript', 3, r'\b(?:console|document|window)\.\w+\(|\brequire\('),
+    ('javascript', 3, r'===|!=='),
+    ('javascript', 3, r'\binterface[ \t]+\w+[ \t]*\{'),
+    ('javascript', 2, r'=>'),
+    ('javascript', 1, r'\bnew[ \t]+[A-Z]\w*\('),
+    ('javascript', 1, r'\b(?:null|undefined|this)\b'),
+    # CSS
+    ('css', 5, r'@(?:media|import|keyframes|font-face|charset|supports)\b'),
+    ('css', 2, r':(?:hover|before|after|focus|active|root|nth-child)\b'),
+    ('css', 1, r'#[0-9a-fA-F]{3,8}\b'),
+    # Markdown
+    ('markdown', 3, r'\[[^\]\n]+\]\([^)\n]+\)'),
+    ('markdown', 2, r'\*\*[^*\n]+\*\*|__[^_\n]+__'),
+    ('markdown', 1, r'`[^`\n]+`'),
+]
+
+# 代码块围栏单独作为一个分支，用于切换“代码块内”状态
+_FENCE_GROUP = 'fence'
+_FENCE_PATTERN = r'(?:```|~~~)'
+_FENCE_WEIGHT = 3
+
+
+def _top_level_split(pattern):
+    """按顶层的 | 拆分正则，忽略分组、字符集和转义中的 |"""
+    parts = []
+    depth = 0
+    in_class = False
+    start = 0
+    index = 0
+    while index < len(pattern):
+        ch = pattern[index]
+        if ch == '\\':
+            index += 2
+            continue
+        if in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            parts.append(pattern[start:index])
+            start = index + 1
+        index += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+def _split_alternatives(pattern):
+    """把顶层的 a|b 以及开头的 (?:a|b)rest 展开为多个分支"""
+    branches = []
+    for part in _top_level_split(pattern):
+        prefix = r'\b' if part.startswith(r'\b') else ''
+        body = part[len(prefix):]
+        inner = None
+        if body.startswith('(?:'):
+            end = body.find(')')
+            # 只展开不含嵌套分组的开头分组
+            if end != -1 and '(' not in body[3:end]:
+                inner, rest = body[3:end], body[end + 1:]
+        if inner is not None:
+            branches.extend(prefix + alternative + rest for alternative in inner.split('|'))
+        else:
+            branches.append(part)
+    return branches
+
+
+def _split_lead(pattern):
+    """拆出分支的首字符，开头的 \\b 转换为首字符前的后视断言"""
+    word_boundary = pattern.startswith(r'\b')
+    if word_boundary:
+        pattern = pattern[2:]
+    size = 2 if pattern.startswith('\\') else 1
+    lead, rest = pattern[:size], pattern[size:]
+    if lead in '(|^$.?*+{[' or rest[:1] in ('*', '+', '?', '{'):
+        raise ValueError(f"行内特征必须以字面字符开头: {pattern}")
+    if word_boundary:
+        lead = f'{lead}(?<![\\w$]{lead})'
+    return lead, rest
+
+
+def _compile():
+    table = {}
+    line_branches = [f'(?P<{_FENCE_GROUP}>{_FENCE_PATTERN})']
+    for index, (file_type, weight, pattern) in enumerate(LINE_FEATURES):
+        name = f'l{index}'
+        table[name] = (file_type, weight, name)
+        line_branches.append(f'(?P<{name}>{pattern})')
+
+    branches = ['\\n[ \\t]*(?:' + '|'.join(line_branches) + ')']
+    for index, (file_type, weight, pattern) in enumerate(INLINE_FEATURES):
+        feature = f'i{index}'
+        for number, alternative in enumerate(_split_alternatives(pattern)):
+            name = f'{feature}_{number}'
+            # 展开后的分支共用同一个特征的计分次数
+            table[name] = (file_type, weight, feature)
+            lead, rest = _split_lead(alternative)
+            branches.append(f'{lead}(?P<{name}>{rest})')
+    return table, re.compile('|'.join(branches), re.MULTILINE)
+
+
+_feature_table, CLASSIFIER_RE = _compile()
+
+# 扩展名对应的先验得分，只用于打破相近的得分
+_EXTENSION_HINTS = {
+    '.json': 'json', '.jsonc': 'json', '.json5': 'json',
+    '.html': 'html', '.htm': 'html', '.xml': 'html', '.xhtml': 'html', '.svg': 'html',
+    '.py': 'python', '.pyw': 'python', '.pyi': 'python',
+    '.js': 'javascript', '.jsx': 'javascript', '.ts': 'javascript', '.tsx': 'javascript', '.mjs': 'javascript', '.cjs': 'javascript',
+    '.css': 'css', '.scss': 'css', '.less': 'css', '.sass': 'css',
+    '.md': 'markdown', '.markdown': 'markdown', '.mdown': 'markdown', '.mkdn': 'markdown', '.mkd': 'markdown', '.mdwn': 'markdown',
+}
+EXTENSION_WEIGHT = 3
+
+_JSON_START_RE = re.compile(r'[\[{]\s*(?:"|\[|\{|\]|\}|$)')
+
+
+def score_content(content, file_path=None):
+    """返回各文件类型的得分 {文件类型: 得分}"""
+    # 开头补一个换行，第一行也能匹配行首特征
+    sample = '\n' + content[:SAMPLE_SIZE]
+    scores = dict.fromkeys(TYPE_PRIORITY, 0)
+    hits = {}
+    feature_table = _feature_table
+    in_fence = False
+
+    for match in CLASSIFIER_RE.finditer(sample):
+        name = match.lastgroup
+        if name == _FENCE_GROUP:
+            in_fence = not in_fence
+            file_type, weight, feature = 'markdown', _FENCE_WEIGHT, name
+        else:
+            file_type, weight, feature = feature_table[name]
+            # 代码块中的代码不代表文件本身的类型
+            if in_fence and file_type != 'markdown':
+                continue
+        count = hits.get(feature, 0)
+        if count < MAX_HITS:
+            hits[feature] = count + 1
+            scores[file_type] += weight
+
+    # 结构特征：以对象或数组开头的文档
+    stripped = sample.lstrip()
+    if stripped[:1] in ('{', '['):
+        scores['json'] += 2
+        if _JSON_START_RE.match(stripped):
+            scores['json'] += 4
+    elif stripped[:1] == '<':
+        scores['html'] += 3
+
+    if file_path:
+        hint = _EXTENSION_HINTS.get(os.path.splitext(file_path)[1].lower())
+        if hint is not None:
+            scores[hint] += EXTENSION_WEIGHT
+    return scores
+
+
+def classify_content(content, file_path=None):
+    """根据内容判断文件类型，无法判断时返回 None"""
+    scores = score_content(content, file_path)
+    best_type = None
+    best_score = MIN_SCORE - 1
+    for file_type in TYPE_PRIORITY:
+        if scores[file_type] > best_score:
+            best_type = file_type
+            best_score = scores[file_type]
+    return best_type
@@ -0,0 +1,86 @@
+import os
+import threading
+from collections import OrderedDict
+
+# 文件类型检测缓存
+# 内容检测需要读取设置文件和文件开头的内容，切换标签页时会反复检测同一个文件。
+# 检测结果按 (路径, 文件大小, 修改时间, 设置版本) 缓存，文件或设置变化后自动失效。
+
+SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".hanabi_notes", "settings.json")
+
+
+def settings_revision():
+    """返回设置文件的版本（修改时间和大小），设置文件不存在时返回 None"""
+    try:
+        stat = os.stat(SETTINGS_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class FileTypeCache:
+    """
+    文件类型检测结果的 LRU 缓存
+
+    同一路径只保留一条记录，记录中保存检测时的文件大小、修改时间和设置版本，
+    查询时任意一项不同就重新检测并覆盖旧记录。
+    namespace 用于区分检测规则不同的调用方（例如高亮检测和编辑器的后缀映射）。
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, file_path, detector, namespace='highlight'):
+        """返回文件类型，缓存未命中时调用 detector(file_path) 检测"""
+        try:
+            stat = os.stat(file_path)
+        except (OSError, TypeError, ValueError):
+            # 文件不存在（例如尚未保存的新文件）时不缓存
+            return detector(file_path)
+
+        key = (namespace, os.path.normcase(os.path.abspath(file_path)))
+        version = (stat.st_size, stat.st_mtime_ns, settings_revision())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        file_type = detector(file_path)
+
+        with self._lock:
+            self._entries[key] = (version, file_type)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return file_type
+
+    def invalidate(self, file_path=None):
+        """清除指定文件的缓存，不指定时清空全部"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                return
+            path = os.path.normcase(os.path.abspath(file_path))
+            for key in [key for key in self._entries if key[1] == path]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+FILE_TYPE_CACHE = FileTypeCache()
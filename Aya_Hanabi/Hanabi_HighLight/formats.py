@@ -0,0 +1,66 @@
+from PySide6.QtGui import QTextCharFormat
+
+# 进程级的 QTextCharFormat 注册表
+# 同一主题下同一语言的格式表只创建一次，所有高亮器实例共享；
+# setFormat 按值复制格式，因此共享的格式对象在创建完成后不应再被修改。
+
+
+class FormatRegistry:
+    """
+    按 (主题, token类型, 字号增量) 缓存格式
+
+    主题键由 HighlightPalette.key(语言) 生成，已包含语言和颜色覆盖配置。
+    allocations 统计实际创建的 QTextCharFormat 数量，用于衡量复用效果。
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._formats = {}
+        self.allocations = 0
+        self.table_hits = 0
+        self.table_misses = 0
+
+    def new_format(self, base=None):
+        """创建（或复制）一个格式对象并计数"""
+        self.allocations += 1
+        return QTextCharFormat(base) if base is not None else QTextCharFormat()
+
+    def table(self, theme_key, factory):
+        """返回主题对应的整张格式表 {token类型: 格式}，不存在时调用 factory 创建"""
+        formats = self._tables.get(theme_key)
+        if formats is not None:
+            self.table_hits += 1
+            return formats
+
+        self.table_misses += 1
+        formats = factory()
+        for kind, text_format in formats.items():
+            self._formats.setdefault((theme_key, kind, 0), text_format)
+        self._tables[theme_key] = formats
+        return formats
+
+    def format(self, theme_key, kind, size_delta, factory):
+        """返回单个格式（例如不同级别的标题），不存在时调用 factory 创建"""
+        key = (theme_key, kind, size_delta)
+        text_format = self._formats.get(key)
+        if text_format is None:
+            text_format = factory()
+            self._formats[key] = text_format
+        return text_format
+
+    def clear(self):
+        self._tables.clear()
+        self._formats.clear()
+
+    def stats(self):
+        """返回格式复用统计"""
+        return {
+            'tables': len(self._tables),
+            'formats': len(self._formats),
+            'allocations': self.allocations,
+            'table_hits': self.table_hits,
+            'table_misses': self.table_misses,
+        }
+
+
+FORMAT_REGISTRY = FormatRegistry()
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+from . import BaseHighlighter, Tokenizer, TokenRule, log_highlight_error
+
+# 声明式语法包
+# 每种语言一个 JSON 文件（Grammars/<文件类型>.json），格式：
+# {
+#   "name": "显示名称",
+#   "aliases": ["其他文件类型", ...],
+#   "flags": ["IGNORECASE", ...],
+#   "states": {
+#     "0": [
+#       {"kind": "comment", "pattern": "//.*"},
+#       {"kind": "keyword", "words": ["if", "else"]},
+#       {"pattern": "...(?P<name>...)", "groups": {"name": "class"}, "next_state": 1, "resume": "name"}
+#     ]
+#   }
+# }
+# 语法包在第一次使用时编译为组合正则表，之后复用同一个高亮器类；启动时不读取任何语法文件。
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Grammars")
+
+_FLAGS = {
+    'IGNORECASE': re.IGNORECASE,
+    'MULTILINE': re.MULTILINE,
+    'DOTALL': re.DOTALL,
+    'UNICODE': re.UNICODE,
+}
+
+# 默认配色：语法包只产出 token 类型，颜色由这里和调色板决定
+DEFAULT_STYLES = {
+    'dark': {
+        'keyword': ('#569CD6', True, False),
+        'string': ('#CE9178', False, False),
+        'comment': ('#6A9955', False, True),
+        'number': ('#B5CEA8', False, False),
+        'function': ('#DCDCAA', False, False),
+        'class': ('#4EC9B0', True, False),
+        'type': ('#4EC9B0', False, False),
+        'builtin': ('#4FC1FF', False, False),
+        'constant': ('#4FC1FF', False, False),
+        'tag': ('#569CD6', False, False),
+        'attribute': ('#9CDCFE', False, False),
+        'property': ('#9CDCFE', False, False),
+        'key': ('#9CDCFE', True, False),
+        'variable': ('#9CDCFE', False, False),
+        'selector': ('#D7BA7D', False, False),
+        'escape': ('#D7BA7D', False, False),
+        'section': ('#C586C0', True, False),
+        'decorator': ('#C586C0', False, False),
+        'macro': ('#C586C0', False, False),
+        'regex': ('#D16969', False, False),
+        'punctuation': ('#808080', False, False),
+    },
+    'light': {
+        'keyword': ('#0000FF', True, False),
+        'string': ('#008000', False, False),
+        'comment': ('#808080', False, True),
+        'number': ('#FF8000', False, False),
+        'function': ('#800080', False, False),
+        'class': ('#000080', True, False),
+        'type': ('#267F99', False, False),
+        'builtin': ('#267F99', False, False),
+        'constant': ('#0070C1', False, False),
+        'tag': ('#800000', False, False),
+        'attribute': ('#E50000', False, False),
+        'property': ('#0451A5', False, False),
+        'key': ('#0451A5', True, False),
+        'variable': ('#001080', False, False),
+        'selector': ('#800000', False, False),
+        'escape': ('#EE8434', False, False),
+        'section': ('#AF00DB', True, False),
+        'decorator': ('#808000', False, False),
+        'macro': ('#AF00DB', False, False),
+        'regex': ('#811F3F', False, False),
+        'punctuation': ('#444444', False, False),
+    },
+}
+
+# {文件类型: 语法文件路径}，第一次查询时才扫描目录
+_grammar_paths = None
+# {别名: 语法文件路径}，文件类型没有同名语法包时才读取各语法文件构建
+_alias_index = None
+# {语法文件路径: 高亮器类}
+_highlighter_classes = {}
+
+
+class GrammarHighlighter(BaseHighlighter):
+    """由语法包生成的高亮器基类，具体语言的子类在加载语法包时动态创建"""
+
+    def _init_formats(self):
+        styles = DEFAULT_STYLES['light' if self.is_light_theme else 'dark']
+        for kind, (color, bold, italic) in styles.items():
+            self.formats[kind] = self._create_format(color, bold=bold, italic=italic)
+
+
+def compile_grammar(data):
+    """把语法包数据编译成 Tokenizer"""
+    flags = 0
+    for flag_name in data.get('flags', []):
+        flags |= _FLAGS[flag_name]
+
+    states = {}
+    for state, rules in data['states'].items():
+        compiled_rules = []
+        for rule in rules:
+            pattern = rule.get('pattern')
+            if pattern is None:
+                # 单词列表：按长度倒序拼接，保证较长的单词优先匹配
+                words = sorted(rule['words'], key=len, reverse=True)
+                pattern = r'\b(?:' + '|'.join(re.escape(word) for word in words) + r')\b'
+            compiled_rules.append(TokenRule(rule.get('kind'), pattern,
+                                            groups=rule.get('groups'),
+                                            next_state=rule.get('next_state'),
+                                            resume=rule.get('resume')))
+        states[int(state)] = compiled_rules
+    return Tokenizer(states, flags)
+
+
+def load_grammar(path):
+    """加载并编译语法包，返回 (语法数据, Tokenizer)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data, compile_grammar(data)
+
+
+def _scan_grammars():
+    """{文件名（不含扩展名）: 路径}，只列目录，不读取语法文件"""
+    paths = {}
+    if not os.path.isdir(GRAMMAR_DIR):
+        return paths
+    for name in sorted(os.listdir(GRAMMAR_DIR)):
+        if name.endswith('.json'):
+            paths[os.path.splitext(name)[0].lower()] = os.path.join(GRAMMAR_DIR, name)
+    return paths
+
+
+def _build_alias_index(paths):
+    """{别名: 路径}，需要读取每个语法文件，只在按文件名找不到时才构建"""
+    index = {}
+    for path in paths.values():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                aliases = json.load(f).get('aliases', [])
+            for alias in aliases:
+                index.setdefault(alias.lower(), path)
+        except Exception as e:
+            log_highlight_error(f"读取语法包 {os.path.basename(path)} 出错: {e}")
+    return index
+
+
+def _grammar_path(file_type):
+    global _grammar_paths, _alias_index
+    if _grammar_paths is None:
+        _grammar_paths = _scan_grammars()
+    path = _grammar_paths.get(file_type)
+    if path is None:
+        if _alias_index is None:
+            _alias_index = _build_alias_index(_grammar_paths)
+        path = _alias_index.get(file_type)
+    return path
+
+
+def available_grammars():
+    """返回所有由语法包支持的文件类型（含别名）"""
+    global _grammar_paths, _alias_index
+    if _grammar_paths is None:
+        _grammar_paths = _scan_grammars()
+    if _alias_index is None:
+        _alias_index = _build_alias_index(_grammar_paths)
+    return sorted(set(_grammar_paths) | set(_alias_index))
+
+
+def get_grammar_highlighter_class(file_type):
+    """返回文件类型对应的语法包高亮器类，没有语法包时返回 None"""
+    path = _grammar_path((file_type or '').lower())
+    if path is None:
+        return None
+
+    highlighter_class = _highlighter_classes.get(path)
+    if highlighter_class is None:
+        data, tokenizer = load_grammar(path)
+        file_type = os.path.splitext(os.path.basename(path))[0].lower()
+        language_name = data.get('name', file_type)
+        class_name = re.sub(r'\W', '', file_type.title()) + "Highlighter"
+        highlighter_class = type(class_name, (GrammarHighlighter,), {
+            'tokenizer': tokenizer,
+            'language_name': language_name,
+            'file_type': file_type,
+        })
+        _highlighter_classes[path] = highlighter_class
+    return highlighter_class
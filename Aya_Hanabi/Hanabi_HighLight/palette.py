@@ -0,0 +1,63 @@
+from PySide6.QtGui import QColor
+
+# 默认的当前行高亮颜色
+DEFAULT_LINE_COLOR = (107, 159, 255, 60)
+DEFAULT_FLASH_COLOR = (107, 159, 255, 120)
+
+
+class HighlightPalette:
+    """
+    高亮调色板
+
+    高亮器只产出抽象的 token 类型（keyword、string、comment...），具体颜色由调色板决定，
+    切换主题时只需替换调色板并重绘，不需要重新分词。
+
+    is_light: 选择各语言内置的亮色/暗色配色
+    syntax: 主题中 highlight.syntax 的覆盖配置，
+            {token类型: 颜色} 或 {语言名: {token类型: 颜色}}，语言名使用小写（如 python）
+    line_color / flash_color: 当前行高亮和闪烁颜色，
+            为兼容旧代码，调色板可以按 line_color, flash_color = palette 的方式解包
+    """
+
+    def __init__(self, name="dark", is_light=False, syntax=None, line_color=None, flash_color=None):
+        self.name = name
+        self.is_light = is_light
+        self.syntax = syntax or {}
+        self.line_color = line_color or QColor(*DEFAULT_LINE_COLOR)
+        self.flash_color = flash_color or QColor(*DEFAULT_FLASH_COLOR)
+
+    @classmethod
+    def from_theme(cls, theme, name, line_color=None, flash_color=None):
+        """根据主题对象创建调色板，亮暗由编辑器背景色决定"""
+        background = theme.get("editor.background", "") if theme is not None else ""
+        if background and QColor(background).isValid():
+            is_light = QColor(background).lightness() > 128
+        else:
+            is_light = name == "light"
+        syntax = theme.get("highlight.syntax", {}) if theme is not None else {}
+        return cls(name, is_light, syntax if isinstance(syntax, dict) else {}, line_color, flash_color)
+
+    def __iter__(self):
+        yield self.line_color
+        yield self.flash_color
+
+    def __eq__(self, other):
+        if not isinstance(other, HighlightPalette):
+            return NotImplemented
+        return (self.name, self.is_light, self.syntax) == (other.name, other.is_light, other.syntax)
+
+    def __hash__(self):
+        return hash((self.name, self.is_light))
+
+    def key(self, language):
+        """返回指定语言在该调色板下的格式缓存键"""
+        overrides = tuple(sorted(self.overrides(language).items()))
+        return (language.lower(), self.name, self.is_light, overrides)
+
+    def overrides(self, language):
+        """返回指定语言的颜色覆盖 {token类型: 颜色}，语言专属配置优先"""
+        result = {kind: color for kind, color in self.syntax.items() if isinstance(color, str)}
+        language_syntax = self.syntax.get(language.lower())
+        if isinstance(language_syntax, dict):
+            result.update(language_syntax)
+        return result
@@ -0,0 +1,143 @@
+import time
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextCursor
+
+# 超过该行数的文档使用分片高亮，较小的文档仍由 QSyntaxHighlighter 一次性完成
+LARGE_DOCUMENT_BLOCKS = 2000
+# 每次事件循环中用于高亮的时间预算（毫秒）
+DEFAULT_SLICE_BUDGET_MS = 8
+# 用户输入后暂停后台高亮的时间（毫秒）
+DEFAULT_TYPING_PAUSE_MS = 400
+# 无法获取视口信息时，优先高亮的默认行数
+DEFAULT_VISIBLE_BLOCKS = 100
+
+
+class HighlightScheduler(QObject):
+    """
+    大文档分片高亮调度器
+
+    先高亮当前可见区域，再在事件循环中按时间片（默认 8ms）从文档开头向后补全，
+    用户输入时暂停后台补全。调度期间高亮器只处理已放行的文本块：
+    1. 位于补全前沿之前的块（已按正确的跨行状态高亮）
+    2. 当前可见区域内的块（可能使用了临时状态，前沿到达时会被纠正）
+    """
+    progressChanged = Signal(int, int)  # 已完成块数, 总块数
+    finished = Signal()
+
+    def __init__(self, highlighter, editor=None, budget_ms=DEFAULT_SLICE_BUDGET_MS,
+                 typing_pause_ms=DEFAULT_TYPING_PAUSE_MS):
+        super().__init__(highlighter)
+        self.highlighter = highlighter
+        self.editor = editor
+        self.document = highlighter.document()
+        self.budget = budget_ms / 1000.0
+        self.typing_pause = typing_pause_ms / 1000.0
+        self.done = False
+        self._last_edit = 0.0
+        self._visible_start = 0
+        self._visible_end = 0
+
+        # 补全前沿：光标所在块及其之后的块尚未按顺序高亮，光标会随编辑自动移动
+        self._frontier = QTextCursor(self.document)
+        self._frontier.movePosition(QTextCursor.Start)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._tick)
+
+        self.document.contentsChange.connect(self._on_contents_change)
+        if editor is not None:
+            editor.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+
+        self._update_visible_range()
+        highlighter.scheduler = self
+        self._timer.start(0)
+
+    def allows(self, block_number):
+        """判断高亮器当前是否应处理指定块"""
+        if self.done:
+            return True
+        if self._visible_start <= block_number < self._visible_end:
+            return True
+        return block_number < self._frontier.blockNumber()
+
+    def stop(self):
+        """停止调度（例如高亮器被替换或高亮模式关闭时）"""
+        self._timer.stop()
+        try:
+            self.document.contentsChange.disconnect(self._on_contents_change)
+        except (RuntimeError, TypeError):
+            pass
+        if self.editor is not None:
+            try:
+                self.editor.verticalScrollBar().valueChanged.disconnect(self._on_scrolled)
+            except (RuntimeError, TypeError):
+                pass
+        if getattr(self.highlighter, 'scheduler', None) is self:
+            self.highlighter.scheduler = None
+        self.done = True
+
+    def _update_visible_range(self):
+        """记录当前视口内的块范围"""
+        if self.editor is None:
+            self._visible_start = 0
+            self._visible_end = DEFAULT_VISIBLE_BLOCKS
+            return
+
+        first_block = self.editor.firstVisibleBlock()
+        start = first_block.blockNumber() if first_block.isValid() else 0
+        line_height = max(1, self.editor.fontMetrics().lineSpacing())
+        visible_lines = self.editor.viewport().height() // line_height + 1
+        if visible_lines <= 1:
+            visible_lines = DEFAULT_VISIBLE_BLOCKS
+        self._visible_start = start
+        self._visible_end = start + visible_lines
+
+    def _on_scrolled(self, _value):
+        """滚动到尚未高亮的区域时，立即高亮新的可见块"""
+        if self.done:
+            return
+        old_start, old_end = self._visible_start, self._visible_end
+        self._update_visible_range()
+        frontier = self._frontier.blockNumber()
+
+        block = self.document.findBlockByNumber(max(self._visible_start, frontier))
+        while block.isValid() and block.blockNumber() < self._visible_end:
+            number = block.blockNumber()
+            if not (old_start <= number < old_end):
+                self.highlighter.rehighlightBlock(block)
+            block = block.next()
+
+    def _on_contents_change(self, position, chars_removed, chars_added):
+        self._last_edit = time.monotonic()
+
+    def _tick(self):
+        if self.done:
+            return
+
+        # 用户正在输入时暂停后台补全，避免与输入抢占主线程
+        idle = time.monotonic() - self._last_edit
+        if idle < self.typing_pause:
+            self._timer.start(int((self.typing_pause - idle) * 1000) + 1)
+            return
+
+        deadline = time.perf_counter() + self.budget
+        highlighter = self.highlighter
+        frontier = self._frontier
+        while time.perf_counter() < deadline:
+            block = frontier.block()
+            # 先推进前沿再高亮，使该块被放行，而后续未放行的块不会被连带重排
+            if not frontier.movePosition(QTextCursor.NextBlock):
+                self.done = True
+                highlighter.rehighlightBlock(block)
+                break
+            highlighter.rehighlightBlock(block)
+
+        total = self.document.blockCount()
+        if self.done:
+            self.progressChanged.emit(total, total)
+            self.stop()
+            self.finished.emit()
+        else:
+            self.progressChanged.emit(frontier.blockNumber(), total)
+            self._timer.start(0)
@@ -0,0 +1,207 @@
+import re
+import threading
+from collections import OrderedDict
+
+# 表驱动分词引擎
+# 每种语言把自己的规则写成 TokenRule 列表，按状态分组交给 Tokenizer。
+# Tokenizer 在构造时把同一状态下的全部规则编译成一个组合正则（交替分支），
+# 之后每个文本块只需从左到右扫描一遍即可产出全部 token。
+
+_GROUP_DEF_RE = re.compile(r'\(\?P<([A-Za-z_][A-Za-z0-9_]*)>')
+_GROUP_REF_RE = re.compile(r'\(\?P=([A-Za-z_][A-Za-z0-9_]*)\)')
+
+
+class TokenRule:
+    """
+    单条分词规则
+
+    kind: 整个匹配对应的 token 类型，为 None 时只消费文本不产出 token
+    pattern: 正则表达式（子分组请使用命名分组，不要使用 \\1 这样的数字反向引用）
+    groups: {分组名: token类型}，为匹配中的子片段额外产出 token
+    next_state: 匹配后切换到的状态，用于跨行结构（多行字符串、代码块等）
+    resume: 分组名，匹配后从该分组结尾继续扫描（用于整行着色后仍需识别行内元素的情况）
+    inner: 另一个 Tokenizer，对匹配到的片段再做一次细分（例如字符串内的转义字符）
+    """
+    __slots__ = ('kind', 'pattern', 'groups', 'next_state', 'resume', 'inner')
+
+    def __init__(self, kind, pattern, groups=None, next_state=None, resume=None, inner=None):
+        self.kind = kind
+        self.pattern = pattern
+        self.groups = groups or {}
+        self.next_state = next_state
+        self.resume = resume
+        self.inner = inner
+
+
+class _CompiledTable:
+    """单个状态下编译好的组合正则"""
+    __slots__ = ('regex', 'rules', 'group_names')
+
+    def __init__(self, rules, flags):
+        parts = []
+        self.rules = {}
+        self.group_names = {}
+        for i, rule in enumerate(rules):
+            prefix = f"r{i}_"
+            # 为规则内部的命名分组加上前缀，避免不同规则之间重名
+            pattern = _GROUP_DEF_RE.sub(lambda m: f"(?P<{prefix}{m.group(1)}>", rule.pattern)
+            pattern = _GROUP_REF_RE.sub(lambda m: f"(?P={prefix}{m.group(1)})", pattern)
+            parts.append(f"(?P<r{i}>{pattern})")
+            self.group_names[i] = {f"{prefix}{name}": kind for name, kind in rule.groups.items()}
+            if rule.resume:
+                self.group_names[i][None] = f"{prefix}{rule.resume}"
+        self.regex = re.compile('|'.join(parts), flags)
+        # lastindex 指向最外层（最后闭合）的分组，即规则自身的分组
+        for i, rule in enumerate(rules):
+            self.rules[self.regex.groupindex[f"r{i}"]] = (rule, self.group_names[i])
+
+
+class Tokenizer:
+    """
+    多状态分词器
+
+    states: {状态值: [TokenRule, ...]}，状态 0 为默认状态
+    flags: 编译正则时使用的标志
+    """
+
+    def __init__(self, states, flags=0):
+        if not isinstance(states, dict):
+            states = {0: states}
+        self.flags = flags
+        self.tables = {state: _CompiledTable(rules, flags) for state, rules in states.items()}
+
+    def tokenize(self, text, state=0, offset=0):
+        """
+        对一行文本分词
+
+        返回 (tokens, end_state)，tokens 为 [(起始位置, 长度, token类型), ...]，
+        后出现的 token 覆盖先出现的 token（与 setFormat 的叠加顺序一致）
+        """
+        tokens = []
+        if state not in self.tables:
+            state = 0
+        table = self.tables[state]
+        regex = table.regex
+        rules = table.rules
+        append = tokens.append
+        pos = 0
+        length = len(text)
+
+        while pos <= length:
+            match = regex.search(text, pos)
+            if match is None:
+                break
+            rule, group_names = rules[match.lastindex]
+            start, end = match.span()
+
+            if rule.kind is not None and end > start:
+                append((start + offset, end - start, rule.kind))
+            if group_names:
+                for group_name, kind in group_names.items():
+                    if group_name is None:
+                        continue
+                    g_start, g_end = match.span(group_name)
+                    if g_end > g_start:
+                        append((g_start + offset, g_end - g_start, kind))
+            if rule.inner is not None and end > start:
+                inner_tokens, _ = rule.inner.tokenize(text[start:end], 0, start + offset)
+                tokens.extend(inner_tokens)
+
+            if rule.next_state is not None and rule.next_state != state:
+                state = rule.next_state
+                table = self.tables[state]
+                regex = table.regex
+                rules = table.rules
+
+            if rule.resume:
+                end = match.end(group_names[None])
+            # 零宽匹配时前进一个字符，避免死循环
+            pos = end if end > start else end + 1
+
+        return tokens, state
+
+
+# 分词缓存的容量（估算的字节数）
+TOKEN_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# 超过该长度的块不缓存（很少重复出现，缓存它们只会挤掉常见的短行）
+TOKEN_CACHE_MAX_LINE_CHARS = 4096
+# 估算内存占用：每个字符、每个条目和每个 token 的大致字节数
+_ENTRY_OVERHEAD = 200
+_TOKEN_OVERHEAD = 100
+_CHAR_BYTES = 2
+
+
+class TokenCache:
+    """
+    按 (块文本, 起始状态) 缓存分词结果的 LRU 缓存
+
+    字典的键是 (文本哈希, 文本长度, 起始状态)，条目中保留文本用于命中时核对内容，
+    哈希碰撞时视为未命中，不会返回错误结果。容量按文本和 token 估算的字节数限制，
+    超长的块不缓存。后台高亮线程也会访问缓存，所有操作加锁。
+    """
+
+    def __init__(self, max_bytes=TOKEN_CACHE_MAX_BYTES, max_line_chars=TOKEN_CACHE_MAX_LINE_CHARS):
+        self.max_bytes = max_bytes
+        self.max_line_chars = max_line_chars
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        # 键 -> (文本, tokens, 结束状态, 估算字节数)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text, state):
+        return hash(text), len(text), state
+
+    def get(self, text, state):
+        """返回缓存的 (tokens, end_state)，未命中时返回 None"""
+        if len(text) > self.max_line_chars:
+            return None
+        key = self._key(text, state)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != text:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, text, state, tokens, end_state):
+        """写入分词结果，超出容量时淘汰最久未使用的条目；超长的块只返回结果不缓存"""
+        tokens = tuple(tokens)
+        if len(text) > self.max_line_chars:
+            return tokens, end_state
+        key = self._key(text, state)
+        cost = _ENTRY_OVERHEAD + len(text) * _CHAR_BYTES + len(tokens) * _TOKEN_OVERHEAD
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+            self._entries[key] = (text, tokens, end_state, cost)
+            self._bytes += cost
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+        return tokens, end_state
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """返回命中统计，用于性能分析"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
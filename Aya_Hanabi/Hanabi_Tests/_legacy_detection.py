@@ -0,0 +1,335 @@
+"""
+原先 detect_file_type 中依次调用的内容检测函数
+
+生产代码已改用 classifier.classify_content，这里的实现只保留给 detection_benchmark 做准确率和速度对比。
+"""
+import re
+import json
+
+
+def log_highlight_error(message):
+    """检测过程日志，默认转发到高亮日志，基准计时时会被替换为空函数"""
+    from Aya_Hanabi.Hanabi_HighLight import log_highlight_error as log
+    log(message)
+
+
+def check_is_json(content, file_path):
+    """增强的JSON检测函数"""
+    try:
+        log_highlight_error(f"开始JSON检测: {file_path}")
+        
+        # 基本特征检查
+        has_json_start = content.strip().startswith(('{', '['))
+        has_json_structure = '{"' in content[:100] or '[{' in content[:100] or '":{' in content[:100] or '":' in content[:100]
+        
+        log_highlight_error(f"JSON特征检查: 起始符号匹配={has_json_start}, 结构匹配={has_json_structure}")
+        
+        # 强烈的JSON指示器 - 如果这些模式出现很多次，很可能是JSON
+        if content.count('":"') > 3 or content.count('": "') > 3:
+            log_highlight_error("检测到大量JSON键值对模式")
+            return True
+            
+        # 检查是否包含常见JSON配置键
+        common_json_keys = ['"version":', '"name":', '"description":', '"dependencies":', '"settings":', '"author":', 
+                            '"config":', '"options":', '"properties":', '"type":', '"required":', '"items":']
+        key_matches = [key for key in common_json_keys if key in content]
+        if key_matches:
+            log_highlight_error(f"匹配到JSON常见键: {key_matches}")
+            return True
+        
+        # 尝试严格解析
+        try:
+            import json
+            # 移除可能干扰JSON解析的注释行
+            lines = content.split('\n')
+            cleaned_lines = []
+            for line in lines:
+                # 跳过注释行
+                if line.strip().startswith('//') or line.strip().startswith('#'):
+                    continue
+                # 移除行内注释
+                comment_pos = line.find('//')
+                if comment_pos >= 0:
+                    line = line[:comment_pos]
+                cleaned_lines.append(line)
+            
+            cleaned_content = '\n'.join(cleaned_lines)
+            
+            json.loads(cleaned_content)
+            log_highlight_error("JSON解析成功")
+            return True
+        except Exception as e:
+            log_highlight_error(f"JSON严格解析失败: {str(e)}")
+            
+            # 宽松检查 - 检查JSON的基本结构特征
+            if (has_json_start and 
+                (('{' in content[:50] and '}' in content[-50:]) or 
+                 ('[' in content[:50] and ']' in content[-50:]))):
+                log_highlight_error("JSON宽松解析成功")
+                return True
+                
+            # 检查不太可能是其他格式的情况
+            if not re.search(r'(import\s+|def\s+|class\s+|function\s+|<html|<body|\bif\s+|while\s+|for\s+)', content, re.IGNORECASE):
+                # 如果文件名暗示是JSON
+                if 'json' in file_path.lower() or 'config' in file_path.lower() or 'settings' in file_path.lower():
+                    log_highlight_error("可能是JSON配置文件")
+                    return True
+        
+        log_highlight_error("不是JSON文件")
+        return False
+    except Exception as e:
+        log_highlight_error(f"JSON检测出错: {e}")
+        return False
+
+def check_is_html_xml(content, file_path):
+    """增强的HTML/XML检测函数"""
+    try:
+        log_highlight_error(f"开始HTML/XML检测: {file_path}")
+        
+        # 基本标签检查
+        basic_tags = ['<?xml', '<!DOCTYPE', '<html', '<!--', '<head', '<body', '<div', '<span', '<p>', '<a ', '<img ', '<script', '<style', '<table', '<form']
+        for tag in basic_tags:
+            if tag in content[:500]:
+                log_highlight_error(f"检测到HTML/XML标签: {tag}")
+                return True
+        
+        # 检查XML声明
+        if re.search(r'<\?xml\s+version=["\']\d+\.\d+["\']', content):
+            log_highlight_error("检测到XML声明")
+            return True
+            
+        # 检查常见HTML模式
+        html_patterns = [
+            r'<\w+\s+[^>]*>.*?</\w+>',  # 完整标签对
+            r'<meta\s+[^>]*>',           # meta标签
+            r'<link\s+[^>]*>',           # link标签
+            r'<(br|hr|img|input)[^>]*>', # 自闭合标签
+            r'class=["\'][^"\']*["\']',  # class属性
+            r'id=["\'][^"\']*["\']',     # id属性
+            r'style=["\'][^"\']*["\']'   # style属性
+        ]
+        
+        for pattern in html_patterns:
+            if re.search(pattern, content, re.IGNORECASE | re.DOTALL):
+                log_highlight_error(f"匹配到HTML模式: {pattern}")
+                return True
+                
+        # 检查文件名特征
+        if any(ext in file_path.lower() for ext in ['.html', '.htm', '.xml', '.xhtml', '.svg', '.jsp', '.asp', '.php']):
+            log_highlight_error("文件名暗示是HTML/XML文件")
+            
+            # 额外的快速检查，只要有一些标签特征即可确认
+            if '<' in content and '>' in content and re.search(r'</\w+>', content):
+                log_highlight_error("检测到基本HTML结构特征")
+                return True
+                
+        log_highlight_error("不是HTML/XML文件")
+        return False
+    except Exception as e:
+        log_highlight_error(f"HTML/XML检测出错: {e}")
+        return False
+
+def check_is_javascript(content, file_path):
+    """增强的JavaScript检测函数"""
+    try:
+        log_highlight_error(f"开始JavaScript检测: {file_path}")
+        
+        # 检查常见JavaScript关键字
+        js_keywords = ['const ', 'let ', 'var ', 'function ', 'class ', 'import ', 'export ', '=>', 'document.', 
+                       'window.', 'console.log', 'this.', 'new ', 'return ', 'async ', 'await ', 'try {', 'catch', 
+                       'if (', 'else {', 'for (', 'while (', 'switch (', 'Promise', '.then(', '.catch(']
+        
+        keyword_matches = [kw for kw in js_keywords if kw in content]
+        if len(keyword_matches) >= 3:  # 如果匹配3个以上的关键字，很可能是JS
+            log_highlight_error(f"检测到多个JavaScript关键字: {keyword_matches}")
+            return True
+        
+        # 检查函数定义和变量声明
+        js_patterns = [
+            r'function\s+\w+\s*\([^)]*\)\s*{',           # 函数定义
+            r'const\s+\w+\s*=',                          # const变量
+            r'let\s+\w+\s*=',                            # let变量
+            r'var\s+\w+\s*=',                            # var变量
+            r'class\s+\w+\s*{',                          # 类定义
+            r'export\s+(default\s+)?(function|class|const|let|var)',  # export语句
+            r'import\s+.*\s+from\s+[\'"]',               # import语句
+            r'document\.getElementById\(',                # DOM操作
+            r'window\.(addEventListener|onload)',         # 窗口事件
+            r'\$\(.*\)\..*\(',                           # jQuery代码
+            r'new\s+(Array|Object|Date|Map|Set|Promise)' # 常见对象实例化
+        ]
+        
+        for pattern in js_patterns:
+            if re.search(pattern, content, re.MULTILINE):
+                log_highlight_error(f"匹配到JavaScript模式: {pattern}")
+                return True
+        
+        # 检查是否是TypeScript
+        ts_patterns = [
+            r':\s*(string|number|boolean|any|void|null|undefined)',  # 类型注解
+            r'interface\s+\w+\s*{',                                 # 接口定义
+            r'<.*>.*\(',                                            # 泛型
+            r'@\w+',                                                # 装饰器
+        ]
+        
+        for pattern in ts_patterns:
+            if re.search(pattern, content, re.MULTILINE):
+                log_highlight_error(f"匹配到TypeScript模式: {pattern}")
+                return True
+        
+        # 检查文件名
+        if any(ext in file_path.lower() for ext in ['.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs']):
+            # 基本检查 - 不是其他明显的类型就当作JS处理
+            if '{' in content and '}' in content and (
+                'function' in content or 'var' in content or 'const' in content or 'let' in content):
+                log_highlight_error("文件名暗示是JavaScript且包含基本JS特征")
+                return True
+        
+        log_highlight_error("不是JavaScript文件")
+        return False
+    except Exception as e:
+        log_highlight_error(f"JavaScript检测出错: {e}")
+        return False
+
+def check_is_css(content, file_path):
+    """增强的CSS检测函数"""
+    try:
+        log_highlight_error(f"开始CSS检测: {file_path}")
+        
+        # 检查特征性CSS选择器和属性
+        css_selectors = ['body {', 'div {', '.class {', '#id {', '* {', ':hover', ':before', ':after', 
+                         '@media', '@import', '@keyframes', '@font-face']
+        
+        selector_matches = [sel for sel in css_selectors if sel in content]
+        if selector_matches:
+            log_highlight_error(f"检测到CSS选择器: {selector_matches}")
+            return True
+        
+        # 检查CSS属性定义
+        css_properties = ['margin:', 'padding:', 'color:', 'background:', 'font-size:', 'width:', 'height:', 
+                          'display:', 'position:', 'border:', 'text-align:', 'flex:', 'grid:']
+                          
+        property_matches = [prop for prop in css_properties if prop in content]
+        if len(property_matches) >= 5:  # 如果匹配5个以上的属性，很可能是CSS
+            log_highlight_error(f"检测到多个CSS属性: {property_matches}")
+            return True
+        
+        # 正则表达式检测
+        css_patterns = [
+            r'[.#]?[\w-]+\s*{[^}]*}',                   # 基本CSS规则块
+            r'@media\s+[^{]*{',                         # 媒体查询
+            r'@keyframes\s+\w+\s*{',                    # 关键帧动画
+            r'@import\s+url\([^)]+\);',                 # 导入语句
+            r'[\w-]+\s*:\s*[\w-]+\s*;',                 # 属性定义
+            r'(px|em|rem|%|vh|vw|deg|rgba?|hsla?)',     # 单位和颜色函数
+            r'#[0-9a-fA-F]{3,8}',                       # 十六进制颜色
+        ]
+        
+        for pattern in css_patterns:
+            if re.search(pattern, content, re.MULTILINE):
+                log_highlight_error(f"匹配到CSS模式: {pattern}")
+                return True
+        
+        # 检查是否是SASS/SCSS/LESS
+        preprocessor_patterns = [
+            r'\$\w+\s*:',          # SASS变量
+            r'@\w+\s*:',           # LESS变量
+            r'@mixin\s+\w+',       # SASS混合
+            r'@include\s+\w+',     # SASS包含
+            r'@extend\s+\w+',      # SASS扩展
+            r'&:',                 # 嵌套选择器
+            r'\w+\([^)]*\)\s*{',   # 混合调用
+        ]
+        
+        for pattern in preprocessor_patterns:
+            if re.search(pattern, content, re.MULTILINE):
+                log_highlight_error(f"匹配到CSS预处理器模式: {pattern}")
+                return True
+        
+        # 检查文件名
+        if any(ext in file_path.lower() for ext in ['.css', '.scss', '.sass', '.less']):
+            # 基本检查
+            if '{' in content and '}' in content and (':' in content) and (';' in content):
+                log_highlight_error("文件名暗示是CSS且包含基本CSS特征")
+                return True
+        
+        log_highlight_error("不是CSS文件")
+        return False
+    except Exception as e:
+        log_highlight_error(f"CSS检测出错: {e}")
+        return False
+
+def check_is_markdown(content, file_path):
+    """增强的Markdown检测函数"""
+    try:
+        log_highlight_error(f"开始Markdown检测: {file_path}")
+        
+        # 检查常见Markdown语法
+        md_features = [
+            '# ',              # 一级标题
+            '## ',             # 二级标题
+            '### ',            # 三级标题
+            '* ',              # 无序列表
+            '- ',              # 无序列表
+            '1. ',             # 有序列表
+            '> ',              # 引用
+            '```',             # 代码块
+            '**',              # 粗体
+            '*',               # 斜体
+            '[',               # 链接开始
+            '![',              # 图片开始
+            '|---',            # 表格
+            '---',             # 分隔线
+        ]
+        
+        # 计算特征数量
+        feature_matches = [feat for feat in md_features if feat in content]
+        if len(feature_matches) >= 2:  # 如果匹配2个以上的特征，很可能是Markdown
+            log_highlight_error(f"检测到多个Markdown特征: {feature_matches}")
+            return True
+        
+        # 正则表达式检测
+        md_patterns = [
+            r'^#{1,6}\s+.+$',                   # 标题
+            r'^\s*[-*+]\s+.+$',                 # 无序列表项
+            r'^\s*\d+\.\s+.+$',                 # 有序列表项
+            r'^\s*>\s+.+$',                     # 引用
+            r'^\s*```[^`]*```',                 # 代码块
+            r'\[.+\]\(.+\)',                    # 链接
+            r'!\[.+\]\(.+\)',                   # 图片
+            r'\*\*.+\*\*',                      # 粗体
+            r'__.+__',                          # 粗体
+            r'\*.+\*',                          # 斜体
+            r'_.+_',                            # 斜体
+            r'^\s*[-*_]{3,}\s*$',               # 分隔线
+            r'^\s*\|.+\|.+\|',                  # 表格行
+            r'^\s*\|[-:]+\|[-:]+\|',            # 表格分隔行
+        ]
+        
+        md_pattern_count = 0
+        for pattern in md_patterns:
+            if re.search(pattern, content, re.MULTILINE):
+                md_pattern_count += 1
+                if md_pattern_count >= 2:  # 如果匹配2个以上的模式，很可能是Markdown
+                    log_highlight_error("检测到多个Markdown模式")
+                    return True
+        
+        # 检查是否存在前置YAML元数据（常见于静态站点生成器中的Markdown）
+        if re.search(r'^---\s*$.*?^---\s*$', content, re.MULTILINE | re.DOTALL):
+            log_highlight_error("检测到Markdown前置元数据")
+            return True
+        
+        # 检查文件名
+        if any(ext in file_path.lower() for ext in ['.md', '.markdown', '.mdown', '.mkdn', '.mdwn']):
+            log_highlight_error("文件名暗示是Markdown文件")
+            # 基本特征检查 - 不是特别像其他类型的文本通常就是Markdown
+            if '#' in content and not ('{' in content[:100] and '}' in content[:500]):
+                if not re.search(r'<(html|body|div|script)\s*>', content, re.IGNORECASE):
+                    log_highlight_error("文件名是Markdown且内容不像HTML/JS/JSON")
+                    return True
+        
+        log_highlight_error("不是Markdown文件")
+        return False
+    except Exception as e:
+        log_highlight_error(f"Markdown检测出错: {e}")
+        return False
@@ -0,0 +1,107 @@
+"""
+批量文件类型检测基准
+
+把 detection_corpus 中的样本复制成指定数量的文件（模拟导入一个笔记文件夹），
+分别测量逐个调用 detect_file_type 和 detect_file_types 批量检测的耗时，并核对两者结果一致。
+两次测量前都会清空文件类型缓存。
+
+用法：
+    python -m Aya_Hanabi.Hanabi_Tests.bulk_detection_benchmark
+    python -m Aya_Hanabi.Hanabi_Tests.bulk_detection_benchmark --files 5000
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from PySide6.QtCore import QCoreApplication, QEventLoop
+
+import Aya_Hanabi.Hanabi_HighLight as highlight
+from Aya_Hanabi.Hanabi_HighLight import FILE_TYPE_CACHE, detect_file_type, detect_file_types
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "detection_corpus")
+DEFAULT_FILES = 2000
+
+
+def build_folder(target_dir, count):
+    """复制语料直到 count 个文件，返回文件路径列表"""
+    sources = []
+    for label in sorted(os.listdir(CORPUS_DIR)):
+        label_dir = os.path.join(CORPUS_DIR, label)
+        if os.path.isdir(label_dir):
+            sources.extend(os.path.join(label_dir, name) for name in sorted(os.listdir(label_dir)))
+    paths = []
+    for index in range(count):
+        source = sources[index % len(sources)]
+        name, ext = os.path.splitext(os.path.basename(source))
+        path = os.path.join(target_dir, f"{index:05d}_{name}{ext}")
+        shutil.copyfile(source, path)
+        paths.append(path)
+    return paths
+
+
+def measure_serial(paths):
+    FILE_TYPE_CACHE.invalidate()
+    start = time.perf_counter()
+    results = {path: detect_file_type(path) for path in paths}
+    return results, time.perf_counter() - start
+
+
+def measure_bulk(paths):
+    """通过信号接收结果，返回 (结果, 全部完成的耗时, 第一批结果到达的耗时)"""
+    FILE_TYPE_CACHE.invalidate()
+    loop = QEventLoop()
+    first_batch = []
+    start = time.perf_counter()
+    detector = detect_file_types(paths)
+    detector.resultsReady.connect(lambda batch: first_batch or first_batch.append(time.perf_counter() - start))
+    detector.finished.connect(loop.quit)
+    loop.exec()
+    elapsed = time.perf_counter() - start
+    return detector.results(), elapsed, first_batch[0] if first_batch else elapsed
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="批量文件类型检测基准")
+    parser.add_argument("--files", type=int, default=DEFAULT_FILES, help="文件数量")
+    parser.add_argument("--quiet-serial", action="store_true", help="逐个检测时也关闭高亮日志")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    target_dir = tempfile.mkdtemp(prefix="hanabi_detect_")
+    original_log = highlight.log_highlight_error
+    try:
+        paths = build_folder(target_dir, args.files)
+        print(f"文件数: {len(paths)}")
+
+        if args.quiet_serial:
+            highlight.log_highlight_error = lambda message: None
+        serial_results, serial_time = measure_serial(paths)
+        highlight.log_highlight_error = original_log
+        print(f"逐个检测   {serial_time * 1000:9.1f}ms  ({serial_time / len(paths) * 1e6:.1f}us/文件)")
+
+        bulk_results, bulk_time, first_time = measure_bulk(paths)
+        print(f"批量检测   {bulk_time * 1000:9.1f}ms  ({bulk_time / len(paths) * 1e6:.1f}us/文件)，"
+              f"首批结果 {first_time * 1000:.1f}ms")
+
+        mismatches = [path for path in paths if serial_results[path] != bulk_results.get(path)]
+        for path in mismatches[:10]:
+            print(f"    结果不一致 {os.path.basename(path)}: {serial_results[path]} / {bulk_results.get(path)}")
+        print(f"结果一致 {len(paths) - len(mismatches)}/{len(paths)}，加速 {serial_time / bulk_time:.1f}x")
+        return 0 if not mismatches else 1
+    finally:
+        highlight.log_highlight_error = original_log
+        shutil.rmtree(target_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+文件类型内容检测的准确率与性能基准
+
+语料位于 detection_corpus/<期望类型>/ 下，text 目录中的文件期望不被识别为任何代码类型。
+对比原先依次调用 check_is_json、check_is_html_xml、Python 规则、check_is_javascript、
+check_is_css、check_is_markdown 的检测链（保存在 _legacy_detection 中）与单次扫描的 classify_content。
+
+每个样本分别使用真实文件名和不含扩展名提示的文件名测试；计时时关闭高亮日志，只比较检测本身。
+
+用法：
+    python -m Aya_Hanabi.Hanabi_Tests.detection_benchmark
+    python -m Aya_Hanabi.Hanabi_Tests.detection_benchmark --repeat 200 --verbose
+"""
+import os
+import re
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from Aya_Hanabi.Hanabi_Tests import _legacy_detection as legacy
+from Aya_Hanabi.Hanabi_HighLight.classifier import classify_content
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "detection_corpus")
+# 期望不被识别的标签
+NO_TYPE_LABEL = 'text'
+# 原先检测链读取的样本长度
+LEGACY_SAMPLE_SIZE = 2048
+
+_LEGACY_PYTHON_RE = re.compile(
+    r'^(import\s+\w+|from\s+\w+\s+import|def\s+\w+\s*\(|class\s+\w+\s*[:\(]|#.*python|#.*coding:|'
+    r'#.*-\*-\s*coding:\s*|if\s+__name__\s*==\s*[\'"]__main__[\'"]|try:\s*$|except\s+\w+\s*:\s*$|'
+    r'@\w+(\.\w+)*(\(.*\))?$)', re.MULTILINE)
+_LEGACY_PYTHON_KEYWORDS = ['def ', 'class ', 'import ', 'while ', 'for ', 'if ', 'elif ', 'else:', 'try:', 'except:',
+                           'finally:', 'with ', 'yield ', 'return ', 'print(', 'assert ', 'global ', 'lambda ']
+
+
+def legacy_classify(content, file_path):
+    """原先 detect_file_type 中的内容检测链，用于对比"""
+    content = content[:LEGACY_SAMPLE_SIZE].strip()
+    checks = [
+        ('json', lambda c: legacy.check_is_json(c, file_path)),
+        ('html', lambda c: legacy.check_is_html_xml(c, file_path)),
+        ('python', lambda c: bool(_LEGACY_PYTHON_RE.search(c)) or
+                              any(keyword in c.lower() for keyword in _LEGACY_PYTHON_KEYWORDS)),
+        ('javascript', lambda c: legacy.check_is_javascript(c, file_path)),
+        ('css', lambda c: legacy.check_is_css(c, file_path)),
+        ('markdown', lambda c: legacy.check_is_markdown(c, file_path)),
+    ]
+    for file_type, check in checks:
+        if check(content):
+            return file_type
+    return None
+
+
+def load_corpus():
+    """返回 [(期望类型, 文件路径, 内容), ...]"""
+    samples = []
+    for label in sorted(os.listdir(CORPUS_DIR)):
+        label_dir = os.path.join(CORPUS_DIR, label)
+        if label.startswith('.') or label == '__pycache__' or not os.path.isdir(label_dir):
+            continue
+        expected = None if label == NO_TYPE_LABEL else label
+        for name in sorted(os.listdir(label_dir)):
+            path = os.path.join(label_dir, name)
+            # 跳过隐藏文件、子目录（例如 Python 样本旁生成的 __pycache__）
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                samples.append((expected, path, f.read()))
+    return samples
+
+
+def evaluate(classifier, samples, use_extension=True):
+    """返回 (正确数, 错误列表 [(文件路径, 期望类型, 实际类型), ...])"""
+    correct = 0
+    errors = []
+    for expected, path, content in samples:
+        name = path if use_extension else os.path.join(os.path.dirname(path), "sample")
+        result = classifier(content, name)
+        if result == expected:
+            correct += 1
+        else:
+            errors.append((path, expected, result))
+    return correct, errors
+
+
+def measure(classifier, samples, repeat):
+    """返回平均每个样本的检测耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, path, content in samples:
+            classifier(content, path)
+    return (time.perf_counter() - start) / (repeat * len(samples))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="文件类型内容检测基准")
+    parser.add_argument("--repeat", type=int, default=50, help="计时的重复次数")
+    parser.add_argument("--verbose", action="store_true", help="列出识别错误的样本")
+    args = parser.parse_args(argv)
+
+    # 原检测链每一步都写日志，计时时关闭日志，只比较检测本身
+    original_log = legacy.log_highlight_error
+    legacy.log_highlight_error = lambda message: None
+    try:
+        samples = load_corpus()
+        total = len(samples)
+        print(f"语料: {total} 个样本")
+        results = {}
+        for name, classifier in (('原检测链', legacy_classify), ('单次扫描分类器', classify_content)):
+            with_ext, errors_ext = evaluate(classifier, samples, True)
+            without_ext, errors_content = evaluate(classifier, samples, False)
+            elapsed = measure(classifier, samples, args.repeat)
+            results[name] = (with_ext + without_ext, elapsed)
+            print(f"{name:<10} 含扩展名 {with_ext}/{total}  仅内容 {without_ext}/{total}  "
+                  f"平均 {elapsed * 1e6:8.1f}us/样本")
+            if args.verbose:
+                for path, expected, result in errors_ext + errors_content:
+                    print(f"    {os.path.relpath(path, CORPUS_DIR)}: 期望 {expected}，实际 {result}")
+    finally:
+        legacy.log_highlight_error = original_log
+
+    (legacy_correct, legacy_time), (new_correct, new_time) = results.values()
+    ok = new_correct >= legacy_correct and new_time <= legacy_time
+    print(f"准确率 {legacy_correct} -> {new_correct}，速度 {legacy_time / new_time:.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
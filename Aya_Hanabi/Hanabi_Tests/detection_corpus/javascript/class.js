@@ -0,0 +1,9 @@
+export default class Store {
+  constructor() {
+    this.items = new Map();
+  }
+
+  get(key) {
+    return this.items.has(key) ? this.items.get(key) : undefined;
+  }
+}
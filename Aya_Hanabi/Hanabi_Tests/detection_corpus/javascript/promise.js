@@ -0,0 +1,7 @@
+async function load(url) {
+  const response = await fetch(url);
+  if (response.status !== 200) {
+    throw new Error('failed');
+  }
+  return response.json();
+}
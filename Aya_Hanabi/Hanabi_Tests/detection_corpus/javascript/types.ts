@@ -0,0 +1,9 @@
+export interface Note {
+  id: number;
+  title: string;
+  tags?: string[];
+}
+
+export function isEmpty(note: Note): boolean {
+  return note.title.length === 0;
+}
@@ -0,0 +1,12 @@
+import os
+import sys
+from PySide6.QtWidgets import QApplication
+
+
+def main():
+    app = QApplication(sys.argv)
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+import asyncio
+
+async def fetch(session, url):
+    async with session.get(url) as response:
+        return await response.text()
+
+@retry(times=3)
+async def run(urls):
+    results = []
+    for url in urls:
+        results.append(await fetch(None, url))
+    return results
@@ -0,0 +1,8 @@
+values = [x * x for x in range(10) if x % 2]
+mapping = {k: v for k, v in zip("abc", values)}
+while values:
+    item = values.pop()
+    if item > 10:
+        break
+else:
+    print("done")
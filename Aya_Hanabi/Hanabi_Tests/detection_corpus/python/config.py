@@ -0,0 +1,13 @@
+DEFAULTS = {
+    "theme": "dark",
+    "font_size": 14,
+    "word_wrap": True,
+    "plugins": None,
+}
+
+def load(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
@@ -0,0 +1,10 @@
+from functools import wraps
+
+def cached(func):
+    cache = {}
+    @wraps(func)
+    def wrapper(*args):
+        if args not in cache:
+            cache[args] = func(*args)
+        return cache[args]
+    return wrapper
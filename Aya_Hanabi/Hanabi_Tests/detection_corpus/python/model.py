@@ -0,0 +1,9 @@
+class Note:
+    """一条笔记"""
+
+    def __init__(self, title, content=None):
+        self.title = title
+        self.content = content or ""
+
+    def is_empty(self):
+        return not self.content.strip()
@@ -0,0 +1,315 @@
+"""
+语法高亮性能基准
+
+在无界面环境（QT_QPA_PLATFORM=offscreen）下，对生成的语料和仓库中的真实文件
+分别测量每个高亮器的：首次高亮、rehighlight（分词缓存已预热）、单次按键后的重新高亮。
+
+用法：
+    python -m Aya_Hanabi.Hanabi_Tests.highlight_benchmark --output bench.json
+    python -m Aya_Hanabi.Hanabi_Tests.highlight_benchmark --sizes 1000 10000 --baseline bench.json
+
+指定 --baseline 时与保存的结果对比，任何指标变慢超过 --tolerance 即视为性能回退，
+此时进程以状态码 1 退出。
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# 允许直接以脚本方式运行
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from PySide6 import __version__ as PYSIDE_VERSION
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QTextDocument, QTextCursor
+from PySide6.QtWidgets import QPlainTextDocumentLayout
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# 单次按键测量的次数，取平均值
+KEYSTROKES = 20
+# 指标变慢超过该比例视为回退
+DEFAULT_TOLERANCE = 0.25
+# 小于该耗时（秒）的指标波动太大，不参与回退判断
+MIN_SIGNIFICANT_SECONDS = 0.002
+
+# 真实语料：仓库中的文件，按需重复到指定行数
+REAL_CORPORA = {
+    'real_python': ('python', os.path.join("Aya_Hanabi", "Hanabi_Page", "HanabiSettingsPanel.py")),
+    'real_markdown': ('markdown', "README.md"),
+    'real_json': ('json', os.path.join("Aya_Hanabi", "Hanabi_Core", "ThemeManager", "custom_themes", "green_theme.json")),
+}
+
+_WORDS = ["hanabi", "note", "editor", "theme", "value", "index", "count", "result", "item", "buffer",
+          "花火", "笔记", "随你", "四季"]
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(_WORDS) for _ in range(count))
+
+
+def generate_python(lines, rng):
+    result = []
+    while len(result) < lines:
+        name = rng.choice(_WORDS[:10])
+        result.extend([
+            f"@decorator",
+            f"class {name.title()}{len(result)}(Base):",
+            f'    """{_words(rng, 6)}"""',
+            f"",
+            f"    def {name}_{len(result)}(self, value=None, *args, **kwargs):",
+            f"        # {_words(rng, 5)}",
+            f"        if value is not None and len(args) > {rng.randint(0, 99)}:",
+            f"            return self.{name} + {rng.random():.4f}",
+            f"        text = f\"{{value}} {_words(rng, 3)}\" + '{_words(rng, 2)}'",
+            f"        for i in range({rng.randint(1, 1000)}):",
+            f"            print(i, text, True, None)",
+            f"        return [x * 2 for x in args]",
+            f"",
+        ])
+    return "\n".join(result[:lines])
+
+
+def generate_markdown(lines, rng):
+    result = []
+    while len(result) < lines:
+        result.extend([
+            f"# {_words(rng, 3)}",
+            f"",
+            f"{_words(rng, 12)} **{_words(rng, 2)}** *{_words(rng, 2)}* `{rng.choice(_WORDS)}`",
+            f"- {_words(rng, 5)} [{rng.choice(_WORDS)}](https://example.com/{len(result)})",
+            f"- {_words(rng, 6)}",
+            f"> {_words(rng, 8)}",
+            f"## {_words(rng, 2)}",
+            f"```python",
+            f"def {rng.choice(_WORDS[:10])}():",
+            f"    return {rng.randint(0, 999)}",
+            f"```",
+            f"",
+        ])
+    return "\n".join(result[:lines])
+
+
+def generate_json(lines, rng):
+    """生成格式化的 JSON，行数尽量接近 lines"""
+    items = []
+    # 每个对象约 8 行
+    for index in range(max(1, lines // 8)):
+        items.append({
+            "id": index,
+            "name": _words(rng, 2),
+            "enabled": rng.random() > 0.5,
+            "score": round(rng.random() * 100, 3),
+            "tags": [rng.choice(_WORDS) for _ in range(2)],
+            "parent": None,
+        })
+    return json.dumps({"items": items}, ensure_ascii=False, indent=2)
+
+
+def generate_minified_json(lines, rng):
+    """与 generate_json 内容规模相同，但压缩为单行"""
+    return json.dumps(json.loads(generate_json(lines, rng)), ensure_ascii=False, separators=(',', ':'))
+
+
+def generate_log(lines, rng):
+    levels = ["INFO", "DEBUG", "WARNING", "ERROR"]
+    return "\n".join(
+        f"2025-04-06 12:{index // 60 % 60:02d}:{index % 60:02d},{rng.randint(0, 999):03d} "
+        f"[{rng.choice(levels)}] {rng.choice(_WORDS)}: {_words(rng, 8)} (id={index})"
+        for index in range(lines)
+    )
+
+
+# {语料名: (文件类型, 生成函数)}
+GENERATED_CORPORA = {
+    'python': ('python', generate_python),
+    'markdown': ('markdown', generate_markdown),
+    'json_pretty': ('json', generate_json),
+    'json_minified': ('json', generate_minified_json),
+    'log': ('text', generate_log),
+}
+
+
+def load_real_corpus(relative_path, lines):
+    """读取仓库中的文件并重复到指定行数，文件不存在时返回 None"""
+    path = os.path.join(ROOT_DIR, relative_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read().splitlines()
+    if not source:
+        return None
+    repeated = (source * (lines // len(source) + 1))[:lines]
+    return "\n".join(repeated)
+
+
+def build_corpora(sizes, names=None, seed=0):
+    """返回 [(语料名, 行数, 文件类型, 文本), ...]"""
+    corpora = []
+    for size in sizes:
+        for name, (file_type, generator) in GENERATED_CORPORA.items():
+            if names and name not in names:
+                continue
+            corpora.append((name, size, file_type, generator(size, random.Random(seed))))
+        for name, (file_type, relative_path) in REAL_CORPORA.items():
+            if names and name not in names:
+                continue
+            text = load_real_corpus(relative_path, size)
+            if text is not None:
+                corpora.append((name, size, file_type, text))
+    return corpora
+
+
+def _clear_token_cache(highlighter):
+    cache = type(highlighter).__dict__.get('_token_cache')
+    if cache is not None:
+        cache.clear()
+
+
+def measure(file_type, text, keystrokes=KEYSTROKES):
+    """测量单个语料，返回各项耗时（秒）"""
+    from Aya_Hanabi.Hanabi_HighLight import get_highlighter
+
+    document = QTextDocument()
+    # 与 QPlainTextEdit 使用相同的布局；没有布局的文档不会发出 contentsChange，高亮器也就收不到编辑
+    document.setDocumentLayout(QPlainTextDocumentLayout(document))
+    document.setPlainText(text)
+
+    # 首次高亮：分词缓存为空
+    highlighter = get_highlighter(file_type, document)
+    _clear_token_cache(highlighter)
+    start = time.perf_counter()
+    highlighter.rehighlight()
+    initial = time.perf_counter() - start
+    # 处理掉 setDocument 时挂起的延迟重绘，挂起期间高亮器会忽略文档修改
+    QApplication.processEvents()
+
+    # 再次高亮：文本未变，分词缓存已预热
+    start = time.perf_counter()
+    highlighter.rehighlight()
+    rehighlight = time.perf_counter() - start
+
+    # 单次按键：在均匀分布的位置插入一个字符，contentsChange 会同步触发重新高亮
+    cursor = QTextCursor(document)
+    block_count = document.blockCount()
+    total = 0.0
+    for index in range(keystrokes):
+        block = document.findBlockByNumber(block_count * index // keystrokes)
+        cursor.setPosition(block.position() + block.length() // 2)
+        start = time.perf_counter()
+        cursor.insertText("x")
+        total += time.perf_counter() - start
+    keystroke = total / keystrokes
+
+    highlighter.setDocument(None)
+    return {
+        'highlighter': type(highlighter).__name__,
+        'blocks': block_count,
+        'chars': len(text),
+        'initial_s': initial,
+        'rehighlight_s': rehighlight,
+        'keystroke_s': keystroke,
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, names=None, repeat=1, seed=0):
+    """运行全部基准，同一语料重复 repeat 次取最小值"""
+    results = []
+    for name, size, file_type, text in build_corpora(sizes, names, seed):
+        best = None
+        for _ in range(max(1, repeat)):
+            result = measure(file_type, text)
+            if best is None:
+                best = result
+            else:
+                for key in METRICS:
+                    best[key] = min(best[key], result[key])
+        best.update({'corpus': name, 'lines': size, 'file_type': file_type})
+        results.append(best)
+        print(f"{name:<14} {size:>7} 行  {best['highlighter']:<22} "
+              f"首次 {best['initial_s'] * 1000:9.1f}ms  "
+              f"重绘 {best['rehighlight_s'] * 1000:9.1f}ms  "
+              f"按键 {best['keystroke_s'] * 1000:7.3f}ms")
+    return {
+        'meta': {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'pyside': PYSIDE_VERSION,
+            'platform': platform.platform(),
+            'sizes': list(sizes),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+METRICS = ('initial_s', 'rehighlight_s', 'keystroke_s')
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    与基线对比，返回回退列表 [(语料名, 行数, 指标, 基线耗时, 当前耗时), ...]
+
+    只比较两份结果中都存在的 (语料, 行数)
+    """
+    baseline_results = {(item['corpus'], item['lines']): item for item in baseline.get('results', [])}
+    regressions = []
+    for item in current.get('results', []):
+        old = baseline_results.get((item['corpus'], item['lines']))
+        if old is None:
+            continue
+        for metric in METRICS:
+            before, after = old.get(metric), item.get(metric)
+            if before is None or after is None:
+                continue
+            if after < MIN_SIGNIFICANT_SECONDS:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append((item['corpus'], item['lines'], metric, before, after))
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="语法高亮性能基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="语料行数")
+    parser.add_argument("--corpus", nargs="+", help="只运行指定语料，可选: "
+                        + ", ".join(list(GENERATED_CORPORA) + list(REAL_CORPORA)))
+    parser.add_argument("--repeat", type=int, default=1, help="每个语料重复次数，取最小值")
+    parser.add_argument("--output", help="结果 JSON 的保存路径")
+    parser.add_argument("--baseline", help="与该基线 JSON 对比，发现回退时以状态码 1 退出")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许变慢的比例，默认 0.25")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    report = run_benchmarks(args.sizes, args.corpus, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回退（容差 {args.tolerance:.0%}）：")
+            for corpus, lines, metric, before, after in regressions:
+                print(f"  {corpus} {lines} 行 {metric}: {before * 1000:.1f}ms -> {after * 1000:.1f}ms "
+                      f"(+{(after / before - 1):.0%})")
+            return 1
+        print("与基线相比没有性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -221,16 +221,17 @@ class FormatConverterPlugin(HanabiPlugin):
         print("格式转换插件初始化完成")
         return super().initialize()
     
-    def on_file_saved(self, file_path):
-        """文件保存时的处理"""
+    def on_file_saved(self, file_path, content=None):
+        """文件保存时的处理，content 为保存时编辑器文本的快照（换行符为 \n）"""
         # 根据设置决定是否自动转换
         auto_convert = self.get_setting('auto_convert', False)
         
         if auto_convert and self.md_handler.can_handle(file_path):
             try:
-                # 读取文件内容
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                # 旧版本调用钩子时不传内容，才需要读取文件
+                if content is None:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
                 
                 # 转换并保存
                 self.md_handler.save_file(file_path, content)
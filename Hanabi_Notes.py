@@ -19,11 +19,13 @@ from PySide6.QtGui import QFont, QColor, QCursor, QTextCursor, QTextFormat, QSyn
 # 导入文件管理相关功能
 from Aya_Hanabi.Hanabi_Core.FileManager import (
     FileManager, open_file, save_file, new_file, delete_file, 
-    close_file, change_file, AutoSave
+    close_file, change_file, AutoSave, recover_sessions
 )
 
 # 导入自动备份管理器
 from Aya_Hanabi.Hanabi_Core.FileManager.autoBackup import AutoBackup
+from Aya_Hanabi.Hanabi_Core.FileManager.openDocuments import OpenDocument, OpenDocumentRegistry
+from Aya_Hanabi.Hanabi_Core.FileManager.editJournal import EditJournal
 
 
 from Aya_Hanabi.Hanabi_Core.UI import TitleBar, StatusBar, IconButton
@@ -173,7 +175,7 @@ class HanabiNotesApp(QMainWindow):
         self.currentFileType = "text"  # 默认文件类型
         self.highlightMode = True
         self.lastDirectory = None
-        self.openFiles = []  # 已打开文件的列表
+        self.openFiles = OpenDocumentRegistry()  # 已打开的文档，按路径、标签页 ID 和编辑器索引索引
         self.closedEditors = []  # 已关闭编辑器的列表
         
         # 窗口拖拽调整大小相关变量
@@ -186,6 +188,9 @@ class HanabiNotesApp(QMainWindow):
         # 初始化自动保存
         self.autoSaveManager = AutoSave(self, interval=120)
         
+        # 初始化编辑日志（崩溃恢复）
+        self.editJournal = EditJournal(self)
+        
         # 初始化自动备份
         self.autoBackupManager = AutoBackup(self, max_backups=10)
         
@@ -369,10 +374,9 @@ class HanabiNotesApp(QMainWindow):
             self.updateFileInfo(fileInfo)
             
             # 更新文件已加载标志
-            for fileData in self.openFiles:
-                if fileData.get('filePath') == filePath:
-                    fileData['isLoaded'] = True
-                    break
+            fileData = self.openFiles.by_path(filePath)
+            if fileData is not None:
+                fileData.isLoaded = True
             
             # 通知自动保存系统文件已加载
             if self.autoSaveManager:
@@ -392,11 +396,10 @@ class HanabiNotesApp(QMainWindow):
             self.sidebar.updateTabName(self.sidebar.current_tab_index, fileName, filePath)
             
             # 更新文件信息
-            for file_info in self.openFiles:
-                if file_info.get('index') == self.sidebar.current_tab_index:
-                    file_info['filePath'] = filePath
-                    file_info['title'] = fileName
-                    break
+            file_info = self.openFiles.by_tab(self.sidebar.currentTabId())
+            if file_info is not None:
+                self.openFiles.set_path(file_info, filePath)
+                file_info.title = fileName
         
         HanabiMessageBox.information(self, "保存成功", message)
     
@@ -446,9 +449,7 @@ class HanabiNotesApp(QMainWindow):
                 # 确保应用高亮时使用当前正确的文件类型
                 self.applyHighlighter(currentEditor, self.currentFileType)
             else:
-                if hasattr(currentEditor, 'highlighter') and currentEditor.highlighter:
-                    currentEditor.highlighter.setDocument(None)
-                    currentEditor.highlighter = None
+                self.editorManager.removeHighlighter(currentEditor)
     
     def onScrollToLineRequested(self, lineNumber):
         currentEditorIndex = self.editorsStack.currentIndex()
@@ -637,13 +638,13 @@ class HanabiNotesApp(QMainWindow):
             self.fileManager.fileSaved.connect(self.onFileSaved)
             self.fileManager.fileDeleted.connect(lambda path: print(f"文件已删除: {path}"))
             
-            # 初始化自动保存功能
-            self.autoSave = AutoSave(self)
+            # 初始化自动保存功能（与 __init__ 中创建的是同一个实例，保存和加载的通知都发给它）
+            self.autoSave = self.autoSaveManager
             self.autoSave.start()
         except Exception as e:
             HanabiMessageBox.critical(self, "错误", f"无法加载文件管理器模块: {str(e)}")
         
-        self.openFiles = []
+        self.openFiles = OpenDocumentRegistry()
         self.currentFilePath = None
         self.currentTitle = "未命名"
         self.currentFileType = "text"  # 默认为普通文本
@@ -709,18 +710,12 @@ class HanabiNotesApp(QMainWindow):
             HanabiMessageBox.warning(self, "缺少依赖", "未安装markdown模块，预览功能不可用。请执行 pip install markdown 安装。")
             self.markdown = None
         
-        # 创建初始编辑器并在openFiles列表中记录
+        # 创建初始编辑器并在openFiles中记录
         firstEditorIndex = self.createNewEditor()
         
-        # 记录初始标签页信息 (对应于侧边栏中默认创建的"未命名"标签页)
-        self.openFiles.append({
-            'index': 0,  # 第一个标签页索引是0
-            'editorIndex': firstEditorIndex,
-            'filePath': None,
-            'title': "未命名",
-            'isVirtual': True  # 标记为虚拟标签页
-        })
-        print(f"初始标签页已添加到openFiles列表，编辑器索引: {firstEditorIndex}")
+        # 记录初始标签页信息 (对应于侧边栏中默认创建的"未命名"标签页，位置是0)
+        self.openFiles.add(OpenDocument(self.sidebar.tabIdAt(0), firstEditorIndex))
+        print(f"初始标签页已添加到openFiles，编辑器索引: {firstEditorIndex}")
         
         # 所有UI组件创建完成后应用主题
         self.applyTheme(self.currentTheme)
@@ -837,7 +832,11 @@ class HanabiNotesApp(QMainWindow):
                 except Exception as e:
                     print(f"更新编辑器 {i} 样式时出错: {e}")
                     continue
-                
+            
+            # 更新语法高亮配色（只替换调色板，不重新分词）
+            if hasattr(self, 'editors') and hasattr(self, 'editorManager'):
+                self.editorManager.updateHighlightPalette(self.editors)
+            
             # 更新编辑器容器样式
             if hasattr(self, 'editorsStack'):
                 print(f"准备更新编辑器容器样式，编辑器堆栈数量: {self.editorsStack.count()}")
@@ -994,6 +993,12 @@ class HanabiNotesApp(QMainWindow):
         # 连接信号
         editor.textChanged.connect(lambda: self.updateLineCount(editor))
         editor.textChanged.connect(lambda: self.updatePreview(len(self.editors) - 1))
+        # 自动保存按文档修改状态决定是否保存
+        if getattr(self, 'autoSaveManager', None):
+            self.autoSaveManager.track_editor(len(self.editors) - 1, editor)
+        # 编辑增量写入日志，崩溃后可以恢复
+        if getattr(self, 'editJournal', None):
+            self.editJournal.track_editor(len(self.editors) - 1, editor)
         
         # 应用容器样式
         self.updateEditorContainerStyle(editorContainer)
@@ -1021,27 +1026,12 @@ class HanabiNotesApp(QMainWindow):
         return editorIndex
     
     def openFile(self):
-        # 使用FileManager中的open_file功能
+        # 使用FileManager中的open_file功能，文件在后台读取，加载完成后触发 file_opened 插件钩子
         open_file(self)
-        
-        # 触发插件钩子
-        if self.plugin_manager:
-            try:
-                self.plugin_manager.trigger_hook('file_opened', self.currentFilePath)
-            except Exception as e:
-                print(f"触发插件钩子时出错: {e}")
     
     def saveFile(self, savePath=None):
-        result = save_file(self, savePath)
-        
-        # 触发插件钩子
-        if self.plugin_manager and self.currentFilePath:
-            try:
-                self.plugin_manager.trigger_hook('file_saved', self.currentFilePath)
-            except Exception as e:
-                print(f"触发插件钩子时出错: {e}")
-        
-        return result
+        # 使用FileManager中的save_file功能，文件在后台写入，写入完成后触发 file_saved 插件钩子
+        return save_file(self, savePath)
     
     def newFile(self):
         # 使用FileManager中的new_file功能
@@ -1061,11 +1051,11 @@ class HanabiNotesApp(QMainWindow):
     def printOpenFilesList(self):
         print("\n--- 当前打开的文件列表 ---")
         for i, file_info in enumerate(self.openFiles):
-            index = file_info.get('index', 'N/A')
-            editor_index = file_info.get('editorIndex', 'N/A')
-            file_path = file_info.get('filePath', 'None')
-            title = file_info.get('title', 'Untitled')
-            is_virtual = file_info.get('isVirtual', False)
+            index = self.sidebar.indexOfTab(file_info.tabId)
+            editor_index = file_info.editorIndex
+            file_path = file_info.filePath
+            title = file_info.title
+            is_virtual = file_info.isVirtual
             print(f"[{i}] 标签索引: {index}, 编辑器索引: {editor_index}, 路径: {file_path}, 标题: {title}, 虚拟标签: {is_virtual}")
         print("------------------------\n")
 
@@ -1115,6 +1105,14 @@ class HanabiNotesApp(QMainWindow):
         # 应用主题
         self.applyTheme(self.currentTheme)
         
+        # 上次运行崩溃或未保存就退出时，询问是否恢复编辑日志中的内容（只检查一次）
+        if not getattr(self, '_sessionsRecovered', False):
+            self._sessionsRecovered = True
+            try:
+                recover_sessions(self)
+            except Exception as e:
+                print(f"恢复未保存的内容时出错: {e}")
+        
         # 窗口居中显示
         desktop = QApplication.primaryScreen().availableGeometry()
         geometry = self.frameGeometry()
@@ -1474,25 +1472,19 @@ class HanabiNotesApp(QMainWindow):
             self.currentEditor = self.editors[index]
             print(f"当前编辑器已更新为编辑器 {index}")
             
-            # 标记是否找到匹配的文件信息
-            found_matching_file = False
-            
             # 更新当前文件路径
-            for file_info in self.openFiles:
-                if file_info.get('editorIndex') == index:
-                    found_matching_file = True
-                    # 保留原有的filePath（如果新路径为None但原有路径存在）
-                    if file_info.get('filePath') is None and self.currentFilePath is not None:
-                        print(f"保留原有文件路径: {self.currentFilePath}，而不是设置为None")
-                    else:
-                        self.currentFilePath = file_info.get('filePath')
-                        
-                    self.currentTitle = file_info.get('title', '未命名')
-                    print(f"当前文件路径已更新: {self.currentFilePath}")
-                    break
-            
-            # 如果没有找到匹配的文件信息，记录警告但不重置currentFilePath
-            if not found_matching_file:
+            file_info = self.openFiles.by_editor(index)
+            if file_info is not None:
+                # 保留原有的filePath（如果新路径为None但原有路径存在）
+                if file_info.filePath is None and self.currentFilePath is not None:
+                    print(f"保留原有文件路径: {self.currentFilePath}，而不是设置为None")
+                else:
+                    self.currentFilePath = file_info.filePath
+                    
+                self.currentTitle = file_info.title
+                print(f"当前文件路径已更新: {self.currentFilePath}")
+            else:
+                # 如果没有找到匹配的文件信息，记录警告但不重置currentFilePath
                 print(f"警告: 未找到与编辑器索引 {index} 匹配的文件信息，保留现有的文件路径: {self.currentFilePath}")
         else:
             print(f"警告: 无效的编辑器索引 {index}")
@@ -2157,6 +2149,13 @@ if __name__ == "__main__":
         result = app.exec()
         
         # 执行退出清理
+        # 等待后台保存写完，避免退出时丢失正在写入的内容
+        if getattr(main_window, 'fileSaver', None) is not None:
+            main_window.fileSaver.shutdown(timeout=10)
+        if getattr(main_window, 'autoSaveManager', None) is not None:
+            main_window.autoSaveManager.shutdown(timeout=10)
+        if getattr(main_window, 'editJournal', None) is not None:
+            main_window.editJournal.shutdown(timeout=10)
         # 插件系统已移除
             
         # 清理优化器